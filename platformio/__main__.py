@@ -13,7 +13,9 @@
 # limitations under the License.
 
 import os
+import subprocess
 import sys
+import time
 import traceback
 
 import click
@@ -21,6 +23,7 @@ import click
 from platformio import __version__, exception, maintenance
 from platformio.cli import PlatformioCLI
 from platformio.compat import IS_CYGWIN, ensure_python3
+from platformio.proc import get_pythonexe_path
 
 
 @click.command(
@@ -30,8 +33,21 @@ from platformio.compat import IS_CYGWIN, ensure_python3
 @click.option("--force", "-f", is_flag=True, help="DEPRECATED", hidden=True)
 @click.option("--caller", "-c", help="Caller ID (service)")
 @click.option("--no-ansi", is_flag=True, help="Do not print ANSI control characters")
+@click.option(
+    "--startup-profile",
+    is_flag=True,
+    help="Run a command and print the import timings of its startup",
+)
 @click.pass_context
-def cli(ctx, force, caller, no_ansi):  # pylint: disable=unused-argument
+def cli(
+    ctx, force, caller, no_ansi, startup_profile
+):  # pylint: disable=unused-argument
+    if startup_profile:
+        args = ["--caller", caller] if caller else []
+        if no_ansi:
+            args.append("--no-ansi")
+        ctx.exit(profile_startup(args + PlatformioCLI.leftover_args))
+
     try:
         if (
             no_ansi
@@ -62,19 +78,49 @@ def process_result(*_, **__):
     maintenance.on_cmd_end()
 
 
+def profile_startup(args, limit=20):
+    """Runs a command in a new interpreter with the import timings enabled,
+    prints the slowest imports, and returns the exit code of the command"""
+    start = time.perf_counter()
+    result = subprocess.run(  # pylint: disable=subprocess-run-check
+        [get_pythonexe_path(), "-X", "importtime", "-m", "platformio"] + args,
+        stderr=subprocess.PIPE,
+        encoding="utf8",
+        errors="replace",
+    )
+    elapsed = time.perf_counter() - start
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            click.echo(line, err=True)
+            continue
+        try:
+            self_us, cumulative_us, name = line[12:].split("|", 2)
+            imports.append((int(cumulative_us), int(self_us), name.rstrip()[1:]))
+        except ValueError:  # the header
+            continue
+
+    # the top-level imports do not overlap
+    total_us = sum(item[0] for item in imports if not item[2].startswith("  "))
+    click.echo(
+        "\nStartup profile: %d modules imported in %.0f ms, command took %.0f ms"
+        % (len(imports), total_us / 1000, elapsed * 1000),
+        err=True,
+    )
+    click.echo("%12s %12s  %s" % ("cumulative", "self", "module"), err=True)
+    for cumulative_us, self_us, name in sorted(imports, reverse=True)[:limit]:
+        click.echo(
+            "%9.1f ms %9.1f ms  %s" % (cumulative_us / 1000, self_us / 1000, name),
+            err=True,
+        )
+    return result.returncode
+
+
 def configure():
     if IS_CYGWIN:
         raise exception.CygwinEnvDetected()
 
-    # https://urllib3.readthedocs.org
-    # /en/latest/security.html#insecureplatformwarning
-    try:
-        import urllib3  # pylint: disable=import-outside-toplevel
-
-        urllib3.disable_warnings()
-    except (AttributeError, ImportError):
-        pass
-
     # Handle IOError issue with VSCode's Terminal (Windows)
     click_echo_origin = [click.echo, click.secho]
 
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 import getpass
 import hashlib
 import json
@@ -46,6 +47,17 @@ DEFAULT_SETTINGS = {
         "description": "Enable caching for HTTP API requests",
         "value": True,
     },
+    "enable_build_object_cache": {
+        "description": (
+            "Share compiled objects between projects and build environments "
+            "via a global build object cache"
+        ),
+        "value": False,
+    },
+    "build_object_cache_size": {
+        "description": "Maximum size of the global build object cache (megabytes)",
+        "value": 2048,
+    },
     "enable_telemetry": {
         "description": ("Telemetry service <https://bit.ly/pio-telemetry> (Yes/No)"),
         "value": True,
@@ -59,6 +71,13 @@ DEFAULT_SETTINGS = {
         "value": get_default_projects_dir(),
         "validator": projects_dir_validate,
     },
+    "download_segments": {
+        "description": (
+            "Download large packages using multiple parallel connections "
+            "(number of connections)"
+        ),
+        "value": 1,
+    },
     "enable_proxy_strict_ssl": {
         "description": "Verify the proxy server certificate against the list of supplied CAs",
         "value": True,
@@ -72,6 +91,9 @@ SESSION_VARS = {
     "pause_telemetry": False,
 }
 
+# parsed state files per a path, valid while a file has the same signature
+_STATE_CACHE = {}
+
 
 def resolve_state_path(conf_option_dir, file_name, ensure_dir_exists=True):
     state_dir = ProjectConfig.get_instance().get("platformio", conf_option_dir)
@@ -91,25 +113,15 @@ class State:
         self.modified = False
 
     def __enter__(self):
-        try:
-            self._lock_state_file()
-            if os.path.isfile(self.path):
-                self._storage = fs.load_json(self.path)
-            assert isinstance(self._storage, dict)
-        except (
-            AssertionError,
-            ValueError,
-            UnicodeDecodeError,
-            exception.InvalidJSONFile,
-        ):
-            self._storage = {}
+        self._lock_state_file()
+        # a private copy, the callers modify the nested items in place
+        self._storage = copy.deepcopy(load_state_storage(self.path))
         return self
 
     def __exit__(self, type_, value, traceback):
         if self.modified:
             try:
-                with open(self.path, mode="w", encoding="utf8") as fp:
-                    fp.write(json.dumps(self._storage))
+                save_state_storage(self.path, self._storage)
             except IOError as exc:
                 raise exception.HomeDirPermissionsError(
                     os.path.dirname(self.path)
@@ -165,6 +177,79 @@ class State:
         return item in self._storage
 
 
+def _get_state_signature(stat):
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def load_state_storage(path):
+    """Returns the parsed content of a state file.
+
+    The content is parsed once per a process and is reused while the file has
+    the same inode, size, and modification time, so the changes made by the
+    other processes are picked up on the next call. The result is shared
+    between the callers and must not be modified.
+    """
+    try:
+        signature = _get_state_signature(os.stat(path))
+    except OSError:
+        _STATE_CACHE.pop(path, None)
+        return {}
+    cached = _STATE_CACHE.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    try:
+        storage = fs.load_json(path)
+        assert isinstance(storage, dict)
+    except (
+        AssertionError,
+        ValueError,
+        UnicodeDecodeError,
+        exception.InvalidJSONFile,
+    ):
+        storage = {}
+    _STATE_CACHE[path] = (signature, storage)
+    return storage
+
+
+def _create_state_temp_file(path):
+    """Creates a temporary file next to a state file, the file has the mode
+    of the state file or the default mode with respect to the umask"""
+    tmp_path = os.path.join(os.path.dirname(path), ".tmp-%s" % uuid.uuid4().hex)
+    fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+    try:
+        os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+    except OSError:
+        pass
+    return fd, tmp_path
+
+
+def save_state_storage(path, storage):
+    """Replaces a state file atomically, the concurrent readers see either
+    the previous or the new content but never a partially written file"""
+    data = json.dumps(storage)
+    _STATE_CACHE.pop(path, None)
+    fd, tmp_path = _create_state_temp_file(path)
+    try:
+        with os.fdopen(fd, mode="w", encoding="utf8") as fp:
+            fp.write(data)
+            fp.flush()
+            # the renamed file keeps the inode, the size, and the mtime
+            signature = _get_state_signature(os.fstat(fp.fileno()))
+        try:
+            os.replace(tmp_path, path)
+        except PermissionError:
+            # Windows does not replace a file which is opened by a reader
+            if not IS_WINDOWS:
+                raise
+            with open(path, mode="w", encoding="utf8") as fp:
+                fp.write(data)
+            return
+    finally:
+        if os.path.isfile(tmp_path):
+            os.remove(tmp_path)
+    _STATE_CACHE[path] = (signature, copy.deepcopy(storage))
+
+
 def sanitize_setting(name, value):
     if name not in DEFAULT_SETTINGS:
         raise exception.InvalidSettingName(name)
@@ -184,8 +269,10 @@ def sanitize_setting(name, value):
 
 
 def get_state_item(name, default=None):
-    with State() as state:
-        return state.get(name, default)
+    storage = load_state_storage(
+        resolve_state_path("core_dir", "appstate.json", ensure_dir_exists=False)
+    )
+    return copy.deepcopy(storage.get(name, default))
 
 
 def set_state_item(name, value):
@@ -205,9 +292,12 @@ def get_setting(name):
     if _env_name in os.environ:
         return sanitize_setting(name, os.getenv(_env_name))
 
-    with State() as state:
-        if "settings" in state and name in state["settings"]:
-            return state["settings"][name]
+    storage = load_state_storage(
+        resolve_state_path("core_dir", "appstate.json", ensure_dir_exists=False)
+    )
+    settings = storage.get("settings", {})
+    if name in settings:
+        return copy.deepcopy(settings[name])
 
     return DEFAULT_SETTINGS[name]["value"]
 
@@ -40,8 +40,10 @@ clivars = Variables(None)
 clivars.AddVariables(
     ("BUILD_SCRIPT",),
     ("PROJECT_CONFIG",),
+    ("PROJECT_CONFIG_SNAPSHOT",),
     ("PIOENV",),
     ("PIOTEST_RUNNING_NAME",),
+    ("PIOTEST_RUNNING_NAMES",),
     ("UPLOAD_PORT",),
     ("PROGRAM_ARGS",),
 )
@@ -66,6 +68,7 @@ DEFAULT_ENV_OPTIONS = dict(
         "piomisc",
         "piointegration",
         "piomaxlen",
+        "pioobjcache",
     ],
     toolpath=[os.path.join(fs.get_source_dir(), "builder", "tools")],
     variables=clivars,
@@ -179,6 +182,8 @@ if env.GetProjectOption("upload_command"):
 
 env.SConscript(env.GetExtraScripts("post"), exports="env")
 
+env.ConfigureBuildObjectCache()
+
 ##############################################################################
 
 # Checking program size
@@ -75,7 +75,10 @@ def BuildProgram(env):
         env.Prepend(_LIBFLAGS="-Wl,--start-group ")
         env.Append(_LIBFLAGS=" -Wl,--end-group")
 
-    program = env.Program(env.subst("$PROGPATH"), env["PIOBUILDFILES"])
+    if env.get("PIOTEST_BUILDFILES"):
+        program = env.BuildTestPrograms()
+    else:
+        program = env.Program(env.subst("$PROGPATH"), env["PIOBUILDFILES"])
     env.Replace(PIOMAINPROG=program)
 
     AlwaysBuild(
@@ -162,7 +165,12 @@ def ProcessProjectDeps(env):
         }
     )
 
-    if "test" in env["BUILD_TYPE"]:
+    if "test" in env["BUILD_TYPE"] and "PIOTEST_RUNNING_NAMES" in env:
+        plb.env.BuildSources(
+            "$BUILD_TEST_DIR", "$PROJECT_TEST_DIR", "$PIOTEST_SHARED_SRC_FILTER"
+        )
+        env.BuildTestSuiteSources(plb.env)
+    elif "test" in env["BUILD_TYPE"]:
         build_files_before_nums = len(env.get("PIOBUILDFILES", []))
         plb.env.BuildSources(
             "$BUILD_TEST_DIR", "$PROJECT_TEST_DIR", "$PIOTEST_SRC_FILTER"
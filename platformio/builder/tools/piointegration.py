@@ -19,7 +19,8 @@ import SCons.Defaults  # pylint: disable=import-error
 import SCons.Subst  # pylint: disable=import-error
 from SCons.Script import COMMAND_LINE_TARGETS  # pylint: disable=import-error
 
-from platformio.proc import exec_command, where_is_program
+from platformio.proc import where_is_program
+from platformio.toolchain import get_toolchain_defines
 
 
 def IsIntegrationDump(_):
@@ -59,26 +60,12 @@ def DumpIntegrationIncludes(env):
 
 
 def get_gcc_defines(env):
-    items = []
-    try:
-        sysenv = os.environ.copy()
-        sysenv["PATH"] = str(env["ENV"]["PATH"])
-        result = exec_command(
-            "echo | %s -dM -E -" % env.subst("$CC"), env=sysenv, shell=True
+    return (
+        get_toolchain_defines(
+            _split_flags_string(env, "$CC"), envpath=str(env["ENV"]["PATH"])
         )
-    except OSError:
-        return items
-    if result["returncode"] != 0:
-        return items
-    for line in result["out"].split("\n"):
-        tokens = line.strip().split(" ", 2)
-        if not tokens or tokens[0] != "#define":
-            continue
-        if len(tokens) > 2:
-            items.append("%s=%s" % (tokens[1], tokens[2]))
-        else:
-            items.append(tokens[1])
-    return items
+        or []
+    )
 
 
 def dump_defines(env):
@@ -15,8 +15,11 @@
 # pylint: disable=too-many-instance-attributes, too-many-public-methods
 # pylint: disable=assignment-from-no-return, unused-argument, too-many-lines
 
+import collections
+import copy
 import hashlib
 import io
+import json
 import os
 import re
 import sys
@@ -28,6 +31,7 @@ from SCons.Script import DefaultEnvironment  # pylint: disable=import-error
 
 from platformio import exception, fs
 from platformio.builder.tools import piobuild
+from platformio.cache import JSONFileCache
 from platformio.compat import IS_WINDOWS, hashlib_encode_data, string_types
 from platformio.http import HTTPClientError, InternetConnectionError
 from platformio.package.exception import (
@@ -108,6 +112,188 @@ class LibBuilderFactory:
         return []
 
 
+class LDFCache(JSONFileCache):
+    """Persistent cache for the results of the include scanners.
+
+    An entry is keyed by a library path, the scanned files, the effective
+    scanner context (CPPDEFINES, include dirs, LDF mode) and is valid while
+    all files and directories it depends on keep the same mtime and size.
+    """
+
+    def __init__(self, path):
+        self._used = {}
+        self._stat_cache = {}
+        self.hits = 0
+        self.misses = 0
+        super().__init__(path)
+
+    def save(self):
+        # drop the entries which were not used by the current build
+        if not self._modified and len(self._used) == len(self._data):
+            return
+        self._dump(self._used)
+
+    @staticmethod
+    def compute_key(*items):
+        return hashlib.sha1(
+            hashlib_encode_data(json.dumps(items, sort_keys=True, default=str))
+        ).hexdigest()
+
+    def _get_signature(self, path):
+        if path not in self._stat_cache:
+            try:
+                st = os.stat(path)
+                self._stat_cache[path] = [int(st.st_mtime_ns), st.st_size]
+            except OSError:
+                self._stat_cache[path] = None
+        return self._stat_cache[path]
+
+    def get_signatures(self, paths):
+        result = {}
+        for path in paths:
+            result[path] = self._get_signature(path)
+            dir_path = os.path.dirname(path)
+            if dir_path not in result:
+                result[dir_path] = self._get_signature(dir_path)
+        return result
+
+    def compute_deps(self, result_paths, processed_paths, include_dirs):
+        """Returns the signatures of the files and directories the scan
+        results depend on. A header created in any include dir, or in its
+        subdirectory for the nested names (`<dir>/sys` for `sys/foo.h`),
+        could shadow a resolved header, so these directories are tracked
+        too."""
+        base_dirs = list(
+            dict.fromkeys(
+                include_dirs + [os.path.dirname(path) for path in processed_paths]
+            )
+        )
+        nested_dirs = set()
+        for path in result_paths:
+            for base_dir in base_dirs:
+                if not path.startswith(base_dir + os.sep):
+                    continue
+                rel_dir = os.path.dirname(path[len(base_dir) + 1 :])
+                while rel_dir:
+                    nested_dirs.add(rel_dir)
+                    rel_dir = os.path.dirname(rel_dir)
+        return self.get_signatures(
+            processed_paths
+            + result_paths
+            + include_dirs
+            + [
+                os.path.join(base_dir, rel_dir)
+                for base_dir in base_dirs
+                for rel_dir in sorted(nested_dirs)
+            ]
+        )
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry and all(
+            self._get_signature(path) == signature
+            for path, signature in entry["deps"].items()
+        ):
+            self._used[key] = entry
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def set(self, key, entry):
+        self._used[key] = entry
+        self._data[key] = entry
+        self._modified = True
+
+
+class LibManifestIndex(JSONFileCache):
+    """Persistent index of the parsed library manifests.
+
+    An entry is keyed by a manifest path and is valid while the manifest
+    file keeps the same mtime and size, so the large library storages are
+    not parsed again on every build.
+    """
+
+    def __init__(self, path):
+        self._used = {}
+        super().__init__(path)
+
+    def save(self):
+        # drop the entries which were not used by the current build
+        if not self._modified and len(self._used) == len(self._data):
+            return
+        self._dump(self._used)
+
+    def load(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return ManifestParserFactory.new_from_file(path).as_dict()
+        signature = [int(st.st_mtime_ns), st.st_size]
+        entry = self._data.get(path)
+        if entry and entry["signature"] == signature:
+            self._used[path] = entry
+            return copy.deepcopy(entry["manifest"])
+        manifest = ManifestParserFactory.new_from_file(path).as_dict()
+        try:
+            entry = dict(signature=signature, manifest=json.loads(json.dumps(manifest)))
+        except (TypeError, ValueError):
+            return manifest
+        self._used[path] = entry
+        self._data[path] = entry
+        self._modified = True
+        return manifest
+
+
+class LibBuilderPathIndex:
+    """Maps a path to the first library builder which contains it.
+
+    The roots of library builders are indexed by path, so a lookup walks up
+    the parents of a path instead of comparing it with every library. The
+    dependent libraries take precedence, as in `GetLibBuilders()`.
+    """
+
+    def __init__(self, lib_builders):
+        self.size = len(lib_builders)
+        self._roots = {}
+        self._real_roots = {}
+        # builders with a custom containment check
+        self._custom = []
+        for index, lb in enumerate(lib_builders):
+            if type(lb).__contains__ is not LibBuilderBase.__contains__:
+                self._custom.append((index, lb))
+                continue
+            self._roots.setdefault(self.normalize(lb.path), (index, lb))
+            self._real_roots.setdefault(
+                self.normalize(os.path.realpath(lb.path)), (index, lb)
+            )
+
+    @staticmethod
+    def normalize(path):
+        return path.lower() if IS_WINDOWS else path
+
+    @staticmethod
+    def _lookup(roots, path, candidates):
+        while True:
+            if path in roots:
+                candidates.append(roots[path])
+            parent = os.path.dirname(path)
+            if parent == path:
+                return
+            path = parent
+
+    def find(self, path):
+        candidates = []
+        self._lookup(self._roots, self.normalize(path), candidates)
+        self._lookup(
+            self._real_roots, self.normalize(os.path.realpath(path)), candidates
+        )
+        candidates.extend(item for item in self._custom if path in item[1])
+        if not candidates:
+            return None
+        return min(candidates, key=lambda item: (not item[1].is_dependent, item[0]))[1]
+
+
 class LibBuilderBase:
     CLASSIC_SCANNER = SCons.Scanner.C.CScanner()
     CCONDITIONAL_SCANNER = SCons.Scanner.C.CConditionalScanner()
@@ -121,8 +307,9 @@ class LibBuilderBase:
     _INCLUDE_DIRS_CACHE = None
 
     def __init__(self, env, path, manifest=None, verbose=False):
-        self.env = env.Clone()
-        self.envorigin = env.Clone()
+        self._base_env = env
+        self._env = None
+        self._envorigin = None
         self.path = os.path.abspath(env.subst(path))
         self.verbose = verbose
 
@@ -140,18 +327,47 @@ class LibBuilderBase:
 
         self._deps_are_processed = False
         self._circular_deps = []
-        self._processed_search_files = []
+        # an ordered set of the scanned files
+        self._processed_search_files = {}
+
+        # the build environment of a library without extra options
+        # is created later, when the LDF selects it
+        if (
+            type(self).process_extra_options is not LibBuilderBase.process_extra_options
+            or self.has_extra_options()
+        ):
+            self._init_env()
+
+    def _init_env(self):
+        self._env = self._base_env.Clone()
+        self._envorigin = self._base_env.Clone()
 
         # pass a macro to the projenv + libs
-        if "test" in env["BUILD_TYPE"]:
-            self.env.Append(CPPDEFINES=["PIO_UNIT_TESTING"])
+        if "test" in self._env["BUILD_TYPE"]:
+            self._env.Append(CPPDEFINES=["PIO_UNIT_TESTING"])
 
         # reset source filter, could be overridden with extra script
-        self.env["SRC_FILTER"] = ""
+        self._env["SRC_FILTER"] = ""
 
         # process extra options and append to build environment
         self.process_extra_options()
 
+    @property
+    def env(self):
+        if self._env is None:
+            self._init_env()
+        return self._env
+
+    @env.setter
+    def env(self, value):
+        self._env = value
+
+    @property
+    def envorigin(self):
+        if self._envorigin is None:
+            self._init_env()
+        return self._envorigin
+
     def __repr__(self):
         return "%s(%r)" % (self.__class__, self.path)
 
@@ -269,7 +485,7 @@ class LibBuilderBase:
 
     @property
     def lib_compat_mode(self):
-        return self.env.GetProjectOption("lib_compat_mode")
+        return self._base_env.GetProjectOption("lib_compat_mode")
 
     @staticmethod
     def validate_compat_mode(mode):
@@ -293,6 +509,16 @@ class LibBuilderBase:
     def load_manifest(self):
         return {}
 
+    @staticmethod
+    def load_manifest_file(path):
+        manifest_index = DefaultEnvironment().get("__PIO_LIB_MANIFEST_INDEX")
+        if manifest_index:
+            return manifest_index.load(path)
+        return ManifestParserFactory.new_from_file(path).as_dict()
+
+    def has_extra_options(self):
+        return bool(self.build_flags or self.build_unflags or self.extra_script)
+
     def process_extra_options(self):
         with fs.cd(self.path):
             self.env.ProcessFlags(self.build_flags)
@@ -352,9 +578,7 @@ class LibBuilderBase:
             )
         ]
 
-    def get_implicit_includes(  # pylint: disable=too-many-branches
-        self, search_files=None
-    ):
+    def get_implicit_includes(self, search_files=None):
         # all include directories
         if not LibBuilderBase._INCLUDE_DIRS_CACHE:
             LibBuilderBase._INCLUDE_DIRS_CACHE = [
@@ -372,13 +596,53 @@ class LibBuilderBase:
         include_dirs = [self.env.Dir(d) for d in self.get_include_dirs()]
         include_dirs.extend(LibBuilderBase._INCLUDE_DIRS_CACHE)
 
-        result = []
         search_files = search_files or []
+        ldf_cache = DefaultEnvironment().get("__PIO_LDF_CACHE")
+        if not ldf_cache:
+            return self._scan_implicit_includes(include_dirs, search_files)
+
+        cache_key = ldf_cache.compute_key(
+            self.path,
+            self.lib_ldf_mode,
+            self.CCONDITIONAL_SCANNER_DEPTH,
+            self.env.subst("$CPPDEFINES"),
+            [d.get_abspath() for d in include_dirs],
+            [self.env.File(f).get_abspath() for f in search_files],
+            list(self._processed_search_files),
+        )
+        entry = ldf_cache.get(cache_key)
+        if entry:
+            self._processed_search_files.update(dict.fromkeys(entry["processed"]))
+            return [self.env.File(path) for path in entry["result"]]
+
+        processed_nums = len(self._processed_search_files)
+        result = self._scan_implicit_includes(include_dirs, search_files)
+        processed = list(self._processed_search_files)[processed_nums:]
+        result_paths = [node.get_abspath() for node in result]
+        ldf_cache.set(
+            cache_key,
+            dict(
+                result=result_paths,
+                processed=processed,
+                deps=ldf_cache.compute_deps(
+                    result_paths, processed, [d.get_abspath() for d in include_dirs]
+                ),
+            ),
+        )
+        return result
+
+    def _scan_implicit_includes(  # pylint: disable=too-many-branches
+        self, include_dirs, search_files
+    ):
+        result = []
+        result_set = set()
+        search_files = collections.deque(search_files)
+        queued_files = set(search_files)
         while search_files:
-            node = self.env.File(search_files.pop(0))
+            node = self.env.File(search_files.popleft())
             if node.get_abspath() in self._processed_search_files:
                 continue
-            self._processed_search_files.append(node.get_abspath())
+            self._processed_search_files[node.get_abspath()] = None
 
             try:
                 assert "+" in self.lib_ldf_mode
@@ -405,12 +669,14 @@ class LibBuilderBase:
                 # process internal files recursively
                 if (
                     item_path not in self._processed_search_files
-                    and item_path not in search_files
+                    and item_path not in queued_files
                     and item_path in self
                 ):
                     search_files.append(item_path)
-                if item not in result:
+                    queued_files.add(item_path)
+                if item not in result_set:
                     result.append(item)
+                    result_set.add(item)
                 if not self.PARSE_SRC_BY_H_NAME:
                     continue
                 if not fs.path_endswith_ext(item_path, piobuild.SRC_HEADER_EXT):
@@ -420,8 +686,9 @@ class LibBuilderBase:
                     if not os.path.isfile("%s.%s" % (item_fname, ext)):
                         continue
                     item_c_node = self.env.File("%s.%s" % (item_fname, ext))
-                    if item_c_node not in result:
+                    if item_c_node not in result_set:
                         result.append(item_c_node)
+                        result_set.add(item_c_node)
 
         return result
 
@@ -435,15 +702,15 @@ class LibBuilderBase:
         if self.lib_ldf_mode.startswith("deep"):
             search_files = self.get_search_files()
 
+        lib_index = GetLibBuildersPathIndex(self.env)
         lib_inc_map = {}
         for inc in self.get_implicit_includes(search_files):
             inc_path = inc.get_abspath()
-            for lb in self.env.GetLibBuilders():
-                if inc_path in lb:
-                    if lb not in lib_inc_map:
-                        lib_inc_map[lb] = []
-                    lib_inc_map[lb].append(inc_path)
-                    break
+            lb = lib_index.find(inc_path)
+            if lb:
+                if lb not in lib_inc_map:
+                    lib_inc_map[lb] = []
+                lib_inc_map[lb].append(inc_path)
 
         for lb, lb_search_files in lib_inc_map.items():
             self.depend_on(lb, search_files=lb_search_files)
@@ -538,7 +805,7 @@ class ArduinoLibBuilder(LibBuilderBase):
         manifest_path = os.path.join(self.path, "library.properties")
         if not os.path.isfile(manifest_path):
             return {}
-        return ManifestParserFactory.new_from_file(manifest_path).as_dict()
+        return self.load_manifest_file(manifest_path)
 
     @property
     def include_dir(self):
@@ -618,6 +885,12 @@ class ArduinoLibBuilder(LibBuilderBase):
             PackageCompatibility(platforms=self._manifest.get("platforms"))
         )
 
+    def has_extra_options(self):
+        return bool(
+            self._manifest.get("ldflags")
+            or self._manifest.get("precompiled") in ("true", "full")
+        )
+
     @property
     def build_flags(self):
         ldflags = [
@@ -642,7 +915,7 @@ class MbedLibBuilder(LibBuilderBase):
         manifest_path = os.path.join(self.path, "module.json")
         if not os.path.isfile(manifest_path):
             return {}
-        return ManifestParserFactory.new_from_file(manifest_path).as_dict()
+        return self.load_manifest_file(manifest_path)
 
     @property
     def src_dir(self):
@@ -786,7 +1059,7 @@ class PlatformIOLibBuilder(LibBuilderBase):
         manifest_path = os.path.join(self.path, "library.json")
         if not os.path.isfile(manifest_path):
             return {}
-        return ManifestParserFactory.new_from_file(manifest_path).as_dict()
+        return self.load_manifest_file(manifest_path)
 
     def _has_arduino_manifest(self):
         return os.path.isfile(os.path.join(self.path, "library.properties"))
@@ -810,7 +1083,8 @@ class PlatformIOLibBuilder(LibBuilderBase):
         ):
             include_dirs.append(os.path.join(self.path, "utility"))
 
-        for path in self.env.get("CPPPATH", []):
+        # include paths added by the extra options of the library
+        for path in self._env.get("CPPPATH", []) if self._env else []:
             if path not in include_dirs and path not in self.envorigin.get(
                 "CPPPATH", []
             ):
@@ -1095,6 +1369,10 @@ def GetLibBuilders(_):  # pylint: disable=too-many-branches
         )
 
     env.Replace(__PIO_LIB_BUILDERS=[])
+    manifest_index = LibManifestIndex(
+        env.subst(os.path.join("$BUILD_DIR", "libmanifests.json"))
+    )
+    env.Replace(__PIO_LIB_MANIFEST_INDEX=manifest_index)
 
     verbose = int(ARGUMENTS.get("PIOVERBOSE", 0))
     found_incompat = False
@@ -1124,6 +1402,9 @@ def GetLibBuilders(_):  # pylint: disable=too-many-branches
             else:
                 found_incompat = True
 
+    manifest_index.save()
+    env.Replace(__PIO_LIB_MANIFEST_INDEX=None)
+
     for lb in env.get("EXTRA_LIB_BUILDERS", []):
         if env.IsCompatibleLibBuilder(lb):
             env.Append(__PIO_LIB_BUILDERS=[lb])
@@ -1140,7 +1421,17 @@ def GetLibBuilders(_):  # pylint: disable=too-many-branches
     return env["__PIO_LIB_BUILDERS"]
 
 
-def ConfigureProjectLibBuilder(env):
+def GetLibBuildersPathIndex(env):
+    lib_builders = env.GetLibBuilders()
+    denv = DefaultEnvironment()
+    index = denv.get("__PIO_LIB_BUILDERS_INDEX")
+    if not index or index.size != len(lib_builders):
+        index = LibBuilderPathIndex(denv["__PIO_LIB_BUILDERS"])
+        denv.Replace(__PIO_LIB_BUILDERS_INDEX=index)
+    return index
+
+
+def ConfigureProjectLibBuilder(env):  # pylint: disable=too-many-statements
     _pm_storage = {}
 
     def _get_lib_license(pkg):
@@ -1206,12 +1497,18 @@ def ConfigureProjectLibBuilder(env):
     lib_builders = env.GetLibBuilders()
     click.echo("Found %d compatible libraries" % len(lib_builders))
 
+    ldf_cache = LDFCache(env.subst(os.path.join("$BUILD_DIR", "ldfcache.json")))
+    env.Replace(__PIO_LDF_CACHE=ldf_cache)
     click.echo("Scanning dependencies...")
     project.search_deps_recursive()
 
     if ldf_mode.startswith("chain") and project.depbuilders:
         _correct_found_libs(lib_builders)
 
+    ldf_cache.save()
+    if int(ARGUMENTS.get("PIOVERBOSE", 0)):
+        click.echo("LDF Cache: %d hits, %d misses" % (ldf_cache.hits, ldf_cache.misses))
+
     if project.depbuilders:
         click.echo("Dependency Graph")
         _print_deps_tree(project)
@@ -1229,5 +1526,6 @@ def generate(env):
     env.AddMethod(GetLibSourceDirs)
     env.AddMethod(IsCompatibleLibBuilder)
     env.AddMethod(GetLibBuilders)
+    env.AddMethod(GetLibBuildersPathIndex)
     env.AddMethod(ConfigureProjectLibBuilder)
     return env
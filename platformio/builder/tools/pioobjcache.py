@@ -0,0 +1,267 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+
+from SCons.Action import LazyAction, get_default_ENV  # pylint: disable=import-error
+from SCons.Errors import BuildError  # pylint: disable=import-error
+from SCons.Subst import escape_list  # pylint: disable=import-error
+from SCons.Util import flatten_sequence, is_List  # pylint: disable=import-error
+
+from platformio import app
+from platformio.cache import BuildObjectCache
+from platformio.proc import where_is_program
+
+OBJECT_CACHE_FORMAT = 2
+CACHEABLE_COMMANDS = ("CCCOM", "CXXCOM", "ASPPCOM")
+
+
+class ObjectCacheAction(LazyAction):
+    """Compiles an object or takes it from the global build object cache.
+
+    The key of an object is a hash of the preprocessed source and of the
+    compiler command line, where the paths to the project, the build and the
+    library dependencies directories are replaced with placeholders. The
+    preprocessed source is hashed as is: it carries the real paths of the
+    sources which end up in the `__FILE__` strings and the debug information,
+    so only the sources at the same location (e.g., frameworks and tools from
+    the packages directory) share objects between projects and environments.
+    """
+
+    _compiler_ids = {}
+    _stats_lock = threading.Lock()
+    stats = {"hits": 0, "misses": 0, "stored": 0}
+
+    def __init__(self, action, cache):
+        super().__init__(action.var, action.gen_kw)
+        self.cache = cache
+
+    def execute(self, target, source, env, executor=None):
+        if executor:
+            target = executor.get_all_targets()
+            source = executor.get_all_sources()
+        key = self.compute_key(target, source, env) if len(target) == 1 else None
+        if not key:
+            return super().execute(target, source, env, executor)
+
+        log = self.cache.fetch(key, target[0].get_abspath())
+        if log is not None:
+            self._update_stats("hits")
+            if log:
+                sys.stderr.write(log)
+            return 0
+
+        self._update_stats("misses")
+        status, log = self.spawn_with_log(target, source, env)
+        if status:
+            return status
+        try:
+            self.cache.store(key, target[0].get_abspath(), log)
+            self._update_stats("stored")
+        except OSError:
+            pass
+        return 0
+
+    @classmethod
+    def _update_stats(cls, name):
+        with cls._stats_lock:
+            cls.stats[name] += 1
+
+    @staticmethod
+    def get_shell_env(env):
+        result = {}
+        for key, value in get_default_ENV(env).items():
+            if is_List(value):
+                value = os.pathsep.join(str(v) for v in flatten_sequence(value))
+            result[key] = str(value)
+        return result
+
+    def spawn(self, cmd_line, env, stdout, stderr):
+        cmd_line = escape_list(cmd_line, env.get("ESCAPE", lambda x: x))
+        return env["PSPAWN"](
+            env["SHELL"],
+            env.get("ESCAPE", lambda x: x),
+            cmd_line[0],
+            cmd_line,
+            self.get_shell_env(env),
+            stdout,
+            stderr,
+        )
+
+    def spawn_with_log(self, target, source, env):
+        """Executes the original command and keeps its diagnostics"""
+        cmd_list, ignore, _ = self.process(target, source, env)
+        log = ""
+        for cmd_line in filter(len, cmd_list):
+            with tempfile.TemporaryFile() as fp:
+                status = self.spawn(cmd_line, env, sys.stdout, fp)
+                fp.seek(0)
+                output = fp.read().decode("utf8", "replace")
+            if output:
+                sys.stderr.write(output)
+                log += output
+            if status and not ignore:
+                return (
+                    BuildError(
+                        errstr="Error %s" % status,
+                        status=status,
+                        action=self,
+                        command=cmd_line,
+                    ),
+                    log,
+                )
+        return 0, log
+
+    def compute_key(self, target, source, env):
+        # resolve command line without moving long arguments to a temporary file
+        cmd_list, _, _ = self.process(
+            target, source, env, overrides={"TEMPFILE": lambda cmd, cmdstr=None: cmd}
+        )
+        if len(cmd_list) != 1 or "-c" not in cmd_list[0]:
+            return None
+        args = [str(arg) for arg in cmd_list[0]]
+        target_paths = (str(target[0]), target[0].get_abspath())
+        pp_args = []
+        has_output = False
+        for index, arg in enumerate(args):
+            if arg in ("-c", "-o"):
+                continue
+            if (arg in target_paths and args[index - 1] == "-o") or (
+                arg.startswith("-o") and arg[2:] in target_paths
+            ):
+                has_output = True
+                continue
+            pp_args.append(arg)
+        if not has_output:
+            return None
+
+        compiler_id = self.get_compiler_id(pp_args[0], env)
+        preprocessed = self.preprocess(pp_args + ["-E"], env)
+        if not compiler_id or preprocessed is None:
+            return None
+
+        h = hashlib.sha256()
+        h.update(("%s:%s" % (OBJECT_CACHE_FORMAT, compiler_id)).encode())
+        prefixes = self.get_path_prefixes(env)
+        for arg in pp_args[1:]:
+            h.update(self.normalize_paths(arg, prefixes).encode() + b"\0")
+        # debug information refers to the current working directory
+        if any(arg.startswith("-g") and not arg.endswith("0") for arg in pp_args):
+            h.update(os.getcwd().encode())
+        h.update(preprocessed)
+        return h.hexdigest()
+
+    @classmethod
+    def get_compiler_id(cls, program, env):
+        if program not in cls._compiler_ids:
+            path = program
+            if not os.path.isabs(path):
+                path = where_is_program(path, cls.get_shell_env(env).get("PATH"))
+            try:
+                stat = os.stat(path)
+                cls._compiler_ids[program] = "%s:%d:%d" % (
+                    path,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                )
+            except OSError:
+                cls._compiler_ids[program] = None
+        return cls._compiler_ids[program]
+
+    def preprocess(self, args, env):
+        with tempfile.TemporaryFile() as out_fp, tempfile.TemporaryFile() as err_fp:
+            if self.spawn(args, env, out_fp, err_fp) != 0:
+                return None
+            out_fp.seek(0)
+            return out_fp.read()
+
+    @staticmethod
+    def get_path_prefixes(env):
+        project_dir = env.subst("$PROJECT_DIR")
+        items = []
+        for path, placeholder in (
+            (env.subst("$BUILD_DIR"), "$BUILD_DIR"),
+            (env.subst(os.path.join("$PROJECT_LIBDEPS_DIR", "$PIOENV")), "$LIBDEPS"),
+            (project_dir, "$PROJECT_DIR"),
+        ):
+            path = os.path.abspath(path)
+            items.append((path, placeholder))
+            if path.startswith(project_dir + os.sep):
+                items.append((os.path.relpath(path, project_dir), placeholder))
+        # replace absolute paths at first
+        return sorted(items, key=lambda item: not os.path.isabs(item[0]))
+
+    @staticmethod
+    def normalize_paths(data, prefixes):
+        for path, placeholder in prefixes:
+            data = data.replace(path, placeholder)
+        return data
+
+
+def ConfigureBuildObjectCache(env):
+    if not app.get_setting(
+        "enable_build_object_cache"
+    ) or env.GetCompilerType() not in (
+        "gcc",
+        "clang",
+    ):
+        return None
+    cache = BuildObjectCache()
+    # a dictionary of actions per a source file suffix
+    actions = getattr(env["BUILDERS"]["Object"].action, "generator", None)
+    if not isinstance(actions, dict):
+        return None
+    wrapped_actions = {}
+    for suffix, action in list(actions.items()):
+        if (
+            not isinstance(action, LazyAction)
+            or isinstance(action, ObjectCacheAction)
+            or action.var not in CACHEABLE_COMMANDS
+        ):
+            continue
+        if id(action) not in wrapped_actions:
+            wrapped_actions[id(action)] = ObjectCacheAction(action, cache)
+        actions[suffix] = wrapped_actions[id(action)]
+
+    def _on_exit():
+        stats = ObjectCacheAction.stats
+        if not stats["hits"] and not stats["misses"]:
+            return
+        print(
+            "Build Object Cache: %d hits, %d misses (%d%%)"
+            % (
+                stats["hits"],
+                stats["misses"],
+                stats["hits"] * 100 / (stats["hits"] + stats["misses"]),
+            )
+        )
+        if stats["stored"]:
+            cache.evict(app.get_setting("build_object_cache_size") * 1024 * 1024)
+
+    atexit.register(_on_exit)
+    return cache
+
+
+def exists(_):
+    return True
+
+
+def generate(env):
+    env.AddMethod(ConfigureBuildObjectCache)
+    return env
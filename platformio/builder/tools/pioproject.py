@@ -17,7 +17,9 @@ from platformio.project.config import ProjectConfig
 
 
 def GetProjectConfig(env):
-    return ProjectConfig.get_instance(env["PROJECT_CONFIG"])
+    return ProjectConfig.get_instance(
+        env["PROJECT_CONFIG"], snapshot_path=env.get("PROJECT_CONFIG_SNAPSHOT")
+    )
 
 
 def GetProjectOptions(env, as_dict=False):
@@ -14,63 +14,246 @@
 
 # pylint: disable=too-many-locals
 
+import functools
 import json
+import struct
+import subprocess
 import sys
-from os import environ, makedirs, remove
+from bisect import bisect_right
+from os import environ, makedirs
 from os.path import isdir, join, splitdrive
 
 from elftools.elf.descriptions import describe_sh_flags
 from elftools.elf.elffile import ELFFile
+from elftools.elf.sections import NoteSection
 
+from platformio import fs
+from platformio.cache import JSONFileCache
 from platformio.compat import IS_WINDOWS
-from platformio.proc import exec_command
 
 
-def _run_tool(cmd, env, tool_args):
-    sysenv = environ.copy()
-    sysenv["PATH"] = str(env["ENV"]["PATH"])
+class SymbolResolverTool:
+    """Keeps a binutils tool which reads the requests from stdin running.
 
-    build_dir = env.subst("$BUILD_DIR")
-    if not isdir(build_dir):
-        makedirs(build_dir)
-    tmp_file = join(build_dir, "size-data-longcmd.txt")
+    The requests are written in small batches and every request is paired
+    with exactly one line of the output, so the tool is started only once
+    and no argument files are needed.
+    """
 
-    with open(tmp_file, mode="w", encoding="utf8") as fp:
-        fp.write("\n".join(tool_args))
+    BATCH_SIZE = 1024  # bytes, fits the smallest pipe buffer with the output
 
-    cmd.append("@" + tmp_file)
-    result = exec_command(cmd, env=sysenv)
-    remove(tmp_file)
+    def __init__(self, cmd, env):
+        self.cmd = cmd
+        self.env = env
+        self._proc = None
 
-    return result
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excinfo):
+        self.close()
+
+    def _start(self):
+        sysenv = environ.copy()
+        sysenv["PATH"] = str(self.env["ENV"]["PATH"])
+        self._proc = subprocess.Popen(  # pylint: disable=consider-using-with
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=sysenv,
+            encoding="utf8",
+            errors="replace",
+        )
+
+    def close(self):
+        if not self._proc:
+            return
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        self._proc.wait()
+        self._proc.stdout.close()
+        self._proc = None
+
+    def resolve(self, requests):
+        result = {}
+        batch = []
+        batch_size = 0
+        try:
+            for request in requests:
+                batch.append(request)
+                batch_size += len(request) + 1
+                if batch_size >= self.BATCH_SIZE:
+                    result.update(self._resolve_batch(batch))
+                    batch = []
+                    batch_size = 0
+            if batch:
+                result.update(self._resolve_batch(batch))
+        except OSError as exc:
+            sys.stderr.write(
+                "Warning! Could not run `%s`: %s\n" % (" ".join(self.cmd), exc)
+            )
+        return result
+
+    def _resolve_batch(self, batch):
+        if not self._proc:
+            self._start()
+        self._proc.stdin.write("".join(request + "\n" for request in batch))
+        self._proc.stdin.flush()
+        result = {}
+        for request in batch:
+            line = self._proc.stdout.readline()
+            if not line:
+                raise OSError("unexpected end of the output")
+            result[request] = line.strip()
+        return result
+
+
+class SymbolInfoCache(JSONFileCache):
+    """Persistent results of the symbol resolution for the current ELF file.
+
+    The cache is keyed by the GNU build ID of the ELF file (or by a digest
+    of its content when the linker does not emit it), so the repeated
+    memory inspections of an unchanged firmware do not run the tools.
+    """
+
+    def __init__(self, path, elf_id):
+        super().__init__(path, elf_id=elf_id)
+
+    def resolve(self, kind, requests, resolver):
+        entries = self._data.setdefault(kind, {})
+        missed = [request for request in requests if request not in entries]
+        if missed:
+            entries.update(resolver(missed))
+            self._modified = True
+        return entries
+
+
+def _get_elf_id(elffile, elf_path):
+    section = elffile.get_section_by_name(".note.gnu.build-id")
+    if section and isinstance(section, NoteSection):
+        for note in section.iter_notes():
+            if note["n_type"] == "NT_GNU_BUILD_ID":
+                return "build-id:%s" % note["n_desc"]
+    return "sha1:%s" % fs.calculate_file_hashsum("sha1", elf_path)
+
+
+class SectionAddressIndex:
+    """Maps an address to the first flash or RAM section which contains it.
+
+    The result is the same as of `pioSizeDetermineSection()`, but a lookup
+    is a binary search over the sorted boundaries of the sections instead
+    of a scan over all sections.
+    """
+
+    def __init__(self, sections):
+        intervals = [
+            (info["start_addr"], info["start_addr"] + info["size"], name)
+            for name, info in sections.items()
+            if info.get("in_flash", False) or info.get("in_ram", False)
+        ]
+        self._bounds = sorted(set(addr for item in intervals for addr in item[:2]))
+        # the owner of every interval between the adjacent boundaries
+        self._owners = [
+            next(
+                (name for start, end, name in intervals if start <= addr < end),
+                None,
+            )
+            for addr in self._bounds[:-1]
+        ]
+
+    def find(self, addr):
+        index = bisect_right(self._bounds, addr) - 1
+        if 0 <= index < len(self._owners) and self._owners[index]:
+            return self._owners[index]
+        return "unknown"
+
+
+def _iter_symbol_entries(elffile, symbol_section):
+    """Yields (name, value, size, bind, type) of the symbol table entries.
+
+    The table is unpacked at once, the construct-based parser of pyelftools
+    is used only for the 256 possible values of `st_info`.
+    """
+    elfclass = elffile.elfclass
+    entry_format = ("<" if elffile.little_endian else ">") + (
+        "IIIBBH" if elfclass == 32 else "IBBHQQ"
+    )
+    entry_size = symbol_section["sh_entsize"]
+    if struct.calcsize(entry_format) != entry_size:
+        for s in symbol_section.iter_symbols():
+            yield (
+                s.name,
+                s["st_value"],
+                s["st_size"],
+                s.entry["st_info"]["bind"],
+                s.entry["st_info"]["type"],
+            )
+        return
+
+    info_offset = 12 if elfclass == 32 else 4
+    st_info_table = []
+    for value in range(256):
+        raw = bytearray(entry_size)
+        raw[info_offset] = value
+        st_info = elffile.structs.Elf_Sym.parse(bytes(raw))["st_info"]
+        st_info_table.append((st_info["bind"], st_info["type"]))
+
+    stringtable = symbol_section.stringtable
+    strings = stringtable.data()
+    data = symbol_section.data()[: symbol_section.num_symbols() * entry_size]
+    for entry in struct.iter_unpack(entry_format, data):
+        if elfclass == 32:
+            name_offset, value, size, info = entry[:4]
+        else:
+            name_offset, info, value, size = entry[0], entry[1], entry[4], entry[5]
+        name_end = strings.find(b"\0", name_offset)
+        if name_end == -1:
+            name = stringtable.get_string(name_offset)
+        else:
+            name = strings[name_offset:name_end].decode("utf-8", errors="replace")
+        yield (name, value, size) + st_info_table[info]
 
 
 def _get_symbol_locations(env, elf_path, addrs):
     if not addrs:
         return {}
     cmd = [env.subst("$CC").replace("-gcc", "-addr2line"), "-e", elf_path]
-    result = _run_tool(cmd, env, addrs)
-    locations = [line for line in result["out"].split("\n") if line]
-    assert len(addrs) == len(locations)
-
-    return dict(zip(addrs, [loc.strip() for loc in locations]))
+    with SymbolResolverTool(cmd, env) as tool:
+        return tool.resolve(addrs)
 
 
 def _get_demangled_names(env, mangled_names):
     if not mangled_names:
         return {}
-    result = _run_tool(
-        [env.subst("$CC").replace("-gcc", "-c++filt")], env, mangled_names
-    )
-    demangled_names = [line for line in result["out"].split("\n") if line]
-    assert len(mangled_names) == len(demangled_names)
+    with SymbolResolverTool(
+        [env.subst("$CC").replace("-gcc", "-c++filt")], env
+    ) as tool:
+        return {
+            name: demangled_name.replace("::__FUNCTION__", "")
+            for name, demangled_name in tool.resolve(mangled_names).items()
+        }
 
-    return dict(
-        zip(
-            mangled_names,
-            [dn.strip().replace("::__FUNCTION__", "") for dn in demangled_names],
-        )
+
+def _resolve_symbols_info(env, elffile, elf_path, addrs, mangled_names):
+    build_dir = env.subst("$BUILD_DIR")
+    if not isdir(build_dir):
+        makedirs(build_dir)
+    cache = SymbolInfoCache(
+        join(build_dir, "sizedata-symbols.json"), _get_elf_id(elffile, elf_path)
     )
+    symbol_locations = cache.resolve(
+        "locations", addrs, functools.partial(_get_symbol_locations, env, elf_path)
+    )
+    demangled_names = cache.resolve(
+        "demangled_names",
+        mangled_names,
+        functools.partial(_get_demangled_names, env),
+    )
+    cache.save()
+    return symbol_locations, demangled_names
 
 
 def _collect_sections_info(env, elffile):
@@ -106,37 +289,43 @@ def _collect_symbols_info(env, elffile, elf_path, sections):
         sys.stderr.write("Couldn't find symbol table. Is ELF file stripped?")
         env.Exit(1)
 
-    sysenv = environ.copy()
-    sysenv["PATH"] = str(env["ENV"]["PATH"])
-
-    symbol_addrs = []
-    mangled_names = []
-    for s in symbol_section.iter_symbols():
-        symbol_info = s.entry["st_info"]
-        symbol_addr = s["st_value"]
-        symbol_size = s["st_size"]
-        symbol_type = symbol_info["type"]
-
-        if not env.pioSizeIsValidSymbol(s.name, symbol_type, symbol_addr):
+    # the default section lookup is replaced with an indexed one
+    if getattr(env.pioSizeDetermineSection, "method", None) is pioSizeDetermineSection:
+        determine_section = SectionAddressIndex(sections).find
+    else:
+        determine_section = functools.partial(env.pioSizeDetermineSection, sections)
+
+    symbol_addrs = {}
+    mangled_names = {}
+    for (
+        symbol_name,
+        symbol_addr,
+        symbol_size,
+        symbol_bind,
+        symbol_type,
+    ) in _iter_symbol_entries(elffile, symbol_section):
+        if not env.pioSizeIsValidSymbol(symbol_name, symbol_type, symbol_addr):
             continue
 
         symbol = {
             "addr": symbol_addr,
-            "bind": symbol_info["bind"],
-            "name": s.name,
+            "bind": symbol_bind,
+            "name": symbol_name,
             "type": symbol_type,
             "size": symbol_size,
-            "section": env.pioSizeDetermineSection(sections, symbol_addr),
+            "section": determine_section(symbol_addr),
         }
 
-        if s.name.startswith("_Z"):
-            mangled_names.append(s.name)
+        if symbol_name.startswith("_Z"):
+            mangled_names[symbol_name] = None
 
-        symbol_addrs.append(hex(symbol_addr))
+        symbol_addrs[hex(symbol_addr)] = None
         symbols.append(symbol)
 
-    symbol_locations = _get_symbol_locations(env, elf_path, symbol_addrs)
-    demangled_names = _get_demangled_names(env, mangled_names)
+    # the tools are queried once per a unique address and name
+    symbol_locations, demangled_names = _resolve_symbols_info(
+        env, elffile, elf_path, list(symbol_addrs), list(mangled_names)
+    )
     for symbol in symbols:
         if symbol["name"].startswith("_Z"):
             symbol["demangled_name"] = demangled_names.get(symbol["name"])
@@ -13,6 +13,9 @@
 # limitations under the License.
 
 import os
+import sys
+
+from SCons.Node import FS  # pylint: disable=import-error
 
 from platformio.builder.tools import piobuild
 from platformio.test.result import TestSuite
@@ -26,13 +29,27 @@ def ConfigureTestTarget(env):
     )
     env.Prepend(CPPPATH=["$PROJECT_TEST_DIR"])
 
-    if "PIOTEST_RUNNING_NAME" in env:
-        test_name = env["PIOTEST_RUNNING_NAME"]
-        while True:
-            test_name = os.path.dirname(test_name)  # parent dir
-            # skip nested tests (user's side issue?)
-            if not test_name or os.path.basename(test_name).startswith("test_"):
-                break
+    if "PIOTEST_RUNNING_NAMES" in env:
+        # the sources of test groups are shared between the test suites
+        for test_name in env["PIOTEST_RUNNING_NAMES"]:
+            for group_name in GetTestGroupNames(test_name):
+                env.AppendUnique(
+                    PIOTEST_SRC_FILTER=[
+                        f"+<{group_name}{os.path.sep}*.{ext}>"
+                        for ext in piobuild.SRC_BUILD_EXT
+                    ],
+                    CPPPATH=[os.path.join("$PROJECT_TEST_DIR", group_name)],
+                )
+        env.Replace(PIOTEST_SHARED_SRC_FILTER=list(env["PIOTEST_SRC_FILTER"]))
+        # the LDF scans the sources of all test suites
+        env.Append(
+            PIOTEST_SRC_FILTER=[
+                f"+<{test_name}{os.path.sep}>"
+                for test_name in env["PIOTEST_RUNNING_NAMES"]
+            ]
+        )
+    elif "PIOTEST_RUNNING_NAME" in env:
+        for test_name in GetTestGroupNames(env["PIOTEST_RUNNING_NAME"]):
             env.Prepend(
                 PIOTEST_SRC_FILTER=[
                     f"+<{test_name}{os.path.sep}*.{ext}>"
@@ -53,8 +70,68 @@ def ConfigureTestTarget(env):
     test_runner.configure_build_env(env)
 
 
+def GetTestGroupNames(test_name):
+    """Parent directories of a test suite which are not test suites"""
+    result = []
+    while True:
+        test_name = os.path.dirname(test_name)  # parent dir
+        # skip nested tests (user's side issue?)
+        if not test_name or os.path.basename(test_name).startswith("test_"):
+            break
+        result.append(test_name)
+    return result
+
+
+def BuildTestSuiteSources(env, projenv):
+    """Builds the sources of every test suite of a shared test build"""
+    test_names = env["PIOTEST_RUNNING_NAMES"]
+    result = {}
+    # the test names use forward slashes, the source filters use native ones
+    test_dirs = {name: os.path.normpath(name) for name in test_names}
+    for test_name in test_names:
+        test_dir = test_dirs[test_name]
+        # exclude the nested test suites, they are built on their own
+        src_filter = [f"+<{test_dir}{os.path.sep}>"] + [
+            f"-<{nested_dir}{os.path.sep}>"
+            for nested_dir in test_dirs.values()
+            if nested_dir.startswith(test_dir + os.path.sep)
+        ]
+        suite_env = projenv.Clone()
+        suite_env.Prepend(CPPPATH=[os.path.join("$PROJECT_TEST_DIR", test_name)])
+        nodes = suite_env.CollectBuildFiles(
+            "$BUILD_TEST_DIR", "$PROJECT_TEST_DIR", src_filter
+        )
+        if not nodes:
+            sys.stderr.write(
+                "Error: Nothing to build. Please put your test suite sources "
+                "to the '%s' folder\n"
+                % os.path.join(env.subst("$PROJECT_TEST_DIR"), test_name)
+            )
+            env.Exit(1)
+        result[test_name] = [
+            suite_env.Object(node) if isinstance(node, FS.File) else node
+            for node in nodes
+        ]
+    env.Replace(PIOTEST_BUILDFILES=result)
+
+
+def BuildTestPrograms(env):
+    """Links a program per a test suite, the common objects are shared"""
+    programs = []
+    for test_name, nodes in env["PIOTEST_BUILDFILES"].items():
+        programs.extend(
+            env.Program(
+                os.path.join("$BUILD_TEST_DIR", test_name, "$PROGNAME$PROGSUFFIX"),
+                env.get("PIOBUILDFILES", []) + nodes,
+            )
+        )
+    return programs
+
+
 def generate(env):
     env.AddMethod(ConfigureTestTarget)
+    env.AddMethod(BuildTestSuiteSources)
+    env.AddMethod(BuildTestPrograms)
 
 
 def exists(_):
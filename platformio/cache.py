@@ -14,26 +14,31 @@
 
 import codecs
 import hashlib
+import json
 import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
 from time import time
 
-from platformio import app, fs
+from platformio import __version__, app, exception, fs
 from platformio.compat import hashlib_encode_data
 from platformio.package.lockfile import LockFile
 from platformio.project.helpers import get_project_cache_dir
 
+try:
+    import sqlite3
+except ImportError:  # Python is built without SQLite support
+    sqlite3 = None
 
-class ContentCache:
+
+class ContentCacheBase(ABC):
     def __init__(self, namespace=None):
         self.cache_dir = os.path.join(get_project_cache_dir(), namespace or "content")
-        self._db_path = os.path.join(self.cache_dir, "db.data")
-        self._lockfile = None
         if not os.path.isdir(self.cache_dir):
             os.makedirs(self.cache_dir)
 
     def __enter__(self):
-        # cleanup obsolete items
-        self.delete()
         return self
 
     def __exit__(self, type_, value, traceback):
@@ -47,6 +52,43 @@ class ContentCache:
                 h.update(hashlib_encode_data(arg))
         return h.hexdigest()
 
+    @staticmethod
+    def compute_expire_time(valid):
+        tdmap = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+        assert valid.endswith(tuple(tdmap))
+        return int(time() + tdmap[valid[-1]] * int(valid[:-1]))
+
+    @abstractmethod
+    def get(self, key):
+        pass
+
+    @abstractmethod
+    def set(self, key, data, valid):
+        pass
+
+    @abstractmethod
+    def delete(self, keys=None):
+        pass
+
+    def clean(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        fs.rmtree(self.cache_dir)
+
+
+class FileContentCache(ContentCacheBase):
+    """Legacy storage, every item is a file indexed by a flat `db.data` file"""
+
+    def __init__(self, namespace=None):
+        super().__init__(namespace)
+        self._db_path = os.path.join(self.cache_dir, "db.data")
+        self._lockfile = None
+
+    def __enter__(self):
+        # cleanup obsolete items
+        self.delete()
+        return self
+
     def get_cache_path(self, key):
         assert "/" not in key and "\\" not in key
         key = str(key)
@@ -68,9 +110,7 @@ class ContentCache:
             self.delete(key)
         if not data:
             return False
-        tdmap = {"s": 1, "m": 60, "h": 3600, "d": 86400}
-        assert valid.endswith(tuple(tdmap))
-        expire_time = int(time() + tdmap[valid[-1]] * int(valid[:-1]))
+        expire_time = self.compute_expire_time(valid)
 
         if not self._lock_dbindex():
             return False
@@ -135,11 +175,6 @@ class ContentCache:
 
         return True
 
-    def clean(self):
-        if not os.path.isdir(self.cache_dir):
-            return
-        fs.rmtree(self.cache_dir)
-
     def _lock_dbindex(self):
         self._lockfile = LockFile(self.cache_dir)
         try:
@@ -155,6 +190,338 @@ class ContentCache:
         return True
 
 
+class SQLiteContentCache(ContentCacheBase):
+    """Items are stored in a SQLite database in WAL mode.
+
+    Readers never wait for writers, expired items are swept in batches
+    at most once per `SWEEP_INTERVAL` seconds, and the least recently used
+    items are evicted when the storage exceeds `MAX_STORAGE_SIZE` bytes.
+    """
+
+    MAX_STORAGE_SIZE = 64 * 1024 * 1024
+    SWEEP_INTERVAL = 3600
+    SWEEP_BATCH_SIZE = 500
+    # do not rewrite access time on every read, LRU does not need it
+    ATIME_RESOLUTION = 3600
+    BUSY_TIMEOUT = 10
+
+    _conn = None
+
+    def __init__(self, namespace=None):
+        super().__init__(namespace)
+        self._db_path = os.path.join(self.cache_dir, "db.sqlite3")
+
+    def __enter__(self):
+        if time() - self._get_meta_value("last_sweep", 0) > self.SWEEP_INTERVAL:
+            self.delete()
+        return self
+
+    def __exit__(self, type_, value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def conn(self):
+        if self._conn:
+            return self._conn
+        # obsolete storage of the FileContentCache
+        if os.path.isfile(os.path.join(self.cache_dir, "db.data")):
+            fs.rmtree(self.cache_dir)
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self._conn = sqlite3.connect(
+            self._db_path, timeout=self.BUSY_TIMEOUT, isolation_level=None
+        )
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.DatabaseError:  # WAL is not supported by a file system
+            pass
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                key TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expire INTEGER NOT NULL,
+                atime INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS items_expire ON items(expire);
+            CREATE INDEX IF NOT EXISTS items_atime ON items(atime);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        return self._conn
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def _get_meta_value(self, name, default=None):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else default
+
+    def _set_meta_value(self, name, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value)
+        )
+
+    def get(self, key):
+        now = int(time())
+        row = self.conn.execute(
+            "SELECT data, atime FROM items WHERE key = ? AND expire > ?", (key, now)
+        ).fetchone()
+        if not row:
+            return None
+        if now - row[1] > self.ATIME_RESOLUTION:
+            try:
+                self.conn.execute(
+                    "UPDATE items SET atime = ? WHERE key = ?", (now, key)
+                )
+            except sqlite3.OperationalError:  # database is locked
+                pass
+        return row[0]
+
+    def set(self, key, data, valid):
+        if not app.get_setting("enable_cache"):
+            return False
+        if not data:
+            self.delete(key)
+            return False
+        try:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO items (key, data, size, expire, atime) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    data,
+                    len(hashlib_encode_data(data)),
+                    self.compute_expire_time(valid),
+                    int(time()),
+                ),
+            )
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    def delete(self, keys=None):
+        """Keys=None, delete expired items"""
+        if keys:
+            if not isinstance(keys, list):
+                keys = [keys]
+            try:
+                self.conn.executemany(
+                    "DELETE FROM items WHERE key = ?", [(key,) for key in keys]
+                )
+            except sqlite3.OperationalError:  # database is locked
+                return False
+            return True
+        try:
+            self._sweep()
+        except sqlite3.OperationalError:  # another process is sweeping
+            return False
+        return True
+
+    def _sweep(self):
+        now = int(time())
+        while True:
+            cursor = self.conn.execute(
+                "DELETE FROM items WHERE key IN "
+                "(SELECT key FROM items WHERE expire <= ? LIMIT ?)",
+                (now, self.SWEEP_BATCH_SIZE),
+            )
+            if cursor.rowcount < self.SWEEP_BATCH_SIZE:
+                break
+        # evict the least recently used items
+        total_size = self.conn.execute("SELECT SUM(size) FROM items").fetchone()[0]
+        while total_size and total_size > self.MAX_STORAGE_SIZE:
+            rows = self.conn.execute(
+                "SELECT key, size FROM items ORDER BY atime, rowid LIMIT ?",
+                (self.SWEEP_BATCH_SIZE,),
+            ).fetchall()
+            keys = []
+            for key, size in rows:
+                if total_size <= self.MAX_STORAGE_SIZE:
+                    break
+                keys.append((key,))
+                total_size -= size
+            self.conn.executemany("DELETE FROM items WHERE key = ?", keys)
+        self._set_meta_value("last_sweep", now)
+
+    def clean(self):
+        # keep the database file, it can be opened by other processes
+        try:
+            self.conn.execute("DELETE FROM items")
+        except sqlite3.OperationalError:  # database is locked
+            pass
+
+
+ContentCache = SQLiteContentCache if sqlite3 else FileContentCache
+
+
+class JSONFileCache:
+    """Base for the persistent caches stored as a single JSON file.
+
+    The stored entries are discarded when the file was written by another
+    PlatformIO version or with other `metadata` (e.g., an ID of the ELF file).
+    """
+
+    def __init__(self, path, **metadata):
+        self.path = path
+        self.metadata = metadata
+        self._data = {}
+        self._modified = False
+        self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        try:
+            data = fs.load_json(self.path)
+        except (exception.InvalidJSONFile, OSError):
+            return
+        if data.get("version") != __version__ or any(
+            data.get(name) != value for name, value in self.metadata.items()
+        ):
+            return
+        self._data = data.get("entries", {})
+
+    def _dump(self, entries):
+        """Writes `entries` to the file, returns False on a failure"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, mode="w", encoding="utf8") as fp:
+                json.dump(
+                    dict(version=__version__, entries=entries, **self.metadata), fp
+                )
+        except OSError:
+            return False
+        return True
+
+    def save(self):
+        if self._modified and self._dump(self._data):
+            self._modified = False
+
+
+class BuildObjectCache:
+    """Compiled objects shared between projects and build environments.
+
+    Items are addressed by a key computed by the build system. Every item
+    is an object file with optional compiler diagnostics next to it, and
+    the modification time of an object marks its last use for LRU eviction.
+    """
+
+    LOG_SUFFIX = ".log"
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or os.path.join(get_project_cache_dir(), "build")
+
+    def get_item_path(self, key):
+        assert len(key) > 3 and "/" not in key and "\\" not in key
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def fetch(self, key, dst_path):
+        """Copy a cached object to `dst_path`, returns stored diagnostics
+        or None if there is no item for the key"""
+        path = self.get_item_path(key)
+        log = ""
+        try:
+            if os.path.isfile(path + self.LOG_SUFFIX):
+                with open(path + self.LOG_SUFFIX, encoding="utf8") as fp:
+                    log = fp.read()
+            shutil.copyfile(path, dst_path)
+            os.utime(path)
+        except OSError:  # missing or evicted by another process
+            return None
+        return log
+
+    def store(self, key, src_path, log=None):
+        path = self.get_item_path(key)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if log:
+            self._write_atomic(path + self.LOG_SUFFIX, log.encode("utf8"))
+        elif os.path.isfile(path + self.LOG_SUFFIX):
+            os.remove(path + self.LOG_SUFFIX)
+        with open(src_path, "rb") as fp:
+            self._write_atomic(path, fp.read())
+        return path
+
+    @staticmethod
+    def _write_atomic(path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+
+    def get_items(self):
+        """Returns a list of `(mtime, size, path)` of the stored objects"""
+        result = []
+        if not os.path.isdir(self.cache_dir):
+            return result
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.startswith(".tmp-") or entry.name.endswith(
+                    self.LOG_SUFFIX
+                ):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                result.append((stat.st_mtime, stat.st_size, entry.path))
+        return result
+
+    def get_size(self):
+        return sum(item[1] for item in self.get_items())
+
+    def evict(self, max_size):
+        """Remove the least recently used objects until the storage
+        fits `max_size` bytes, returns the number of removed objects"""
+        items = self.get_items()
+        total_size = sum(item[1] for item in items)
+        if total_size <= max_size:
+            return 0
+        lockfile = LockFile(self.cache_dir)
+        try:
+            lockfile.acquire()
+        except:  # pylint: disable=bare-except
+            return 0  # another process is evicting
+        removed_nums = 0
+        try:
+            for _, size, path in sorted(items):
+                if total_size <= max_size:
+                    break
+                for item_path in (path, path + self.LOG_SUFFIX):
+                    try:
+                        os.remove(item_path)
+                    except OSError:
+                        pass
+                total_size -= size
+                removed_nums += 1
+        finally:
+            lockfile.release()
+        return removed_nums
+
+    def clean(self):
+        if os.path.isdir(self.cache_dir):
+            fs.rmtree(self.cache_dir)
+
+
 #
 # Helpers
 #
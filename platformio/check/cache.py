@@ -0,0 +1,120 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import os
+import re
+
+from platformio.cache import JSONFileCache
+from platformio.check.defect import DefectItem
+from platformio.compat import hashlib_encode_data
+
+
+class DefectCache(JSONFileCache):  # pylint: disable=too-many-instance-attributes
+    """Persistent cache of the defects found per a source file.
+
+    An entry is valid while the source file, the headers it includes
+    (transitively, resolved against the project include paths), and the
+    check context (the tool, its flags, defines, and include paths) have the
+    same content.
+    """
+
+    INCLUDE_RE = re.compile(rb'^\s*#\s*include(?:_next)?\s*([<"])([^>"\n]+)[>"]', re.M)
+
+    def __init__(self, path, context, include_dirs):
+        self.include_dirs = include_dirs
+        self.context = hashlib.sha1(
+            hashlib_encode_data(json.dumps(context, sort_keys=True, default=str))
+        ).hexdigest()
+        self._includes_cache = {}
+        self._digest_cache = {}
+        self.hits = 0
+        self.misses = 0
+        super().__init__(path)
+
+    def _get_digest(self, path):
+        if path not in self._digest_cache:
+            try:
+                with open(path, "rb") as fp:
+                    self._digest_cache[path] = hashlib.sha1(fp.read()).hexdigest()
+            except OSError:
+                self._digest_cache[path] = None
+        return self._digest_cache[path]
+
+    def _get_includes(self, path):
+        """Returns a list of `(name, resolved path or None)` for every
+        include of a file"""
+        if path in self._includes_cache:
+            return self._includes_cache[path]
+        result = []
+        try:
+            with open(path, "rb") as fp:
+                content = fp.read()
+        except OSError:
+            content = b""
+        for quote, name in self.INCLUDE_RE.findall(content):
+            name = name.decode("utf-8", "ignore").strip()
+            search_dirs = self.include_dirs
+            if quote == b'"':
+                search_dirs = [os.path.dirname(path)] + search_dirs
+            inc_path = None
+            for search_dir in search_dirs:
+                candidate = os.path.normpath(os.path.join(search_dir, name))
+                if os.path.isfile(candidate):
+                    inc_path = candidate
+                    break
+            result.append((quote.decode() + name, inc_path))
+        self._includes_cache[path] = result
+        return result
+
+    def get_dependencies(self, src_file):
+        result = set()
+        pending = [os.path.abspath(src_file)]
+        while pending:
+            path = pending.pop()
+            if path in result:
+                continue
+            result.add(path)
+            pending.extend(
+                inc_path for _, inc_path in self._get_includes(path) if inc_path
+            )
+        return sorted(result)
+
+    def compute_key(self, src_file):
+        h = hashlib.sha1(hashlib_encode_data(self.context))
+        for path in self.get_dependencies(src_file):
+            h.update(hashlib_encode_data("%s:%s" % (path, self._get_digest(path))))
+            # a missing or a shadowed header changes the resolution
+            h.update(hashlib_encode_data(json.dumps(self._get_includes(path))))
+        return h.hexdigest()
+
+    def get(self, src_file, key):
+        entry = self._data.get(os.path.abspath(src_file))
+        if not entry or entry["key"] != key:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [
+            DefectItem(
+                **dict(item, severity=DefectItem.severity_to_int(item["severity"]))
+            )
+            for item in entry["defects"]
+        ]
+
+    def set(self, src_file, key, defects):
+        self._data[os.path.abspath(src_file)] = dict(
+            key=key, defects=[d.as_dict() for d in defects]
+        )
+        self._modified = True
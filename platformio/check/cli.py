@@ -28,7 +28,12 @@ from platformio import app, exception, fs, util
 from platformio.check.defect import DefectItem
 from platformio.check.tools import CheckToolFactory
 from platformio.project.config import ProjectConfig
-from platformio.project.helpers import find_project_dir_above, get_project_dir
+from platformio.project.helpers import (
+    find_project_dir_above,
+    get_project_dir,
+    load_build_metadata,
+)
+from platformio.run.cli import DEFAULT_JOB_NUMS
 
 
 @click.command("check", short_help="Static Code Analysis")
@@ -59,6 +64,21 @@ from platformio.project.helpers import find_project_dir_above, get_project_dir
     type=click.Choice(DefectItem.SEVERITY_LABELS.values()),
 )
 @click.option("--skip-packages", is_flag=True)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Analyze only changed source files and reuse cached defects for others",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOB_NUMS,
+    help=(
+        "Analyze N source files at once. "
+        "Default is a number of CPUs in a system (N=%d)" % DEFAULT_JOB_NUMS
+    ),
+)
 def cli(  # pylint: disable=too-many-positional-arguments
     environment,
     project_dir,
@@ -72,6 +92,8 @@ def cli(  # pylint: disable=too-many-positional-arguments
     json_output,
     fail_on_defect,
     skip_packages,
+    incremental,
+    jobs,
 ):
     app.set_session_var("custom_project_conf", project_conf)
 
@@ -93,7 +115,7 @@ def cli(  # pylint: disable=too-many-positional-arguments
                 ]
             )
 
-            env_options = config.items(env=envname, as_dict=True)
+            env_options = config.resolve_env(envname)
             env_dump = []
             for k, v in env_options.items():
                 if k not in ("platform", "framework", "board"):
@@ -139,6 +161,8 @@ def cli(  # pylint: disable=too-many-positional-arguments
                 ),
                 skip_packages=skip_packages or env_options.get("check_skip_packages"),
                 platform_packages=env_options.get("platform_packages"),
+                jobs=jobs,
+                incremental=incremental,
             )
 
             for tool in config.get("env:" + envname, "check_tool"):
@@ -148,6 +172,11 @@ def cli(  # pylint: disable=too-many-positional-arguments
                 if not silent and not json_output:
                     print_processing_header(tool, envname, env_dump)
 
+                # the build metadata is shared by all tools of an environment
+                if not tool_options.get("build_metadata"):
+                    tool_options["build_metadata"] = load_build_metadata(
+                        os.getcwd(), envname
+                    )
                 ct = CheckToolFactory.new(
                     tool, os.getcwd(), config, envname, tool_options
                 )
@@ -177,6 +206,18 @@ def cli(  # pylint: disable=too-many-positional-arguments
                     click.echo("\n".join(repr(d) for d in result["defects"]))
 
                 if not json_output and not silent:
+                    defect_cache = ct.get_defect_cache()
+                    if defect_cache and (defect_cache.hits or defect_cache.misses):
+                        click.echo(
+                            "Defect cache: %d hits, %d misses (%d%%)"
+                            % (
+                                defect_cache.hits,
+                                defect_cache.misses,
+                                defect_cache.hits
+                                * 100
+                                / (defect_cache.hits + defect_cache.misses),
+                            )
+                        )
                     if rc != 0:
                         click.echo(
                             "Error: %s failed to perform check! Please "
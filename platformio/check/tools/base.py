@@ -14,17 +14,20 @@
 
 import os
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 
-from platformio import fs, proc
+from platformio import __version__, fs, proc
+from platformio.check.cache import DefectCache
 from platformio.check.defect import DefectItem
 from platformio.package.manager.core import get_core_package_dir
 from platformio.package.meta import PackageSpec
 from platformio.project.helpers import load_build_metadata
+from platformio.toolchain import get_toolchain_defines
 
 
-class CheckToolBase:  # pylint: disable=too-many-instance-attributes
+class CheckToolBase:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     def __init__(self, project_dir, config, envname, options):
         self.config = config
         self.envname = envname
@@ -41,6 +44,7 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
         self._defects = []
         self._on_defect_callback = None
         self._bad_input = False
+        self._defect_cache = None
         self._load_cpp_data()
 
         # detect all defects by default
@@ -57,7 +61,9 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
         ]
 
     def _load_cpp_data(self):
-        data = load_build_metadata(self.project_dir, self.envname)
+        data = self.options.get("build_metadata") or load_build_metadata(
+            self.project_dir, self.envname
+        )
         if not data:
             return
         self.cc_flags = data.get("cc_flags", [])
@@ -87,38 +93,17 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
         return result
 
     def _get_toolchain_defines(self):
-        def _extract_defines(language, includes_file):
-            build_flags = self.cxx_flags if language == "c++" else self.cc_flags
-            defines = []
-            cmd = "echo | %s -x %s %s %s -dM -E -" % (
+        def _extract_defines(language):
+            defines = get_toolchain_defines(
                 self.cc_path,
                 language,
-                " ".join(
-                    [f for f in build_flags if f.startswith(("-m", "-f", "-std"))]
-                ),
-                includes_file,
+                self.cxx_flags if language == "c++" else self.cc_flags,
             )
-            result = proc.exec_command(cmd, shell=True)
-
-            if result["returncode"] != 0:
+            if defines is None:
                 click.echo("Warning: Failed to extract toolchain defines!")
-                if self.options.get("verbose"):
-                    click.echo(result["out"])
-                    click.echo(result["err"])
-
-            for line in result["out"].split("\n"):
-                tokens = line.strip().split(" ", 2)
-                if not tokens or tokens[0] != "#define":
-                    continue
-                if len(tokens) > 2:
-                    defines.append("%s=%s" % (tokens[1], tokens[2]))
-                else:
-                    defines.append(tokens[1])
+            return defines or []
 
-            return defines
-
-        incflags_file = self._long_includes_hook(self.cpp_includes)
-        return {lang: _extract_defines(lang, incflags_file) for lang in ("c", "c++")}
+        return {lang: _extract_defines(lang) for lang in ("c", "c++")}
 
     def _create_tmp_file(self, data):
         with tempfile.NamedTemporaryFile("w", delete=False) as fp:
@@ -126,13 +111,6 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
             self._tmp_files.append(fp.name)
             return fp.name
 
-    def _long_includes_hook(self, includes):
-        data = []
-        for inc in includes:
-            data.append('-I"%s"' % fs.to_unix_path(inc))
-
-        return '@"%s"' % self._create_tmp_file(" ".join(data))
-
     @staticmethod
     def _dump_includes(includes_map):
         result = []
@@ -167,6 +145,9 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
         if defect.severity not in self.options["severity"]:
             return
 
+        self.add_defect(defect)
+
+    def add_defect(self, defect):
         self._defects.append(defect)
         if self._on_defect_callback:
             self._on_defect_callback(defect)
@@ -189,11 +170,126 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
         return cmd_result["returncode"] == 0
 
     def execute_check_cmd(self, cmd):
+        return self.process_check_cmd_result(cmd, self.run_check_cmd(cmd))
+
+    def get_tool_path(self):
+        raise NotImplementedError
+
+    def get_defect_cache(self):
+        if self._defect_cache or not self.options.get("incremental"):
+            return self._defect_cache
+        tool_path = self.get_tool_path()
+        tool_id = None
+        for path in (tool_path, tool_path + ".exe"):
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                tool_id = [path, stat.st_size, stat.st_mtime_ns]
+                break
+        self._defect_cache = DefectCache(
+            os.path.join(
+                self.config.get("platformio", "build_dir"),
+                self.envname,
+                "checkcache-%s.json" % os.path.basename(tool_path),
+            ),
+            context=dict(
+                version=__version__,
+                tool=tool_id,
+                options={
+                    k: v
+                    for k, v in self.options.items()
+                    if k
+                    not in (
+                        "verbose",
+                        "silent",
+                        "jobs",
+                        "src_filters",
+                        "build_metadata",
+                    )
+                },
+                cc_flags=self.cc_flags,
+                cxx_flags=self.cxx_flags,
+                cpp_includes=self.cpp_includes,
+                cpp_defines=self.cpp_defines,
+                toolchain_defines=self.toolchain_defines,
+            ),
+            include_dirs=self.cpp_includes,
+        )
+        return self._defect_cache
+
+    def check_files(self, src_files):
+        """Checks source files by independent tasks using up to `jobs` threads.
+
+        The results are processed in the order of files, so the reported
+        defects do not depend on the number of jobs. In the incremental mode,
+        the defects of unchanged files are taken from the defect cache.
+        """
+        cache = self.get_defect_cache()
+        items = []
+        for src_file in src_files:
+            key = defects = task = None
+            if cache:
+                key = cache.compute_key(src_file)
+                defects = cache.get(src_file, key)
+            if defects is None:
+                task = self.configure_check_task(src_file)
+                if not task:
+                    self._bad_input = True
+                    continue
+            items.append((src_file, key, task, defects))
+
+        results = self.map_in_parallel(
+            lambda item: self.run_check_task(item[2]) if item[2] else None, items
+        )
+        for (src_file, key, task, defects), result in zip(items, results):
+            if not task:
+                for defect in defects:
+                    self.add_defect(defect)
+                continue
+            bad_input = self._bad_input
+            self._bad_input = False
+            offset = len(self._defects)
+            self.process_check_task(task, result)
+            # do not cache results of a failed check
+            if cache and not self._bad_input:
+                cache.set(src_file, key, self._defects[offset:])
+            self._bad_input = self._bad_input or bad_input
+
+        if cache:
+            cache.save()
+
+    def configure_check_task(self, src_file):
+        raise NotImplementedError
+
+    def run_check_task(self, task):
+        return self.run_check_cmd(task)
+
+    def process_check_task(self, task, result):
+        return self.process_check_cmd_result(task, result)
+
+    def map_in_parallel(self, func, items):
+        jobs = min(self.options.get("jobs") or 1, len(items))
+        if jobs < 2:
+            yield from map(func, items)
+            return
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(func, items)
+
+    @staticmethod
+    def run_check_cmd(cmd):
+        output = []
         result = proc.exec_command(
             cmd,
-            stdout=proc.LineBufferedAsyncPipe(self.on_tool_output),
-            stderr=proc.LineBufferedAsyncPipe(self.on_tool_output),
+            stdout=proc.LineBufferedAsyncPipe(output.append),
+            stderr=proc.LineBufferedAsyncPipe(output.append),
         )
+        result["output"] = output
+        return result
+
+    def process_check_cmd_result(self, cmd, result):
+        if self.options.get("verbose"):
+            click.echo(" ".join(cmd))
+        for line in result.get("output", []):
+            self.on_tool_output(line)
 
         if not self.is_check_successful(result):
             click.echo(
@@ -233,11 +329,7 @@ class CheckToolBase:  # pylint: disable=too-many-instance-attributes
         self._on_defect_callback = on_defect_callback
         cmd = self.configure_command()
         if cmd:
-            if self.options.get("verbose"):
-                click.echo(" ".join(cmd))
-
             self.execute_check_cmd(cmd)
-
         else:
             if self.options.get("verbose"):
                 click.echo("Error: Couldn't configure command")
@@ -54,23 +54,19 @@ class ClangtidyCheckTool(CheckToolBase):
         # so 0 and 1 are only acceptable values
         return cmd_result["returncode"] < 2
 
-    def configure_command(self):
-        tool_path = join(self.get_tool_dir("tool-clangtidy"), "clang-tidy")
+    def get_tool_path(self):
+        return join(self.get_tool_dir("tool-clangtidy"), "clang-tidy")
 
-        cmd = [tool_path, "--quiet"]
+    def configure_command(self, src_files=None):  # pylint: disable=arguments-differ
+        cmd = [self.get_tool_path(), "--quiet"]
         flags = self.get_flags("clangtidy")
         if not (
             self.is_flag_set("--checks", flags) or self.is_flag_set("--config", flags)
         ):
             cmd.append("--checks=*")
 
-        project_files = self.get_project_target_files(
-            self.project_dir, self.options["src_filters"]
-        )
-
-        src_files = []
-        for items in project_files.values():
-            src_files.extend(items)
+        if src_files is None:
+            src_files = self.get_src_files()
 
         cmd.extend(flags + src_files + ["--"])
         cmd.extend(
@@ -88,3 +84,29 @@ class ClangtidyCheckTool(CheckToolBase):
         cmd.extend(["-I%s" % inc for inc in includes])
 
         return cmd
+
+    def get_src_files(self):
+        result = []
+        for items in self.get_project_target_files(
+            self.project_dir, self.options["src_filters"]
+        ).values():
+            result.extend(items)
+        return result
+
+    def configure_check_task(self, src_file):
+        return self.configure_command([src_file])
+
+    def check(self, on_defect_callback=None):
+        src_files = self.get_src_files()
+        if not src_files or (
+            not self.options.get("incremental")
+            and ((self.options.get("jobs") or 1) < 2 or len(src_files) < 2)
+        ):
+            return super().check(on_defect_callback)
+
+        # analyze every file by a separate process
+        self._on_defect_callback = on_defect_callback
+        self.check_files(src_files)
+        self.clean_up()
+
+        return self._bad_input
@@ -102,11 +102,12 @@ class CppcheckCheckTool(CheckToolBase):
         self._buffer = ""
         return DefectItem(**args)
 
-    def configure_command(self, language, src_file):  # pylint: disable=arguments-differ
-        tool_path = os.path.join(self.get_tool_dir("tool-cppcheck"), "cppcheck")
+    def get_tool_path(self):
+        return os.path.join(self.get_tool_dir("tool-cppcheck"), "cppcheck")
 
+    def configure_command(self, language, src_file):  # pylint: disable=arguments-differ
         cmd = [
-            tool_path,
+            self.get_tool_path(),
             "--addon-python=%s" % proc.get_pythonexe_path(),
             "--error-exitcode=3",
             "--verbose" if self.options.get("verbose") else "--quiet",
@@ -242,6 +243,11 @@ class CppcheckCheckTool(CheckToolBase):
             standard, cpp_standards_map.get(standard, standard)
         )
 
+    def configure_check_task(self, src_file):
+        return self.configure_command(
+            "c" if src_file.endswith(".c") else "c++", src_file
+        )
+
     def check(self, on_defect_callback=None):
         self._on_defect_callback = on_defect_callback
 
@@ -253,18 +259,12 @@ class CppcheckCheckTool(CheckToolBase):
             click.echo("Error: Nothing to check.")
             return True
 
+        src_files = []
         for scope, files in project_files.items():
-            if scope not in src_files_scope:
-                continue
-            for src_file in files:
-                cmd = self.configure_command(scope, src_file)
-                if not cmd:
-                    self._bad_input = True
-                    continue
-                if self.options.get("verbose"):
-                    click.echo(" ".join(cmd))
+            if scope in src_files_scope:
+                src_files.extend(files)
 
-                self.execute_check_cmd(cmd)
+        self.check_files(src_files)
 
         self.clean_up()
 
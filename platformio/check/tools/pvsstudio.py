@@ -69,9 +69,7 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
                 return
             if defect.severity not in self.options["severity"]:
                 return
-            self._defects.append(defect)
-            if self._on_defect_callback:
-                self._on_defect_callback(defect)
+            self.add_defect(defect)
 
     def _demangle_report(self, output_file):
         converter_tool = os.path.join(
@@ -144,11 +142,15 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
 
         return defects
 
-    def configure_command(self, src_file):  # pylint: disable=arguments-differ
-        if os.path.isfile(self._tmp_output_file):
-            os.remove(self._tmp_output_file)
+    def configure_command(  # pylint: disable=arguments-differ
+        self, src_file, preprocessed_file=None, output_file=None
+    ):
+        preprocessed_file = preprocessed_file or self._tmp_preprocessed_file
+        output_file = output_file or self._tmp_output_file
+        if os.path.isfile(output_file):
+            os.remove(output_file)
 
-        if not os.path.isfile(self._tmp_preprocessed_file):
+        if not os.path.isfile(preprocessed_file):
             click.echo("Error: Missing preprocessed file for '%s'" % src_file)
             return ""
 
@@ -165,9 +167,9 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
             "--source-file",
             src_file,
             "--i-file",
-            self._tmp_preprocessed_file,
+            preprocessed_file,
             "--output-file",
-            self._tmp_output_file,
+            output_file,
         ]
 
         flags = self.get_flags("pvs-studio")
@@ -181,9 +183,10 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
         # pylint: disable=protected-access
         return os.path.join(self._tmp_dir, next(tempfile._get_candidate_names()))
 
-    def _prepare_preprocessed_file(self, src_file):
-        if os.path.isfile(self._tmp_preprocessed_file):
-            os.remove(self._tmp_preprocessed_file)
+    def _prepare_preprocessed_file(self, src_file, preprocessed_file=None):
+        preprocessed_file = preprocessed_file or self._tmp_preprocessed_file
+        if os.path.isfile(preprocessed_file):
+            os.remove(preprocessed_file)
 
         flags = self.cxx_flags
         compiler = self.cxx_path
@@ -196,7 +199,7 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
             '"%s"' % src_file,
             "-E",
             "-o",
-            '"%s"' % self._tmp_preprocessed_file,
+            '"%s"' % preprocessed_file,
         ]
         cmd.extend([f for f in flags if f])
         cmd.extend(['"-D%s"' % d.replace('"', '\\"') for d in self.cpp_defines])
@@ -206,7 +209,9 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
         if src_file.endswith(".ino"):
             cmd.insert(1, "-xc++")
 
-        result = proc.exec_command(" ".join(cmd), shell=True)
+        return cmd, proc.exec_command(" ".join(cmd), shell=True)
+
+    def _report_preprocessing_result(self, cmd, result):
         if result["returncode"] != 0 or result["err"]:
             if self.options.get("verbose"):
                 click.echo(" ".join(cmd))
@@ -224,28 +229,49 @@ class PvsStudioCheckTool(CheckToolBase):  # pylint: disable=too-many-instance-at
             "license" not in cmd_result["err"].lower() and cmd_result["returncode"] == 0
         )
 
+    def get_tool_path(self):
+        return self.tool_path
+
+    def configure_check_task(self, src_file):
+        tmp_path = self._generate_tmp_file_path()
+        return (src_file, tmp_path + ".i", tmp_path + ".pvs")
+
+    def run_check_task(self, task):
+        src_file, preprocessed_file, output_file = task
+        preprocessing = self._prepare_preprocessed_file(src_file, preprocessed_file)
+        cmd = result = None
+        if os.path.isfile(preprocessed_file):
+            cmd = self.configure_command(src_file, preprocessed_file, output_file)
+            result = self.run_check_cmd(cmd)
+        return preprocessing, cmd, result
+
+    def process_check_task(self, task, result):
+        src_file, preprocessed_file, output_file = task
+        preprocessing, cmd, result = result
+        self._report_preprocessing_result(*preprocessing)
+        if not cmd:
+            click.echo("Error: Missing preprocessed file for '%s'" % src_file)
+            self._bad_input = True
+            return
+
+        result = self.process_check_cmd_result(cmd, result)
+        if result["returncode"] == 0:
+            self._process_defects(self.parse_defects(output_file))
+
+        for path in (preprocessed_file, output_file):
+            if os.path.isfile(path):
+                os.remove(path)
+
     def check(self, on_defect_callback=None):
         self._on_defect_callback = on_defect_callback
+        src_files = []
         for scope, files in self.get_project_target_files(
             self.project_dir, self.options["src_filters"]
         ).items():
-            if scope not in ("c", "c++"):
-                continue
-            for src_file in files:
-                self._prepare_preprocessed_file(src_file)
-                cmd = self.configure_command(src_file)
-                if self.options.get("verbose"):
-                    click.echo(" ".join(cmd))
-                if not cmd:
-                    self._bad_input = True
-                    continue
-
-                result = self.execute_check_cmd(cmd)
-                if result["returncode"] != 0:
-                    continue
-
-                self._process_defects(self.parse_defects(self._tmp_output_file))
+            if scope in ("c", "c++"):
+                src_files.extend(files)
 
+        self.check_files(src_files)
         self.clean_up()
 
         return self._bad_input
@@ -17,6 +17,32 @@ from pathlib import Path
 
 import click
 
+# the registry of the commands, it saves scanning of the package on every
+# call and is verified against `PlatformioCLI._find_pio_commands()` by tests
+PIO_COMMANDS = {
+    "access": "platformio.registry.access.cli",
+    "account": "platformio.account.cli",
+    "boards": "platformio.commands.boards",
+    "check": "platformio.check.cli",
+    "ci": "platformio.commands.ci",
+    "debug": "platformio.debug.cli",
+    "device": "platformio.device.cli",
+    "home": "platformio.home.cli",
+    "lib": "platformio.commands.lib",
+    "org": "platformio.account.org.cli",
+    "pkg": "platformio.package.cli",
+    "platform": "platformio.commands.platform",
+    "project": "platformio.project.cli",
+    "remote": "platformio.remote.cli",
+    "run": "platformio.run.cli",
+    "settings": "platformio.commands.settings",
+    "system": "platformio.system.cli",
+    "team": "platformio.account.team.cli",
+    "test": "platformio.test.cli",
+    "update": "platformio.commands.update",
+    "upgrade": "platformio.commands.upgrade",
+}
+
 
 class PlatformioCLI(click.MultiCommand):
     leftover_args = []
@@ -85,13 +111,12 @@ class PlatformioCLI(click.MultiCommand):
         return super().invoke(ctx)
 
     def list_commands(self, ctx):
-        return sorted(list(self._find_pio_commands()))
+        return sorted(list(PIO_COMMANDS))
 
     def get_command(self, ctx, cmd_name):
-        commands = self._find_pio_commands()
-        if cmd_name not in commands:
+        if cmd_name not in PIO_COMMANDS:
             return self._handle_obsolate_command(ctx, cmd_name)
-        module = importlib.import_module(commands[cmd_name])
+        module = importlib.import_module(PIO_COMMANDS[cmd_name])
         return getattr(module, "cli")
 
     @staticmethod
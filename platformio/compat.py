@@ -23,12 +23,34 @@ import sys
 
 from platformio.exception import UserSideException
 
-if sys.version_info >= (3, 7):
-    from asyncio import create_task as aio_create_task
-    from asyncio import get_running_loop as aio_get_running_loop
-else:
-    from asyncio import ensure_future as aio_create_task
-    from asyncio import get_event_loop as aio_get_running_loop
+# "asyncio" is imported on demand, it is not needed by the most of commands
+# pylint: disable=import-outside-toplevel
+
+
+def aio_create_task(coro):
+    import asyncio
+
+    if sys.version_info >= (3, 7):
+        return asyncio.create_task(coro)
+    return asyncio.ensure_future(coro)
+
+
+def aio_get_running_loop():
+    import asyncio
+
+    if sys.version_info >= (3, 7):
+        return asyncio.get_running_loop()
+    return asyncio.get_event_loop()
+
+
+def aio_to_thread(func, *args, **kwargs):
+    if sys.version_info >= (3, 9):
+        import asyncio
+
+        return asyncio.to_thread(func, *args, **kwargs)
+    from starlette.concurrency import run_in_threadpool
+
+    return run_in_threadpool(func, *args, **kwargs)
 
 
 if sys.version_info >= (3, 8):
@@ -39,15 +61,6 @@ else:
         return " ".join(shlex.quote(arg) for arg in split_command)
 
 
-if sys.version_info >= (3, 9):
-    from asyncio import to_thread as aio_to_thread
-else:
-    try:
-        from starlette.concurrency import run_in_threadpool as aio_to_thread
-    except ImportError:
-        pass
-
-
 PY2 = sys.version_info[0] == 2  # DO NOT REMOVE IT. ESP8266/ESP32 depend on it
 PY36 = sys.version_info[0:2] == (3, 6)
 IS_CYGWIN = sys.platform.startswith("cygwin")
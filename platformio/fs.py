@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import errno
 import glob
 import hashlib
 import io
@@ -209,6 +210,74 @@ def change_filemtime(path, mtime):
     os.utime(path, (mtime, mtime))
 
 
+# the errors of a clone method which is not supported by a file system,
+# ENOTTY and EINVAL are returned by the reflink ioctl
+CLONE_UNSUPPORTED_ERRNOS = (
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EPERM,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EINVAL,
+)
+
+
+def clone_tree(src, dst, ignore_names=None, hardlinks=True):
+    """Recreates the `src` tree in `dst` sharing the data of files where a
+    file system allows it: a copy-on-write clone (reflink), a hard link, or a
+    regular copy otherwise. The symbolic links are recreated as is.
+
+    The files linked with `hardlinks` are modified in both trees at once."""
+    clone_funcs = [_reflink_file] if sys.platform.startswith("linux") else []
+    if hardlinks:
+        clone_funcs.append(os.link)
+    clone_funcs.append(shutil.copy2)
+    os.makedirs(dst, exist_ok=True)
+    for root, dirs, files in os.walk(src):
+        dst_root = os.path.join(dst, os.path.relpath(root, src))
+        for name in dirs + files:
+            src_path = os.path.join(root, name)
+            dst_path = os.path.join(dst_root, name)
+            if os.path.islink(src_path):
+                os.symlink(os.readlink(src_path), dst_path)
+            elif name in dirs:
+                os.makedirs(dst_path, exist_ok=True)
+            elif not ignore_names or name not in ignore_names:
+                _clone_file(clone_funcs, src_path, dst_path)
+
+
+def _clone_file(clone_funcs, src, dst):
+    """The method which is not supported by a file system is removed from
+    `clone_funcs` for the rest files, the other errors are specific to a file
+    and the next methods are tried only for this file"""
+    index = 0
+    while True:
+        try:
+            return clone_funcs[index](src, dst)
+        except OSError as exc:
+            if index == len(clone_funcs) - 1:
+                raise
+            if exc.errno in CLONE_UNSUPPORTED_ERRNOS:
+                clone_funcs.pop(index)
+            else:
+                index += 1
+
+
+def _reflink_file(src, dst):
+    import fcntl  # pylint: disable=import-outside-toplevel,import-error
+
+    ficlone = 0x40049409
+    try:
+        with open(src, "rb") as src_fp, open(dst, "wb") as dst_fp:
+            fcntl.ioctl(dst_fp.fileno(), ficlone, src_fp.fileno())
+    except OSError:
+        if os.path.isfile(dst):
+            os.remove(dst)
+        raise
+    shutil.copystat(src, dst)
+
+
 def rmtree(path):
     def _onexc(func, path, _):
         try:
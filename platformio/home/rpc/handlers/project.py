@@ -50,7 +50,7 @@ class ProjectRPC(BaseRPCHandler):
 
     @staticmethod
     def config_load(path):
-        return ProjectConfig(
+        return ProjectConfig.get_instance(
             path, parse_extra=False, expand_interpolations=False
         ).as_tuple()
 
@@ -17,6 +17,7 @@ import socket
 from urllib.parse import urljoin
 
 import requests.adapters
+import urllib3
 from urllib3.util.retry import Retry
 
 from platformio import __check_internet_hosts__, app, util
@@ -26,6 +27,13 @@ from platformio.exception import PlatformioException, UserSideException
 
 __default_requests_timeout__ = (10, None)  # (connect, read)
 
+# https://urllib3.readthedocs.org
+# /en/latest/security.html#insecureplatformwarning
+try:
+    urllib3.disable_warnings()
+except AttributeError:
+    pass
+
 
 class HTTPClientError(UserSideException):
     def __init__(self, message, response=None):
@@ -118,7 +126,7 @@ class HTTPClient:
             self._session.close()
         self._session = next(self._session_iter)
 
-    @util.throttle(500)
+    @util.throttle(200, burst=8)
     def send_request(self, method, path, **kwargs):
         # check Internet before and resolve issue with 60 seconds timeout
         ensure_internet_on(raise_exception=True)
@@ -17,16 +17,13 @@ import shutil
 from time import time
 
 import click
-import semantic_version
 
 from platformio import __version__, app, exception, fs, telemetry
-from platformio.cache import cleanup_content_cache
 from platformio.cli import PlatformioCLI
-from platformio.commands.upgrade import get_latest_version
-from platformio.http import HTTPClientError, InternetConnectionError, ensure_internet_on
-from platformio.package.manager.core import update_core_packages
-from platformio.package.version import pepver_to_semver
-from platformio.system.prune import calculate_unnecessary_system_data
+
+# pylint: disable=import-outside-toplevel
+# the modules which are needed only for the upgrade and prune checks are
+# imported on demand, they pull in the HTTP client and the package managers
 
 
 def on_cmd_start(ctx, caller):
@@ -45,11 +42,15 @@ def on_cmd_end():
     try:
         check_platformio_upgrade()
         check_prune_system()
-    except (
-        HTTPClientError,
-        InternetConnectionError,
-        exception.GetLatestVersionError,
-    ):
+    except exception.PlatformioException as exc:
+        # the HTTP client is loaded only if the check has been started
+        from platformio.http import HTTPClientError, InternetConnectionError
+
+        if not isinstance(
+            exc,
+            (HTTPClientError, InternetConnectionError, exception.GetLatestVersionError),
+        ):
+            raise
         click.secho(
             "Failed to check for PlatformIO upgrades. "
             "Please check your Internet connection.",
@@ -80,6 +81,8 @@ def set_caller(caller=None):
 
 class Upgrader:
     def __init__(self, from_version, to_version):
+        import semantic_version
+
         self.from_version = from_version
         self.to_version = to_version
         self._upgraders = [
@@ -128,6 +131,10 @@ def after_upgrade(ctx):
         app.set_state_item("last_version", __version__)
         return print_welcome_banner()
 
+    from platformio.cache import cleanup_content_cache
+    from platformio.package.manager.core import update_core_packages
+    from platformio.package.version import pepver_to_semver
+
     last_version = pepver_to_semver(last_version_str)
     current_version = pepver_to_semver(__version__)
 
@@ -216,6 +223,11 @@ def check_platformio_upgrade():
     if not last_checked_time:
         return
 
+    from platformio.commands.upgrade import get_latest_version
+    from platformio.http import ensure_internet_on
+    from platformio.package.manager.core import update_core_packages
+    from platformio.package.version import pepver_to_semver
+
     ensure_internet_on(raise_exception=True)
 
     # Update PlatformIO Core packages
@@ -266,6 +278,8 @@ def check_prune_system():
     if threshold_mb <= 0:
         return
 
+    from platformio.system.prune import calculate_unnecessary_system_data
+
     unnecessary_size = calculate_unnecessary_system_data()
     if (unnecessary_size / 1024) < threshold_mb:
         return
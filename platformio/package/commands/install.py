@@ -99,9 +99,14 @@ def install_project_dependencies(options):
     with fs.cd(options["project_dir"]):
         config = ProjectConfig.get_instance()
         config.validate(environments)
-        for env in config.envs():
-            if environments and env not in environments:
-                continue
+        project_envs = [
+            env for env in config.envs() if not environments or env in environments
+        ]
+        if not any(options.get(key) for key in ("platforms", "tools", "libraries")):
+            prefetch_project_registry_packages(
+                config, project_envs, force=options.get("force")
+            )
+        for env in project_envs:
             if not options.get("silent"):
                 click.echo("Resolving %s dependencies..." % click.style(env, fg="cyan"))
             already_up_to_date = not install_project_env_dependencies(env, options)
@@ -109,6 +114,26 @@ def install_project_dependencies(options):
                 click.secho("Already up-to-date.", fg="green")
 
 
+def prefetch_project_registry_packages(config, project_envs, force=False):
+    """Fetches the registry metadata of the missing libraries of all
+    environments at once, the environments resolve them from the memo"""
+    lm = None
+    specs = []
+    for project_env in project_envs:
+        lm = LibraryPackageManager(
+            os.path.join(config.get("platformio", "libdeps_dir"), project_env)
+        )
+        for library in config.get(f"env:{project_env}", "lib_deps"):
+            spec = PackageSpec(library)
+            # skip built-in dependencies
+            if spec.external or not spec.owner:
+                continue
+            if force or not lm.get_package(spec):
+                specs.append(spec)
+    if lm and specs:
+        lm.prefetch_registry_packages(specs)
+
+
 def install_project_env_dependencies(project_env, options=None):
     """Used in `pio run` -> Processor"""
     options = options or {}
@@ -242,6 +267,7 @@ def _install_project_env_libraries(project_env, options):
         )
         lib_deps.extend(test_runner.EXTRA_LIB_DEPS or [])
 
+    specs = []
     for library in lib_deps:
         spec = PackageSpec(library)
         # skip built-in dependencies
@@ -249,11 +275,12 @@ def _install_project_env_libraries(project_env, options):
             continue
         if not env_lm.get_package(spec):
             already_up_to_date = False
-        env_lm.install(
-            spec,
-            skip_dependencies=options.get("skip_dependencies"),
-            force=options.get("force"),
-        )
+        specs.append(spec)
+    env_lm.install_many(
+        specs,
+        skip_dependencies=options.get("skip_dependencies"),
+        force=options.get("force"),
+    )
 
     # install dependencies from the private libraries
     for pkg in private_lm.get_installed():
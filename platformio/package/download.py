@@ -12,21 +12,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import io
+import copy
+import hashlib
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from email.utils import parsedate
 from os.path import getsize, join
 from time import mktime
 
 import click
 
-from platformio import fs
+from platformio import app, fs
 from platformio.compat import is_terminal
 from platformio.http import HTTPSession
 from platformio.package.exception import PackageException
 
 
-class FileDownloader:
+class FileDownloader:  # pylint: disable=too-many-instance-attributes
+    CHUNK_SIZE = 64 * 1024
+    WRITE_BUFFER_SIZE = 1024 * 1024
+    MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+    STATE_SAVE_INTERVAL = 8 * 1024 * 1024
+    STATE_SUFFIX = ".state"
+
     def __init__(self, url, dest_dir=None):
+        self._url = url
         self._http_session = HTTPSession()
         self._http_response = None
         # make connection
@@ -52,6 +64,9 @@ class FileDownloader:
             self._fname = [p for p in url.split("/") if p][-1]
         self._fname = str(self._fname)
         self._destination = self._fname
+        self._hash = None
+        self._state = None
+        self._state_lock = threading.Lock()
         if dest_dir:
             self.set_destination(join(dest_dir, self._fname))
 
@@ -69,47 +84,80 @@ class FileDownloader:
             return -1
         return int(self._http_response.headers["content-length"])
 
-    def start(self, with_progress=True, silent=False):
+    @staticmethod
+    def get_checksum_algo(checksum):
+        algos = {32: "md5", 40: "sha1", 64: "sha256"}
+        if len(checksum) not in algos:
+            raise PackageException(
+                "Could not determine checksum algorithm by %s" % checksum
+            )
+        return algos[len(checksum)]
+
+    def is_resumable(self):
+        headers = self._http_response.headers
+        return (
+            self.get_size() > 0
+            and headers.get("accept-ranges", "").lower() == "bytes"
+            and headers.get("content-encoding", "identity").lower() == "identity"
+        )
+
+    def get_state_path(self):
+        return self._destination + self.STATE_SUFFIX
+
+    def start(  # pylint: disable=too-many-arguments
+        self,
+        with_progress=True,
+        silent=False,
+        checksum=None,
+        data_callback=None,
+        segments=1,
+    ):
+        """Saves the file to the destination.
+
+        If the server supports range requests, the progress is stored in a
+        sidecar state file and an interrupted download of the same remote
+        file is resumed. A large file is downloaded by the `segments`
+        parallel range requests, otherwise the checksum is computed and
+        `data_callback` is called with every chunk while the data is being
+        received.
+        """
         label = "Downloading"
         file_size = self.get_size()
-        itercontent = self._http_response.iter_content(
-            chunk_size=io.DEFAULT_BUFFER_SIZE
-        )
+        self._hash = hashlib.new(self.get_checksum_algo(checksum)) if checksum else None
+        self._state = self._load_state(checksum, segments)
+        itersizes = self._iter_received(data_callback)
         try:
-            with open(self._destination, "wb") as fp:
-                if file_size == -1 or not with_progress or silent:
-                    if not silent:
-                        click.echo(f"{label}...")
-                    for chunk in itercontent:
-                        fp.write(chunk)
-
-                elif not is_terminal():
-                    click.echo(f"{label} 0%", nl=False)
-                    print_percent_step = 10
-                    printed_percents = 0
-                    downloaded_size = 0
-                    for chunk in itercontent:
-                        fp.write(chunk)
-                        downloaded_size += len(chunk)
-                        if (downloaded_size / file_size * 100) >= (
-                            printed_percents + print_percent_step
-                        ):
-                            printed_percents += print_percent_step
-                            click.echo(f" {printed_percents}%", nl=False)
-                    click.echo("")
-
-                else:
-                    with click.progressbar(
-                        length=file_size,
-                        iterable=itercontent,
-                        label=label,
-                        update_min_steps=min(
-                            256 * 1024, file_size / 100
-                        ),  # every 256Kb or less
-                    ) as pb:
-                        for chunk in pb:
-                            pb.update(len(chunk))
-                            fp.write(chunk)
+            if file_size == -1 or not with_progress or silent:
+                if not silent:
+                    click.echo(f"{label}...")
+                for _ in itersizes:
+                    pass
+
+            elif not is_terminal():
+                click.echo(f"{label} 0%", nl=False)
+                print_percent_step = 10
+                printed_percents = 0
+                downloaded_size = 0
+                for size in itersizes:
+                    downloaded_size += size
+                    if (downloaded_size / file_size * 100) >= (
+                        printed_percents + print_percent_step
+                    ):
+                        printed_percents += print_percent_step
+                        click.echo(f" {printed_percents}%", nl=False)
+                click.echo("")
+
+            else:
+                with click.progressbar(
+                    length=file_size,
+                    iterable=itersizes,
+                    label=label,
+                    update_min_steps=min(
+                        256 * 1024, file_size / 100
+                    ),  # every 256Kb or less
+                ) as pb:
+                    for size in pb:
+                        pb.update(size)
         finally:
             self._http_response.close()
             self._http_session.close()
@@ -119,7 +167,177 @@ class FileDownloader:
 
         return True
 
+    def _load_state(self, checksum, segments):
+        if not self.is_resumable():
+            return None
+        headers = self._http_response.headers
+        identity = dict(
+            url=self._url,
+            size=self.get_size(),
+            etag=headers.get("etag"),
+            last_modified=self.get_lmtime(),
+            checksum=checksum,
+        )
+        state = app.load_state_storage(self.get_state_path())
+        is_valid_state = (
+            state.get("identity") == identity
+            and os.path.isfile(self._destination)
+            and all(
+                start + received <= getsize(self._destination)
+                for start, _, received in state.get("segments", [])
+            )
+        )
+        # the data of the unversioned remote file can not be trusted
+        if is_valid_state and any(
+            identity[key] for key in ("etag", "last_modified", "checksum")
+        ):
+            return copy.deepcopy(state)
+        segments = max(1, min(segments, self.get_size() // self.MIN_SEGMENT_SIZE))
+        bounds = [self.get_size() * i // segments for i in range(segments + 1)]
+        return dict(
+            identity=identity,
+            segments=[[bounds[i], bounds[i + 1], 0] for i in range(segments)],
+        )
+
+    def _save_state(self):
+        with self._state_lock:
+            app.save_state_storage(self.get_state_path(), self._state)
+
+    def _iter_received(self, data_callback):
+        if not self._state:
+            with open(self._destination, "wb", buffering=self.WRITE_BUFFER_SIZE) as fp:
+                for chunk in self._iter_content(self._http_response, data_callback):
+                    fp.write(chunk)
+                    yield len(chunk)
+            return
+
+        segments = self._state["segments"]
+        received = sum(segment[2] for segment in segments)
+        # the initial response continues only a new single segment download,
+        # otherwise it is replaced with the range requests
+        reuse_response = len(segments) == 1 and not received
+        if not reuse_response:
+            self._http_response.close()
+        if received:
+            yield received
+        else:
+            with open(self._destination, "wb") as fp:
+                if len(segments) > 1:
+                    fp.truncate(self.get_size())
+        self._save_state()
+        try:
+            if len(segments) > 1:
+                # the data is not received in order, the checksum is
+                # computed from the complete file
+                self._hash = None
+                yield from self._iter_received_segments()
+            else:
+                if received:
+                    self._feed_received_data(received, data_callback)
+                yield from self._iter_received_segment(
+                    segments[0],
+                    data_callback,
+                    response=self._http_response if reuse_response else None,
+                )
+        finally:
+            if all(start + received >= end for start, end, received in segments):
+                os.remove(self.get_state_path())
+            else:
+                self._save_state()
+
+    def _feed_received_data(self, size, data_callback):
+        with open(self._destination, "rb") as fp:
+            while size > 0:
+                chunk = fp.read(min(size, self.WRITE_BUFFER_SIZE))
+                if not chunk:
+                    break
+                size -= len(chunk)
+                if self._hash is not None:
+                    self._hash.update(chunk)
+                if data_callback:
+                    data_callback(chunk)
+
+    def _iter_received_segments(self):
+        received_sizes = queue.Queue()
+
+        def _download(segment):
+            for size in self._iter_received_segment(segment):
+                received_sizes.put(size)
+
+        segments = self._state["segments"]
+        with ThreadPoolExecutor(max_workers=len(segments)) as executor:
+            futures = [executor.submit(_download, segment) for segment in segments]
+            while not all(future.done() for future in futures):
+                try:
+                    yield received_sizes.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            while not received_sizes.empty():
+                yield received_sizes.get_nowait()
+            for future in futures:
+                future.result()
+
+    def _iter_received_segment(self, segment, data_callback=None, response=None):
+        start, end, received = segment
+        if start + received >= end:
+            return
+        http_session = None
+        if not response:
+            http_session = HTTPSession()
+            response = http_session.get(
+                self._url,
+                stream=True,
+                headers={
+                    "Range": "bytes=%d-%d" % (start + received, end - 1),
+                    "Accept-Encoding": "identity",
+                },
+            )
+            if response.status_code != 206 or not response.headers.get(
+                "content-range", ""
+            ).startswith("bytes %d-" % (start + received)):
+                response.close()
+                http_session.close()
+                raise PackageException(
+                    "Could not resume downloading of %s, the server does not "
+                    "support range requests" % self._fname
+                )
+        try:
+            with open(self._destination, "r+b", buffering=self.WRITE_BUFFER_SIZE) as fp:
+                fp.seek(start + received)
+                saved_size = received
+                for chunk in self._iter_content(response, data_callback):
+                    chunk = chunk[: end - start - received]
+                    fp.write(chunk)
+                    received += len(chunk)
+                    yield len(chunk)
+                    if received - saved_size >= self.STATE_SAVE_INTERVAL:
+                        # the state never refers to the data in the buffers
+                        fp.flush()
+                        segment[2] = saved_size = received
+                        self._save_state()
+                    if start + received >= end:
+                        break
+        finally:
+            segment[2] = received
+            response.close()
+            if http_session:
+                http_session.close()
+
+    def _iter_content(self, response, data_callback=None):
+        for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+            if self._hash is not None:
+                self._hash.update(chunk)
+            if data_callback:
+                data_callback(chunk)
+            yield chunk
+
     def verify(self, checksum=None):
+        if self._state and any(
+            start + received < end for start, end, received in self._state["segments"]
+        ):
+            raise PackageException(
+                "The file '%s' has not been downloaded completely" % self._fname
+            )
         _dlsize = getsize(self._destination)
         if self.get_size() != -1 and _dlsize != self.get_size():
             raise PackageException(
@@ -131,21 +349,12 @@ class FileDownloader:
         if not checksum:
             return True
 
-        checksum_len = len(checksum)
-        hash_algo = None
-        if checksum_len == 32:
-            hash_algo = "md5"
-        elif checksum_len == 40:
-            hash_algo = "sha1"
-        elif checksum_len == 64:
-            hash_algo = "sha256"
-
-        if not hash_algo:
-            raise PackageException(
-                "Could not determine checksum algorithm by %s" % checksum
-            )
-
-        dl_checksum = fs.calculate_file_hashsum(hash_algo, self._destination)
+        hash_algo = self.get_checksum_algo(checksum)
+        if self._hash is not None and self._hash.name == hash_algo:
+            # computed while the file has been downloaded
+            dl_checksum = self._hash.hexdigest()
+        else:
+            dl_checksum = fs.calculate_file_hashsum(hash_algo, self._destination)
         if checksum.lower() != dl_checksum.lower():
             raise PackageException(
                 "The checksum '{0}' of the downloaded file '{1}' "
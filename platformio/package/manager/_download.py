@@ -15,7 +15,6 @@
 import hashlib
 import logging
 import os
-import tempfile
 import time
 
 import click
@@ -27,6 +26,7 @@ from platformio.package.lockfile import LockFile
 
 class PackageManagerDownloadMixin:
     DOWNLOAD_CACHE_EXPIRE = 86400 * 30  # keep package in a local cache for 1 month
+    DOWNLOAD_PARTIAL_SUFFIX = ".part"
 
     def compute_download_path(self, *args):
         request_hash = hashlib.new("sha1")
@@ -53,48 +53,95 @@ class PackageManagerDownloadMixin:
                 dl_path = os.path.join(self.get_download_dir(), fname)
                 if os.path.isfile(dl_path):
                     os.remove(dl_path)
+        # remove abandoned partial downloads
+        with os.scandir(self.get_download_dir()) as entries:
+            for entry in entries:
+                if entry.name.endswith(
+                    self.DOWNLOAD_PARTIAL_SUFFIX
+                ) and entry.stat().st_mtime < (
+                    time.time() - self.DOWNLOAD_CACHE_EXPIRE
+                ):
+                    self.remove_partial_download(entry.path)
 
-    def download(self, url, checksum=None):
-        silent = not self.log.isEnabledFor(logging.INFO)
+    @staticmethod
+    def remove_partial_download(path):
+        for item in (path, path + FileDownloader.STATE_SUFFIX):
+            if os.path.isfile(item):
+                os.remove(item)
+
+    def download(self, url, checksum=None, silent=None, stream_unpacker=None):
+        """Downloads a file to the local cache.
+
+        A `StreamUnpacker` extracts the archive while it is being downloaded.
+        The file is moved to the cache only if its checksum matches.
+        """
+        if silent is None:
+            silent = not self.log.isEnabledFor(logging.INFO)
         dl_path = self.compute_download_path(url, checksum or "")
         if os.path.isfile(dl_path):
             self.set_download_utime(dl_path)
             return dl_path
 
+        # an interrupted download is resumed from the partial file
+        tmp_path = dl_path + self.DOWNLOAD_PARTIAL_SUFFIX
+        with LockFile(dl_path):
+            try:
+                fd = self._start_download(
+                    url, tmp_path, checksum, silent, stream_unpacker
+                )
+                if checksum:
+                    fd.verify(checksum)
+            except IOError:
+                # the interrupted download is kept to be resumed
+                raise
+            except Exception:
+                self.remove_partial_download(tmp_path)
+                raise
+            os.replace(tmp_path, dl_path)
+            self.remove_partial_download(tmp_path)
+
+        assert os.path.isfile(dl_path)
+        self.set_download_utime(dl_path)
+        return dl_path
+
+    def _start_download(self, url, dst_path, checksum, silent, stream_unpacker):
         with_progress = not app.is_disabled_progressbar()
-        tmp_fd, tmp_path = tempfile.mkstemp(dir=self.get_download_dir())
+        segments = int(app.get_setting("download_segments") or 1)
         try:
-            with LockFile(dl_path):
+            fd = FileDownloader(url)
+            fd.set_destination(dst_path)
+            fd.start(
+                with_progress=with_progress,
+                silent=silent,
+                checksum=checksum,
+                data_callback=stream_unpacker.feed if stream_unpacker else None,
+                segments=segments,
+            )
+        except IOError as exc:
+            if stream_unpacker:
+                stream_unpacker.abort()
+            raise_error = not silent
+            if with_progress:
                 try:
                     fd = FileDownloader(url)
-                    fd.set_destination(tmp_path)
-                    fd.start(with_progress=with_progress, silent=silent)
-                except IOError as exc:
-                    raise_error = not silent
-                    if with_progress:
-                        try:
-                            fd = FileDownloader(url)
-                            fd.set_destination(tmp_path)
-                            fd.start(with_progress=False, silent=silent)
-                        except IOError:
-                            raise_error = True
-                    if raise_error:
-                        self.log.error(
-                            click.style(
-                                "Error: Please read https://bit.ly/package-manager-ioerror",
-                                fg="red",
-                            )
-                        )
-                        raise exc
-            if checksum:
-                fd.verify(checksum)
-            os.close(tmp_fd)
-            os.rename(tmp_path, dl_path)
+                    fd.set_destination(dst_path)
+                    fd.start(
+                        with_progress=False,
+                        silent=silent,
+                        checksum=checksum,
+                        segments=segments,
+                    )
+                except IOError:
+                    raise_error = True
+            if raise_error:
+                self.log.error(
+                    click.style(
+                        "Error: Please read https://bit.ly/package-manager-ioerror",
+                        fg="red",
+                    )
+                )
+                raise exc
         finally:
-            if os.path.isfile(tmp_path):
-                os.close(tmp_fd)
-                os.remove(tmp_path)
-
-        assert os.path.isfile(dl_path)
-        self.set_download_utime(dl_path)
-        return dl_path
+            if stream_unpacker:
+                stream_unpacker.finish()
+        return fd
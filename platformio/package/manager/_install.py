@@ -16,31 +16,63 @@ import hashlib
 import os
 import shutil
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 import click
 
 from platformio import app, compat, fs, util
+from platformio.http import HTTPClientError, InternetConnectionError
 from platformio.package.exception import PackageException, UnknownPackageError
-from platformio.package.meta import PackageCompatibility, PackageItem
-from platformio.package.unpack import FileUnpacker
+from platformio.package.meta import PackageCompatibility, PackageItem, PackageType
+from platformio.package.store import PackageStore
+from platformio.package.unpack import FileUnpacker, StreamUnpacker
 from platformio.package.vcsclient import VCSClientFactory
+from platformio.registry.mirror import RegistryFileMirrorIterator
 
 
 class PackageManagerInstallMixin:
     _INSTALL_HISTORY = None  # avoid circle dependencies
+    _PREFETCHED_PACKAGES = None  # {checksum or url: unpacked tmp dir}
+    PREFETCH_MAX_WORKERS = 4
 
     @staticmethod
-    def unpack(src, dst):
-        with_progress = not app.is_disabled_progressbar()
+    def unpack(src, dst, silent=False):
+        with_progress = not silent and not app.is_disabled_progressbar()
         try:
             with FileUnpacker(src) as fu:
-                return fu.unpack(dst, with_progress=with_progress)
+                return fu.unpack(dst, with_progress=with_progress, silent=silent)
         except IOError as exc:
             if not with_progress:
                 raise exc
             with FileUnpacker(src) as fu:
                 return fu.unpack(dst, with_progress=False)
 
+    def download_and_unpack(self, url, dst, checksum=None, silent=None):
+        """Extracts a TAR archive while it is being downloaded. The other
+        archives and the cached downloads are unpacked from the file"""
+        unpacker = StreamUnpacker(dst)
+        dl_path = self.download(url, checksum, silent=silent, stream_unpacker=unpacker)
+        if not unpacker.finish():
+            self.unpack(dl_path, dst, silent=bool(silent))
+        return dl_path
+
+    def fetch_package(self, url, dst, checksum=None, silent=None):
+        """Unpacks a remote package to `dst`. A package with the known
+        checksum is unpacked once into the `PackageStore` and is cloned from
+        it by the next installations"""
+        if not checksum:
+            return self.download_and_unpack(url, dst, silent=silent)
+        return PackageStore().install(
+            checksum,
+            dst,
+            lambda tree_dir: self.download_and_unpack(
+                url, tree_dir, checksum, silent=silent
+            ),
+            # the libraries are edited by users, they do not share the files
+            hardlinks=self.pkg_type != PackageType.LIBRARY,
+        )
+
     def install(self, spec, skip_dependencies=False, force=False):
         try:
             self.lock()
@@ -51,6 +83,143 @@ class PackageManagerInstallMixin:
         finally:
             self.unlock()
 
+    def install_many(self, specs, skip_dependencies=False, force=False):
+        """Download and unpack the missing packages concurrently, then
+        install them one by one in the declared order"""
+        if not specs:
+            return []
+        try:
+            self.lock()
+            specs = [self.ensure_spec(spec) for spec in specs]
+            with self.prefetched_packages(
+                specs, skip_dependencies=skip_dependencies, force=force
+            ):
+                result = [
+                    self._install(
+                        spec, skip_dependencies=skip_dependencies, force=force
+                    )
+                    for spec in specs
+                ]
+            self.memcache_reset()
+            self.cleanup_expired_downloads()
+            return result
+        finally:
+            self.unlock()
+
+    @contextmanager
+    def prefetched_packages(self, specs, skip_dependencies=False, force=False):
+        """Downloads and unpacks the missing packages and their dependencies
+        concurrently, the installations within the context reuse them"""
+        try:
+            specs = [self.ensure_spec(spec) for spec in specs]
+            self.prefetch_packages(
+                [spec for spec in specs if force or not self.get_package(spec)],
+                skip_dependencies=skip_dependencies,
+            )
+            yield
+        finally:
+            self.cleanup_prefetched_packages()
+
+    def prefetch_packages(self, specs, skip_dependencies=False):
+        """The dependencies are resolved from the manifests of the prefetched
+        packages and are prefetched level by level"""
+        if self._PREFETCHED_PACKAGES is None:
+            self._PREFETCHED_PACKAGES = {}
+        visited_specs = set()
+        while specs:
+            # symlinks, local folders and VCS repositories are installed in place
+            specs = [
+                spec
+                for spec in dict.fromkeys(specs)
+                if spec not in visited_specs
+                and (not spec.external or spec.uri.startswith(("http://", "https://")))
+            ]
+            if not specs:
+                break
+            visited_specs.update(specs)
+            dependencies = []
+            with ThreadPoolExecutor(
+                max_workers=min(self.PREFETCH_MAX_WORKERS, len(specs))
+            ) as executor:
+                for spec, item in zip(
+                    specs, executor.map(self._prefetch_package, specs)
+                ):
+                    if not item:
+                        continue
+                    if item[0] in self._PREFETCHED_PACKAGES:
+                        fs.rmtree(item[1])
+                        continue
+                    self._PREFETCHED_PACKAGES[item[0]] = item[1]
+                    if not skip_dependencies:
+                        dependencies.extend(
+                            self._get_prefetched_dependencies(spec, item[1])
+                        )
+            specs = dependencies
+
+    def _prefetch_package(self, spec):
+        tmp_dir = None
+        try:
+            if spec.external:
+                url, checksum = spec.uri, None
+            elif spec.owner and spec.name:
+                _, pkgfile = self.find_registry_package_file(spec)
+                mirror = next(
+                    iter(RegistryFileMirrorIterator(pkgfile["download_url"])), None
+                )
+                if not mirror:  # the regular installation reports an error
+                    return None
+                url, checksum = mirror
+                checksum = checksum or pkgfile["checksum"]["sha256"]
+            else:  # ambiguous specs are resolved later with warnings
+                return None
+            tmp_dir = tempfile.mkdtemp(
+                prefix="pkg-prefetching-", dir=self.get_tmp_dir()
+            )
+            self.fetch_package(url, tmp_dir, checksum, silent=True)
+            return (checksum or url, tmp_dir)
+        except (
+            PackageException,
+            HTTPClientError,
+            InternetConnectionError,
+            IOError,
+        ) as exc:
+            # the regular installation will retry and report an error
+            self.log.debug(
+                click.style(
+                    "Could not prefetch `%s`: %s" % (spec.humanize(), exc),
+                    fg="yellow",
+                )
+            )
+            if tmp_dir and os.path.isdir(tmp_dir):
+                fs.rmtree(tmp_dir)
+        return None
+
+    def _get_prefetched_dependencies(self, spec, tmp_dir):
+        """Returns the specs of the missing dependencies of a prefetched
+        package, see `install_dependency()`"""
+        try:
+            dependencies = self.get_pkg_dependencies(
+                PackageItem(self.find_pkg_root(tmp_dir, spec))
+            )
+        except PackageException:
+            return []
+        result = []
+        for dependency in dependencies or []:
+            if self.compatibility and not PackageCompatibility.from_dependency(
+                dependency
+            ).is_compatible(self.compatibility):
+                continue
+            dependency_spec = self.dependency_to_spec(dependency)
+            if not self.get_package(dependency_spec):
+                result.append(dependency_spec)
+        return result
+
+    def cleanup_prefetched_packages(self):
+        for tmp_dir in (self._PREFETCHED_PACKAGES or {}).values():
+            if os.path.isdir(tmp_dir):
+                fs.rmtree(tmp_dir)
+        self._PREFETCHED_PACKAGES = None
+
     def _install(
         self,
         spec,
@@ -186,9 +355,14 @@ class PackageManagerInstallMixin:
                     fs.rmtree(tmp_dir)
                     shutil.copytree(_uri, tmp_dir, symlinks=True)
             elif uri.startswith(("http://", "https://")):
-                dl_path = self.download(uri, checksum)
-                assert os.path.isfile(dl_path)
-                self.unpack(dl_path, tmp_dir)
+                prefetched_dir = (self._PREFETCHED_PACKAGES or {}).pop(
+                    checksum or uri, None
+                )
+                if prefetched_dir:
+                    fs.rmtree(tmp_dir)
+                    tmp_dir = prefetched_dir
+                else:
+                    self.fetch_package(uri, tmp_dir, checksum)
             else:
                 vcs = VCSClientFactory.new(tmp_dir, uri)
                 assert vcs.export()
@@ -268,10 +442,10 @@ class PackageManagerInstallMixin:
             # move existing into the new place
             pkg_dir = os.path.join(self.package_dir, target_dirname)
             _cleanup_dir(pkg_dir)
-            shutil.copytree(dst_pkg.path, pkg_dir, symlinks=True)
+            fs.clone_tree(dst_pkg.path, pkg_dir)
             # move new source to the destination location
             _cleanup_dir(dst_pkg.path)
-            shutil.copytree(tmp_pkg.path, dst_pkg.path, symlinks=True)
+            fs.clone_tree(tmp_pkg.path, dst_pkg.path)
             return PackageItem(dst_pkg.path)
 
         if action == "detach-new":
@@ -288,10 +462,10 @@ class PackageManagerInstallMixin:
                 )
             pkg_dir = os.path.join(self.package_dir, target_dirname)
             _cleanup_dir(pkg_dir)
-            shutil.copytree(tmp_pkg.path, pkg_dir, symlinks=True)
+            fs.clone_tree(tmp_pkg.path, pkg_dir)
             return PackageItem(pkg_dir)
 
         # otherwise, overwrite existing
         _cleanup_dir(dst_pkg.path)
-        shutil.copytree(tmp_pkg.path, dst_pkg.path, symlinks=True)
+        fs.clone_tree(tmp_pkg.path, dst_pkg.path)
         return PackageItem(dst_pkg.path)
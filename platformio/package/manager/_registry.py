@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 
@@ -24,7 +27,36 @@ from platformio.registry.mirror import RegistryFileMirrorIterator
 
 
 class PackageManagerRegistryMixin:
+    REGISTRY_MAX_WORKERS = 8
+    REGISTRY_MEMO_EXPIRE = 300  # seconds
+    # the registry documents shared by package managers of all environments
+    _REGISTRY_MEMO = {}
+    _REGISTRY_MEMO_LOCK = threading.Lock()
+
     def install_from_registry(self, spec, search_qualifiers=None):
+        package, pkgfile = self.find_registry_package_file(spec, search_qualifiers)
+        for url, checksum in RegistryFileMirrorIterator(pkgfile["download_url"]):
+            try:
+                return self.install_from_uri(
+                    url,
+                    PackageSpec(
+                        owner=package["owner"]["username"],
+                        id=package["id"],
+                        name=package["name"],
+                    ),
+                    checksum or pkgfile["checksum"]["sha256"],
+                )
+            except Exception as exc:  # pylint: disable=broad-except
+                self.log.warning(
+                    click.style("Warning! Package Mirror: %s" % exc, fg="yellow")
+                )
+                self.log.warning(
+                    click.style("Looking for another mirror...", fg="yellow")
+                )
+
+        return None
+
+    def find_registry_package_file(self, spec, search_qualifiers=None):
         package = version = None
         if spec.owner and spec.name and not search_qualifiers:
             package = self.fetch_registry_package(spec)
@@ -46,32 +78,55 @@ class PackageManagerRegistryMixin:
         if not pkgfile:
             raise UnknownPackageError(spec.humanize())
 
-        for url, checksum in RegistryFileMirrorIterator(pkgfile["download_url"]):
-            try:
-                return self.install_from_uri(
-                    url,
-                    PackageSpec(
-                        owner=package["owner"]["username"],
-                        id=package["id"],
-                        name=package["name"],
-                    ),
-                    checksum or pkgfile["checksum"]["sha256"],
-                )
-            except Exception as exc:  # pylint: disable=broad-except
-                self.log.warning(
-                    click.style("Warning! Package Mirror: %s" % exc, fg="yellow")
-                )
-                self.log.warning(
-                    click.style("Looking for another mirror...", fg="yellow")
-                )
-
-        return None
+        return (package, pkgfile)
 
     def get_registry_client_instance(self):
         if not self._registry_client:
             self._registry_client = RegistryClient()
         return self._registry_client
 
+    @classmethod
+    def registry_memo_reset(cls):
+        with cls._REGISTRY_MEMO_LOCK:
+            cls._REGISTRY_MEMO.clear()
+
+    def _memoize_registry_call(self, key, func):
+        with self._REGISTRY_MEMO_LOCK:
+            item = self._REGISTRY_MEMO.get(key)
+        if item and item[0] > time.time() - self.REGISTRY_MEMO_EXPIRE:
+            return item[1]
+        result = func()
+        with self._REGISTRY_MEMO_LOCK:
+            self._REGISTRY_MEMO[key] = (time.time(), result)
+        return result
+
+    def prefetch_registry_packages(self, specs):
+        """Fetches the registry metadata of the specs concurrently, the best
+        versions are picked later from the memoized documents"""
+        specs = [
+            spec
+            for spec in dict.fromkeys(self.ensure_spec(spec) for spec in specs)
+            if not spec.external and (spec.id or spec.name)
+        ]
+        if len(specs) < 2:
+            return
+        with ThreadPoolExecutor(
+            max_workers=min(self.REGISTRY_MAX_WORKERS, len(specs))
+        ) as executor:
+            list(executor.map(self._prefetch_registry_package, specs))
+
+    def _prefetch_registry_package(self, spec):
+        try:
+            if spec.owner and spec.name:
+                self.fetch_registry_package(spec)
+            else:
+                self.find_best_registry_version(
+                    self.search_registry_packages(spec), spec
+                )
+        except Exception:  # pylint: disable=broad-except
+            # the regular resolution will retry and report an error
+            pass
+
     def search_registry_packages(self, spec, qualifiers=None):
         assert isinstance(spec, PackageSpec)
         qualifiers = qualifiers or {}
@@ -82,26 +137,36 @@ class PackageManagerRegistryMixin:
             qualifiers["names"] = spec.name.lower()
             if spec.owner:
                 qualifiers["owners"] = spec.owner.lower()
-        return self.get_registry_client_instance().list_packages(qualifiers=qualifiers)[
-            "items"
-        ]
+        return self._memoize_registry_call(
+            ("search", json.dumps(qualifiers, sort_keys=True)),
+            lambda: self.get_registry_client_instance().list_packages(
+                qualifiers=qualifiers
+            )["items"],
+        )
 
     def fetch_registry_package(self, spec):
         assert isinstance(spec, PackageSpec)
         result = None
-        regclient = self.get_registry_client_instance()
         if spec.owner and spec.name:
-            result = regclient.get_package(self.pkg_type, spec.owner, spec.name)
+            result = self._get_registry_package(spec.owner, spec.name)
         if not result and (spec.id or (spec.name and not spec.owner)):
             packages = self.search_registry_packages(spec)
             if packages:
-                result = regclient.get_package(
-                    self.pkg_type, packages[0]["owner"]["username"], packages[0]["name"]
+                result = self._get_registry_package(
+                    packages[0]["owner"]["username"], packages[0]["name"]
                 )
         if not result:
             raise UnknownPackageError(spec.humanize())
         return result
 
+    def _get_registry_package(self, owner, name):
+        return self._memoize_registry_call(
+            ("package", self.pkg_type, owner.lower(), name.lower()),
+            lambda: self.get_registry_client_instance().get_package(
+                self.pkg_type, owner, name
+            ),
+        )
+
     def reveal_registry_package_id(self, spec):
         spec = self.ensure_spec(spec)
         if spec.id:
@@ -160,7 +225,6 @@ class PackageManagerRegistryMixin:
             )
             if version:
                 return (package, version)
-            time.sleep(1)
         return (None, None)
 
     def get_compatible_registry_versions(self, versions, spec=None, custom_system=None):
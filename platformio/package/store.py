@@ -0,0 +1,142 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import stat
+import tempfile
+import time
+
+from platformio import exception, fs
+from platformio.package.lockfile import LockFile
+from platformio.package.meta import PackageItem
+from platformio.project.helpers import get_project_cache_dir
+
+
+class PackageStore:
+    """Unpacked packages shared between the package managers and projects.
+
+    An entry is addressed by the checksum of a package archive and holds the
+    unpacked tree and a manifest with the size and the modification time of
+    every file. The packages are installed as clones of the tree (see
+    `fs.clone_tree()`), and an entry which files have been modified in place
+    through a hard link is unpacked again. The packages which are edited by
+    users (e.g., the project libraries) should be installed without the hard
+    links, otherwise the edits are shared with the store and other installs.
+    """
+
+    TREE_DIR = "tree"
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir or os.path.join(get_project_cache_dir(), "packages")
+
+    def get_entry_dir(self, checksum):
+        assert checksum and "/" not in checksum and "\\" not in checksum
+        return os.path.join(self.store_dir, checksum.lower())
+
+    def install(self, checksum, dst_dir, unpack_func, hardlinks=True):
+        """Clones the package to `dst_dir`, the package is unpacked into the
+        store with `unpack_func(tree_dir)` only if there is no valid entry"""
+        entry_dir = self.get_entry_dir(checksum)
+        os.makedirs(self.store_dir, exist_ok=True)
+        with LockFile(entry_dir):
+            if not self.is_valid_entry(entry_dir):
+                self._add_entry(entry_dir, unpack_func)
+            fs.clone_tree(
+                os.path.join(entry_dir, self.TREE_DIR),
+                dst_dir,
+                # the metadata is written to the installed package
+                ignore_names=[PackageItem.METAFILE_NAME],
+                hardlinks=hardlinks,
+            )
+        return entry_dir
+
+    def is_valid_entry(self, entry_dir):
+        try:
+            manifest = fs.load_json(os.path.join(entry_dir, self.MANIFEST_NAME))
+        except (OSError, ValueError, exception.InvalidJSONFile):
+            return False
+        tree_dir = os.path.join(entry_dir, self.TREE_DIR)
+        for path, (size, mtime) in manifest.get("files", {}).items():
+            try:
+                st = os.lstat(os.path.join(tree_dir, path))
+            except OSError:
+                return False
+            if st.st_size != size or st.st_mtime_ns != mtime:
+                return False
+        return True
+
+    def _add_entry(self, entry_dir, unpack_func):
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=self.store_dir)
+        try:
+            tree_dir = os.path.join(tmp_dir, self.TREE_DIR)
+            os.makedirs(tree_dir)
+            unpack_func(tree_dir)
+            files = {}
+            for root, _, names in os.walk(tree_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    st = os.lstat(path)
+                    if stat.S_ISREG(st.st_mode):
+                        files[os.path.relpath(path, tree_dir)] = [
+                            st.st_size,
+                            st.st_mtime_ns,
+                        ]
+            with open(
+                os.path.join(tmp_dir, self.MANIFEST_NAME), mode="w", encoding="utf8"
+            ) as fp:
+                json.dump({"files": files}, fp)
+            if os.path.isdir(entry_dir):
+                fs.rmtree(entry_dir)
+            os.rename(tmp_dir, entry_dir)
+        finally:
+            if os.path.isdir(tmp_dir):
+                fs.rmtree(tmp_dir)
+
+    def get_unused_entries(self):
+        """Returns a list of `(size, path)` of the entries which files are not
+        shared with the installed packages"""
+        result = []
+        if not os.path.isdir(self.store_dir):
+            return result
+        for entry in os.scandir(self.store_dir):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            # skip the entries which are being unpacked by other processes
+            if entry.name.startswith(".tmp-") and entry.stat().st_mtime > (
+                time.time() - 86400
+            ):
+                continue
+            size = self._get_unshared_size(entry.path)
+            if size is not None:
+                result.append((size, entry.path))
+        return result
+
+    @staticmethod
+    def _get_unshared_size(path):
+        size = 0
+        for root, _, names in os.walk(path):
+            for name in names:
+                st = os.lstat(os.path.join(root, name))
+                if stat.S_ISREG(st.st_mode) and st.st_nlink > 1:
+                    return None
+                size += st.st_size
+        return size
+
+    def remove_entries(self, paths):
+        for path in paths:
+            with LockFile(path):
+                if os.path.isdir(path):
+                    fs.rmtree(path)
@@ -12,8 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 import os
+import shutil
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from tarfile import open as tarfile_open
 from time import mktime
 from zipfile import ZipFile
@@ -52,13 +56,34 @@ class BaseArchiver:
     def after_extract(self, item, dest_dir):
         pass
 
+    def extract_items(self, items, dest_dir, check_unpacked=True):
+        """Extracts the items and yields every item when it is extracted"""
+        for item in items:
+            self.extract_item(item, dest_dir)
+            if check_unpacked:
+                self.check_unpacked_item(item, dest_dir)
+            yield item
+
+    def check_unpacked_item(self, item, dest_dir):
+        filename = self.get_item_filename(item)
+        try:
+            if not self.is_link(item) and not os.path.exists(
+                os.path.join(dest_dir, filename)
+            ):
+                raise ExtractArchiveItemError(filename, dest_dir)
+        except NotImplementedError:
+            pass
+
     def close(self):
         self._afo.close()
 
 
 class TARArchiver(BaseArchiver):
-    def __init__(self, archpath):
-        super().__init__(tarfile_open(archpath))  # pylint: disable=consider-using-with
+    def __init__(self, archpath, fileobj=None):
+        super().__init__(
+            # pylint: disable=consider-using-with
+            tarfile_open(archpath, mode="r|*" if fileobj else "r", fileobj=fileobj)
+        )
 
     def get_items(self):
         return self._afo.getmembers()
@@ -102,9 +127,32 @@ class TARArchiver(BaseArchiver):
         return super().extract_item(item, dest_dir)
 
 
+class TARStreamArchiver(TARArchiver):
+    """Reads a TAR archive sequentially, the items are extracted while
+    they are being iterated"""
+
+    def __init__(self, fileobj):
+        super().__init__(None, fileobj=fileobj)
+
+    def get_items(self):
+        return iter(self._afo)
+
+
 class ZIPArchiver(BaseArchiver):
+    """Extracts the files concurrently, ZIP allows random access to the
+    items. The directories are created before the files and their
+    permissions and modification times are applied at the end."""
+
+    MAX_WORKERS = 8
+    CHUNK_SIZE = 64
+    COPY_BUFSIZE = 1024 * 1024
+    WINDOWS_ILLEGAL_CHARS = str.maketrans(':<>|"?*', "_______")
+
     def __init__(self, archpath):
         super().__init__(ZipFile(archpath))  # pylint: disable=consider-using-with
+        # `ZipFile.open()` and `ZipExtFile.close()` are not thread-safe
+        self._lock = threading.Lock()
+        self._mtimes = {}  # most of the items share a few timestamps
 
     @staticmethod
     def preserve_permissions(item, dest_dir):
@@ -115,10 +163,13 @@ class ZIPArchiver(BaseArchiver):
     @staticmethod
     def preserve_mtime(item, dest_dir):
         fs.change_filemtime(
-            os.path.join(dest_dir, item.filename),
-            mktime(tuple(item.date_time) + tuple([0, 0, 0])),
+            os.path.join(dest_dir, item.filename), ZIPArchiver.get_item_mtime(item)
         )
 
+    @staticmethod
+    def get_item_mtime(item):
+        return mktime(tuple(item.date_time) + tuple([0, 0, 0]))
+
     @staticmethod
     def is_link(_):  # pylint: disable=arguments-differ
         return False
@@ -129,10 +180,98 @@ class ZIPArchiver(BaseArchiver):
     def get_item_filename(self, item):
         return item.filename
 
+    def get_item_path(self, item, dest_dir):
+        """Returns the same path as `ZipFile.extract()`: absolute paths,
+        drive letters, and "." and ".." components are removed"""
+        arcname = item.filename.replace("/", os.path.sep)
+        if os.path.altsep:
+            arcname = arcname.replace(os.path.altsep, os.path.sep)
+        arcname = os.path.splitdrive(arcname)[1]
+        parts = [
+            part
+            for part in arcname.split(os.path.sep)
+            if part not in ("", os.path.curdir, os.path.pardir)
+        ]
+        if os.path.sep == "\\":
+            parts = [
+                part.translate(self.WINDOWS_ILLEGAL_CHARS).rstrip(" .")
+                for part in parts
+            ]
+            parts = [part for part in parts if part]
+        return os.path.normpath(os.path.join(dest_dir, *parts))
+
     def after_extract(self, item, dest_dir):
         self.preserve_permissions(item, dest_dir)
         self.preserve_mtime(item, dest_dir)
 
+    def extract_items(self, items, dest_dir, check_unpacked=True):
+        dirs = {}
+        files = []
+        for item in items:
+            path = self.get_item_path(item, dest_dir)
+            if item.is_dir():
+                dirs[path] = item
+            else:
+                dirs.setdefault(os.path.dirname(path), None)
+                files.append((item, path))
+        for path in sorted(dirs):
+            os.makedirs(path, exist_ok=True)
+
+        # the items are extracted in chunks, a task per small file costs more
+        # than its extraction
+        chunks = [
+            files[i : i + self.CHUNK_SIZE]
+            for i in range(0, len(files), self.CHUNK_SIZE)
+        ]
+        workers = min(self.MAX_WORKERS, os.cpu_count() or 1, len(chunks))
+        if workers < 2:
+            for chunk in chunks:
+                yield from self._extract_files(chunk)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self._extract_files, chunk) for chunk in chunks
+                ]
+                try:
+                    for future in as_completed(futures):
+                        yield from future.result()
+                finally:
+                    for future in futures:
+                        future.cancel()
+
+        # the nested directories first, writing of files changes their mtime
+        for path in sorted(dirs, reverse=True):
+            item = dirs[path]
+            if item:
+                self._apply_item_metadata(item, path)
+                yield item
+
+    def _extract_files(self, files):
+        for item, path in files:
+            with self._lock:
+                src = self._afo.open(item)
+            try:
+                with open(path, "wb") as dst:
+                    if item.file_size > self.COPY_BUFSIZE:
+                        shutil.copyfileobj(src, dst, self.COPY_BUFSIZE)
+                    else:
+                        dst.write(src.read())
+            finally:
+                with self._lock:
+                    src.close()
+            # the file is created above, there is nothing to check on disk
+            self._apply_item_metadata(item, path)
+        return [item for item, _ in files]
+
+    def _apply_item_metadata(self, item, path):
+        attrs = item.external_attr >> 16
+        if attrs:
+            os.chmod(path, attrs)
+        mtime = self._mtimes.get(item.date_time)
+        if mtime is None:
+            mtime = self._mtimes[item.date_time] = self.get_item_mtime(item)
+        fs.change_filemtime(path, mtime)
+
 
 class FileUnpacker:
     def __init__(self, path):
@@ -165,25 +304,27 @@ class FileUnpacker:
 
     def unpack(
         self, dest_dir=None, with_progress=True, check_unpacked=True, silent=False
-    ):  # pylint: disable=too-many-branches
+    ):
         assert self._archiver
         label = "Unpacking"
         items = self._archiver.get_items()
         if not dest_dir:
             dest_dir = os.getcwd()
+        extracted_items = self._archiver.extract_items(
+            items, dest_dir, check_unpacked=check_unpacked
+        )
 
         if not with_progress or silent:
             if not silent:
                 click.echo(f"{label}...")
-            for item in items:
-                self._archiver.extract_item(item, dest_dir)
+            for _ in extracted_items:
+                pass
         elif not is_terminal():
             click.echo(f"{label} 0%", nl=False)
             print_percent_step = 10
             printed_percents = 0
             unpacked_nums = 0
-            for item in items:
-                self._archiver.extract_item(item, dest_dir)
+            for _ in extracted_items:
                 unpacked_nums += 1
                 if (unpacked_nums / len(items) * 100) >= (
                     printed_percents + print_percent_step
@@ -193,23 +334,94 @@ class FileUnpacker:
             click.echo("")
         else:
             with click.progressbar(
-                items,
+                extracted_items,
+                length=len(items),
                 label=label,
                 update_min_steps=min(50, len(items) / 100),  # every 50 files or less
             ) as pb:
-                for item in pb:
-                    self._archiver.extract_item(item, dest_dir)
+                for _ in pb:
+                    pass
+
+        return True
 
-        if not check_unpacked:
-            return True
 
-        # check on disk
-        for item in self._archiver.get_items():
-            filename = self._archiver.get_item_filename(item)
-            item_path = os.path.join(dest_dir, filename)
+class StreamUnpacker:
+    """Extracts a compressed TAR archive while its data is being received.
+
+    The data is passed to `feed()` and is extracted by a background thread.
+    Other archive types and extraction errors are not fatal: `finish()`
+    returns `False` and leaves `dest_dir` empty, so the caller unpacks the
+    complete file with `FileUnpacker`.
+    """
+
+    MAGICS = (b"\x1f\x8b\x08", b"\x42\x5a\x68", b"\xfd\x37\x7a\x58\x5a\x00")
+
+    def __init__(self, dest_dir):
+        self.dest_dir = dest_dir
+        self._writer = None
+        self._thread = None
+        self._enabled = True
+        self._unpacked = False
+
+    def feed(self, data):
+        if not self._enabled:
+            return
+        if not self._thread:
+            if not data.startswith(self.MAGICS):
+                self._enabled = False
+                return
+            reader_fd, writer_fd = os.pipe()
+            # pylint: disable=consider-using-with
+            self._writer = io.open(writer_fd, "wb")
+            self._thread = threading.Thread(
+                target=self._extract, args=(io.open(reader_fd, "rb"),), daemon=True
+            )
+            self._thread.start()
+        try:
+            self._writer.write(data)
+        except (OSError, ValueError):
+            self._enabled = False
+
+    def finish(self):
+        """Waits for the extraction and returns `True` if the whole archive
+        has been extracted"""
+        if self._writer:
             try:
-                if not self._archiver.is_link(item) and not os.path.exists(item_path):
-                    raise ExtractArchiveItemError(filename, dest_dir)
-            except NotImplementedError:
+                self._writer.close()
+            except OSError:
                 pass
-        return True
+            self._writer = None
+        if self._thread:
+            self._thread.join()
+        if self._thread and not self._unpacked:
+            self._cleanup()
+        return self._unpacked
+
+    def abort(self):
+        self._enabled = False
+        self.finish()
+        self._unpacked = False
+        self._cleanup()
+
+    def _cleanup(self):
+        for entry in os.listdir(self.dest_dir):
+            path = os.path.join(self.dest_dir, entry)
+            if os.path.isdir(path) and not os.path.islink(path):
+                fs.rmtree(path)
+            else:
+                os.remove(path)
+
+    def _extract(self, reader):
+        try:
+            archiver = TARStreamArchiver(reader)
+            for _ in archiver.extract_items(archiver.get_items(), self.dest_dir):
+                pass
+            self._unpacked = True
+        except Exception:  # pylint: disable=broad-except
+            # the complete file is unpacked later with `FileUnpacker`
+            self._unpacked = False
+        finally:
+            # consume the rest of the data, the writer must never be blocked
+            while reader.read(io.DEFAULT_BUFFER_SIZE):
+                pass
+            reader.close()
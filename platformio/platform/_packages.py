@@ -70,10 +70,18 @@ class PlatformPackagesMixin:
         return self.pm.install(spec or self.get_package_spec(name), force=force)
 
     def install_required_packages(self, force=False):
-        for name, options in self.packages.items():
-            if options.get("optional"):
-                continue
-            self.install_package(name, force=force)
+        names = [
+            name
+            for name, options in self.packages.items()
+            if not options.get("optional")
+        ]
+        # dev-platforms may override `install_package()`, only the downloads
+        # are done concurrently
+        with self.pm.prefetched_packages(
+            [self.get_package_spec(name) for name in names], force=force
+        ):
+            for name in names:
+                self.install_package(name, force=force)
 
     def uninstall_packages(self):
         for pkg in self.get_installed_packages():
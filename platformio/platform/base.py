@@ -176,7 +176,7 @@ class PlatformBase(  # pylint: disable=too-many-instance-attributes,too-many-pub
         return self.packages[name].get("type")
 
     def configure_project_packages(self, env, targets=None):
-        options = self.config.items(env=env, as_dict=True)
+        options = self.config.resolve_env(env)
         if "framework" in options:
             # support PIO Core 3.0 dev/platforms
             options["pioframework"] = options["framework"]
@@ -12,7 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import codecs
+import io
 import os
+import re
 import subprocess
 import sys
 from contextlib import contextmanager
@@ -59,36 +62,63 @@ class AsyncPipeBase:
 
 
 class BuildAsyncPipe(AsyncPipeBase):
+    READ_SIZE = 64 * 1024
+    # 4 same non-whitespace characters in a line, such as "====" or "####",
+    # are a progress bar that should be printed immediately
+    PROGRESS_BAR_RE = re.compile(r"(\S)\1{3}")
+
     def __init__(self, line_callback, data_callback):
         self.line_callback = line_callback
         self.data_callback = data_callback
         super().__init__()
 
     def do_reading(self):
+        # the universal newlines mode as the text pipe reader does
+        decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(errors="backslashreplace"),
+            translate=True,
+        )
+        fd = self._pipe_reader.fileno()
         line = ""
         print_immediately = False
-
-        for char in iter(lambda: self._pipe_reader.read(1), ""):
-            # self._buffer += char
-
-            if line and char.strip() and line[-3:] == (char * 3):
-                print_immediately = True
-
-            if print_immediately:
-                # leftover bytes
-                if line:
-                    self.data_callback(line)
-                    line = ""
-                self.data_callback(char)
-                if char == "\n":
-                    print_immediately = False
-            else:
-                line += char
-                if char != "\n":
+        while True:
+            data = os.read(fd, self.READ_SIZE)
+            chunk = decoder.decode(data, final=not data)
+            pos = 0
+            while pos < len(chunk):
+                if print_immediately:
+                    end = chunk.find("\n", pos) + 1 or len(chunk)
+                    self.data_callback(chunk[pos:end])
+                    print_immediately = not chunk.endswith("\n", pos, end)
+                    pos = end
                     continue
-                self.line_callback(line)
-                line = ""
-
+                # lines before a progress bar are split in bulk
+                tail = line[-3:]
+                match = self.PROGRESS_BAR_RE.search(tail + chunk[pos : pos + 3])
+                if match:
+                    end = pos + match.end() - 1 - len(tail)
+                else:
+                    match = self.PROGRESS_BAR_RE.search(chunk, pos)
+                    end = match.end() - 1 if match else len(chunk)
+                nl_pos = chunk.rfind("\n", pos, end)
+                if nl_pos != -1:
+                    for item in (line + chunk[pos:nl_pos]).split("\n"):
+                        self.line_callback(item + "\n")
+                    line = ""
+                    pos = nl_pos + 1
+                line += chunk[pos:end]
+                pos = end
+                if match:
+                    # leftover bytes
+                    if line:
+                        self.data_callback(line)
+                        line = ""
+                    print_immediately = True
+            if not data:
+                break
+
+        if line:
+            self.line_callback(line)
         self._pipe_reader.close()
 
 
@@ -140,6 +170,38 @@ def exec_command(*args, **kwargs):
     return result
 
 
+def exec_command_with_usage(args, **kwargs):
+    """Run a command with merged output and report the CPU time of its tree"""
+    result = {"out": None, "returncode": None, "cpu_time": None}
+    kwargs.update(dict(stdout=subprocess.PIPE, stderr=subprocess.STDOUT))
+    with subprocess.Popen(args, **kwargs) as p:
+        try:
+            result["out"] = p.stdout.read()
+            if hasattr(os, "wait4"):
+                _, status, usage = os.wait4(p.pid, 0)
+                p.returncode = (
+                    -os.WTERMSIG(status)
+                    if os.WIFSIGNALED(status)
+                    else os.WEXITSTATUS(status)
+                )
+                result["cpu_time"] = usage.ru_utime + usage.ru_stime
+            result["returncode"] = p.wait()
+        except KeyboardInterrupt as exc:
+            raise exception.AbortedByUser() from exc
+    result["out"] = result["out"].decode("utf-8", errors="backslashreplace")
+    return result
+
+
+def get_children_cpu_time():
+    """CPU time (user + system) spent by the terminated child processes"""
+    try:
+        import resource  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
 @contextmanager
 def capture_std_streams(stdout, stderr=None):
     _stdout = sys.stdout
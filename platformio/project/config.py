@@ -18,11 +18,12 @@ import hashlib
 import json
 import os
 import re
+import tempfile
 import time
 
 import click
 
-from platformio import fs
+from platformio import __version__, fs
 from platformio.compat import MISSING, hashlib_encode_data, string_types
 from platformio.project import exception
 from platformio.project.options import ProjectOptions
@@ -40,7 +41,7 @@ CONFIG_HEADER = """
 """
 
 
-class ProjectConfigBase:
+class ProjectConfigBase:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     ENVNAME_RE = re.compile(r"^[a-z\d\_\-]+$", flags=re.I)
     INLINE_COMMENT_RE = re.compile(r"\s+;.*$")
     VARTPL_RE = re.compile(r"\$\{(?:([^\.\}\()]+)\.)?([^\}]+)\}")
@@ -55,6 +56,9 @@ class ProjectConfigBase:
         "UNIX_TIME": lambda: str(int(time.time())),
     }
 
+    # built-in variables which cannot be cached, all others depend on CWD
+    VOLATILE_BUILTIN_VARS = ("UNIX_TIME",)
+
     CUSTOM_OPTION_PREFIXES = ("custom_", "board_")
 
     expand_interpolations = True
@@ -62,6 +66,10 @@ class ProjectConfigBase:
 
     _parser = None
     _parsed = []
+    _sources_cache = None
+    _values_cache = None
+    _meta_cache = None
+    _deps_stack = None
 
     @staticmethod
     def parse_multi_values(items):
@@ -94,6 +102,10 @@ class ProjectConfigBase:
         self.expand_interpolations = expand_interpolations
         self.warnings = []
         self._parsed = []
+        self._sources_cache = {}
+        self._values_cache = {}
+        self._meta_cache = {}
+        self._deps_stack = []
         self._parser = configparser.ConfigParser(inline_comment_prefixes=("#", ";"))
         if path and os.path.isfile(path):
             self.read(path, parse_extra)
@@ -107,6 +119,7 @@ class ProjectConfigBase:
         if path in self._parsed:
             return
         self._parsed.append(path)
+        self.invalidate_cache()
         try:
             self._parser.read(path, "utf-8")
         except configparser.Error as exc:
@@ -162,6 +175,23 @@ class ProjectConfigBase:
                     )
         return True
 
+    def invalidate_cache(self):
+        """Drops the resolved options, must be called when the sections change"""
+        self._sources_cache.clear()
+        self._values_cache.clear()
+
+    def add_section(self, section):
+        self._parser.add_section(section)
+        self.invalidate_cache()
+
+    def remove_section(self, section):
+        self.invalidate_cache()
+        return self._parser.remove_section(section)
+
+    def remove_option(self, section, option):
+        self.invalidate_cache()
+        return self._parser.remove_option(section, option)
+
     @staticmethod
     def get_section_scope(section):
         assert section
@@ -184,6 +214,18 @@ class ProjectConfigBase:
                     self.parse_multi_values(self._parser.get(section, "extends"))
                 )
 
+    def _get_option_sources(self, section):
+        """Maps the options of a section (including the extended sections)
+        to the position of their first declaration and its section"""
+        sources = self._sources_cache.get(section)
+        if sources is None:
+            sources = {}
+            for position, (_section, option) in enumerate(self.walk_options(section)):
+                if option not in sources:
+                    sources[option] = (position, _section)
+            self._sources_cache[section] = sources
+        return sources
+
     def options(self, section=None, env=None):
         result = []
         assert section or env
@@ -193,9 +235,7 @@ class ProjectConfigBase:
         if not self.expand_interpolations:
             return self._parser.options(section)
 
-        for _, option in self.walk_options(section):
-            if option not in result:
-                result.append(option)
+        result.extend(self._get_option_sources(section))
 
         # handle system environment variables
         scope = self.get_section_scope(section)
@@ -217,10 +257,15 @@ class ProjectConfigBase:
         if not section:
             section = "env:" + env
         if as_dict:
-            return {
-                option: self.get(section, option) for option in self.options(section)
-            }
-        return [(option, self.get(section, option)) for option in self.options(section)]
+            return self._resolve_section(section)
+        return list(self._resolve_section(section).items())
+
+    def resolve_env(self, env):
+        """Returns the values of all options of the environment at once"""
+        return self._resolve_section("env:" + env)
+
+    def _resolve_section(self, section):
+        return {option: self.get(section, option) for option in self.options(section)}
 
     def set(self, section, option, value):
         if value is None:
@@ -235,6 +280,7 @@ class ProjectConfigBase:
         if "\n" in value and not value.startswith("\n"):
             value = "\n" + value
         self._parser.set(section, option, value)
+        self.invalidate_cache()
 
     def resolve_renamed_option(self, section, old_name):
         scope = self.get_section_scope(section)
@@ -253,25 +299,56 @@ class ProjectConfigBase:
         scope = self.get_section_scope(section)
         if scope not in ("platformio", "env"):
             return None
-        option_meta = ProjectOptions.get("%s.%s" % (scope, option))
-        if option_meta:
-            return option_meta
-        for option_meta in ProjectOptions.values():
-            if option_meta.scope == scope and option in (option_meta.oldnames or []):
-                return option_meta
-        return None
+        key = (scope, option)
+        if key not in self._meta_cache:
+            self._meta_cache[key] = ProjectOptions.get("%s.%s" % (scope, option))
+            if not self._meta_cache[key]:
+                self._meta_cache[key] = next(
+                    (
+                        option_meta
+                        for option_meta in ProjectOptions.values()
+                        if option_meta.scope == scope
+                        and option in (option_meta.oldnames or [])
+                    ),
+                    None,
+                )
+        return self._meta_cache[key]
 
     def _traverse_for_value(self, section, option, option_meta=None):
-        for _section, _option in self.walk_options(section):
-            if _option == option or (
-                option_meta
-                and (
-                    option_meta.name == _option
-                    or _option in (option_meta.oldnames or [])
-                )
-            ):
-                return self._parser.get(_section, _option)
-        return MISSING
+        sources = self._get_option_sources(section)
+        names = [option]
+        if option_meta:
+            names.extend([option_meta.name] + (option_meta.oldnames or []))
+        candidates = [(sources[name], name) for name in names if name in sources]
+        if not candidates:
+            return MISSING
+        (_, _section), _option = min(candidates)
+        return self._parser.get(_section, _option)
+
+    def _track_dependency(self, key, value):
+        if self._deps_stack:
+            self._deps_stack[-1][key] = value
+
+    def _getenv(self, name):
+        value = os.getenv(name)
+        self._track_dependency(("env", name), value)
+        return value
+
+    def _track_callable_dependencies(self):
+        # the default values and validators resolve paths against
+        # the current working directory and the user home directory
+        self._track_dependency(("cwd",), os.getcwd())
+        for name in ("HOME", "USERPROFILE"):
+            self._getenv(name)
+
+    @staticmethod
+    def _is_valid_dependencies(deps):
+        for key, value in deps.items():
+            if key[0] == "env" and os.getenv(key[1]) != value:
+                return False
+            if key[0] == "cwd" and os.getcwd() != value:
+                return False
+        return True
 
     def getraw(
         self, section, option, default=MISSING
@@ -290,10 +367,10 @@ class ProjectConfigBase:
             return self._expand_interpolations(section, option, value)
 
         if option_meta.sysenvvar:
-            envvar_value = os.getenv(option_meta.sysenvvar)
+            envvar_value = self._getenv(option_meta.sysenvvar)
             if not envvar_value and option_meta.oldnames:
                 for oldoption in option_meta.oldnames:
-                    envvar_value = os.getenv("PLATFORMIO_" + oldoption.upper())
+                    envvar_value = self._getenv("PLATFORMIO_" + oldoption.upper())
                     if envvar_value:
                         break
             if envvar_value and option_meta.multiple:
@@ -306,6 +383,7 @@ class ProjectConfigBase:
         if value == MISSING:
             value = default if default != MISSING else option_meta.default
         if callable(value):
+            self._track_callable_dependencies()
             value = value()
         if value == MISSING:
             return None
@@ -346,13 +424,17 @@ class ProjectConfigBase:
         # handle built-in variables
         if section is None:
             if option in self.BUILTIN_VARS:
+                if option in self.VOLATILE_BUILTIN_VARS:
+                    self._track_dependency(("volatile",), True)
+                else:
+                    self._track_dependency(("cwd",), os.getcwd())
                 return self.BUILTIN_VARS[option]()
             # SCons variables
             return f"${{{option}}}"
 
         # handle system environment variables
         if section == "sysenv":
-            return os.getenv(option)
+            return self._getenv(option)
 
         # handle ${this.*}
         if section == "this":
@@ -379,6 +461,33 @@ class ProjectConfigBase:
         return str(value)
 
     def get(self, section, option, default=MISSING):
+        """Returns the resolved value of an option.
+
+        The value is cached until the configuration is changed, or until the
+        system environment variables and the working directory which were
+        used for its resolution are changed.
+        """
+        if not self.expand_interpolations:
+            return self._get(section, option, default)
+        key = (section, option, repr(default))
+        cached = self._values_cache.get(key)
+        if cached and self._is_valid_dependencies(cached[1]):
+            deps = cached[1]
+            value = cached[0]
+        else:
+            self._deps_stack.append({})
+            try:
+                value = self._get(section, option, default)
+            finally:
+                deps = self._deps_stack.pop()
+            if ("volatile",) not in deps:
+                self._values_cache[key] = (value, deps)
+        # a nested value inherits the dependencies
+        if self._deps_stack:
+            self._deps_stack[-1].update(deps)
+        return list(value) if isinstance(value, list) else value
+
+    def _get(self, section, option, default=MISSING):
         value = None
         try:
             value = self.getraw(section, option, default)
@@ -390,6 +499,7 @@ class ProjectConfigBase:
             return value
 
         if option_meta.validate:
+            self._track_callable_dependencies()
             value = option_meta.validate(value)
         if option_meta.multiple:
             value = self.parse_multi_values(value or [])
@@ -514,17 +624,87 @@ class ProjectConfig(ProjectConfigBase, ProjectConfigLintMixin, ProjectConfigDirs
     _instances = {}
 
     @staticmethod
-    def get_instance(path=None):
+    def get_instance(path=None, snapshot_path=None, **kwargs):
+        """Returns a shared configuration which is parsed once per a state of
+        the file. A valid snapshot of the parent process (`snapshot_path`) is
+        loaded instead of parsing the files again."""
         path = ProjectConfig.get_default_path() if path is None else path
+        key = (path, tuple(sorted(kwargs.items()))) if kwargs else path
         mtime = os.path.getmtime(path) if os.path.isfile(path) else 0
-        instance = ProjectConfig._instances.get(path)
+        instance = ProjectConfig._instances.get(key)
         if instance and instance["mtime"] != mtime:
             instance = None
         if not instance:
-            instance = {"mtime": mtime, "config": ProjectConfig(path)}
-            ProjectConfig._instances[path] = instance
+            config = None
+            if snapshot_path and not kwargs:
+                config = ProjectConfig.load_snapshot(snapshot_path, path)
+            instance = {
+                "mtime": mtime,
+                "config": config or ProjectConfig(path, **kwargs),
+            }
+            ProjectConfig._instances[key] = instance
         return instance["config"]
 
+    @staticmethod
+    def _stat_files(paths):
+        result = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                result.append([path, st.st_mtime_ns, st.st_size])
+            except OSError:
+                result.append([path, None, None])
+        return result
+
+    def dump_snapshot(self, path):
+        """Saves the parsed and validated configuration, so other processes
+        can load it with `load_snapshot()` instead of parsing the files"""
+        data = {
+            "version": __version__,
+            "path": self.path,
+            "files": self._stat_files(self._parsed),
+            "warnings": self.warnings,
+            "sections": [
+                [section, self._parser.items(section, raw=True)]
+                for section in self._parser.sections()
+            ],
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, mode="w", encoding="utf8") as fp:
+                json.dump(data, fp)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    @classmethod
+    def load_snapshot(cls, path, config_path=None):
+        """Returns a configuration from the snapshot or `None` if the snapshot
+        is missing or any of the parsed files has been changed since"""
+        try:
+            data = fs.load_json(path)
+        except (OSError, ValueError):  # includes InvalidJSONFile
+            return None
+        if (
+            data.get("version") != __version__
+            or (config_path is not None and data.get("path") != config_path)
+            or data.get("files")
+            != cls._stat_files([item[0] for item in data.get("files", [])])
+        ):
+            return None
+        config = cls("", parse_extra=False)
+        config.path = data["path"]
+        config.warnings = data["warnings"]
+        config._parsed = [item[0] for item in data["files"]]
+        config._parser.read_dict(
+            {section: dict(options) for section, options in data["sections"]}
+        )
+        config.invalidate_cache()
+        return config
+
     def __repr__(self):
         return "<ProjectConfig %s>" % (self.path or "in-memory")
 
@@ -538,16 +718,18 @@ class ProjectConfig(ProjectConfigBase, ProjectConfigLintMixin, ProjectConfigDirs
         assert isinstance(data, list)
         if clear:
             self._parser = configparser.ConfigParser()
+            self.invalidate_cache()
         for section, options in data:
             if not self._parser.has_section(section):
-                self._parser.add_section(section)
+                self.add_section(section)
             for option, value in options:
                 self.set(section, option, value)
 
     def save(self, path=None):
         path = path or self.path
-        if path in self._instances:
-            del self._instances[path]
+        for key in list(self._instances):
+            if key == path or (isinstance(key, tuple) and key[0] == path):
+                del self._instances[key]
         with open(path or self.path, mode="w+", encoding="utf8") as fp:
             fp.write(CONFIG_HEADER.strip() + "\n\n")
             self._parser.write(fp)
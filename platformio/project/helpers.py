@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os
 import re
 import subprocess
@@ -90,45 +91,76 @@ def get_default_projects_dir():
     return os.path.join(docs_dir, "PlatformIO", "Projects")
 
 
-def compute_project_checksum(config):
-    # rebuild when PIO Core version changes
-    checksum = sha1(hashlib_encode_data(__version__))
-
-    # configuration file state
-    config_data = config.to_json()
+def _normalize_config_data(data):
     if IS_WINDOWS:
         # issue #4600: fix drive letter
-        config_data = re.sub(
+        data = re.sub(
             r"([A-Z]):\\",
             lambda match: "%s:\\" % match.group(1).lower(),
-            config_data,
+            data,
             flags=re.I,
         )
-    checksum.update(hashlib_encode_data(config_data))
+    return data
+
+
+def _compute_files_checksum(paths):
+    data = ",".join(sorted(paths))
+    if IS_WINDOWS:  # case insensitive OS
+        data = data.lower()
+    return sha1(hashlib_encode_data(data)).hexdigest()
 
-    # project file structure
+
+def compute_project_manifest(config):
+    """A state of the project configuration and file structure, used to
+    invalidate only the affected parts of the build directory"""
     check_suffixes = (".c", ".cc", ".cpp", ".h", ".hpp", ".s", ".S")
-    for d in (
-        config.get("platformio", "include_dir"),
-        config.get("platformio", "src_dir"),
-        config.get("platformio", "lib_dir"),
-    ):
-        if not os.path.isdir(d):
-            continue
-        chunks = []
-        for root, _, files in os.walk(d):
+
+    def _collect_files(root_dir):
+        result = []
+        for root, _, files in os.walk(root_dir):
             for f in files:
                 path = os.path.join(root, f)
                 if path.endswith(check_suffixes):
-                    chunks.append(path)
-        if not chunks:
-            continue
-        chunks_to_str = ",".join(sorted(chunks))
-        if IS_WINDOWS:  # case insensitive OS
-            chunks_to_str = chunks_to_str.lower()
-        checksum.update(hashlib_encode_data(chunks_to_str))
+                    result.append(path)
+        return result
 
-    return checksum.hexdigest()
+    manifest = {
+        "version": __version__,
+        "platformio": sha1(
+            hashlib_encode_data(
+                _normalize_config_data(
+                    json.dumps(config.items("platformio", as_dict=True))
+                )
+            )
+        ).hexdigest(),
+        "envs": {
+            env: sha1(
+                hashlib_encode_data(
+                    _normalize_config_data(
+                        json.dumps(config.items(env=env, as_dict=True))
+                    )
+                )
+            ).hexdigest()
+            for env in config.envs()
+        },
+        "lib": {},
+    }
+
+    for name in ("include", "src"):
+        root_dir = config.get("platformio", f"{name}_dir")
+        files = _collect_files(root_dir) if os.path.isdir(root_dir) else []
+        manifest[name] = _compute_files_checksum(files) if files else None
+
+    lib_dir = config.get("platformio", "lib_dir")
+    if os.path.isdir(lib_dir):
+        for name in os.listdir(lib_dir):
+            path = os.path.join(lib_dir, name)
+            files = _collect_files(path) if os.path.isdir(path) else [path]
+            files = [f for f in files if f.endswith(check_suffixes)]
+            if files:
+                manifest["lib"][name] = _compute_files_checksum(files)
+
+    return manifest
 
 
 def load_build_metadata(project_dir, env_or_envs, cache=False, build_type=None):
@@ -138,13 +170,12 @@ def load_build_metadata(project_dir, env_or_envs, cache=False, build_type=None):
         env_names = [env_names]
 
     with fs.cd(project_dir):
-        result = _get_cached_build_metadata(env_names) if cache else {}
+        config = _get_build_metadata_config()
+        result = _get_cached_build_metadata(config, env_names) if cache else {}
         # incompatible build-type data
         for env_name in list(result.keys()):
             if build_type is None:
-                build_type = ProjectConfig.get_instance().get(
-                    f"env:{env_name}", "build_type"
-                )
+                build_type = config.get(f"env:{env_name}", "build_type")
             if result[env_name].get("build_type", "") != build_type:
                 del result[env_name]
         missed_env_names = set(env_names) - set(result.keys())
@@ -183,11 +214,19 @@ def _load_build_metadata(project_dir, env_names, build_type=None):
         raise result.exception
     if '"includes":' not in result.output:
         raise exception.UserSideException(result.output)
-    return _get_cached_build_metadata(env_names)
+    return _get_cached_build_metadata(_get_build_metadata_config(), env_names)
+
+
+def _get_build_metadata_config():
+    # loads the snapshot of the last build instead of parsing the files, and
+    # the in-process `pio run` reuses the same shared instance
+    return ProjectConfig.get_instance(
+        snapshot_path=os.path.join(os.getcwd(), ".pio", "build", "projectconf.json")
+    )
 
 
-def _get_cached_build_metadata(env_names):
-    build_dir = ProjectConfig.get_instance().get("platformio", "build_dir")
+def _get_cached_build_metadata(config, env_names):
+    build_dir = config.get("platformio", "build_dir")
     result = {}
     for env_name in env_names:
         if not os.path.isfile(os.path.join(build_dir, env_name, "idedata.json")):
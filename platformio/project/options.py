@@ -692,6 +692,16 @@ ProjectOptions = OrderedDict(
                 type=click.BOOL,
                 default=False,
             ),
+            ConfigEnvOption(
+                group="test",
+                name="test_build_shared",
+                description=(
+                    "Build the project sources, libraries, and frameworks once "
+                    "for all test suites of a native environment"
+                ),
+                type=click.BOOL,
+                default=False,
+            ),
             ConfigEnvOption(
                 group="test",
                 name="test_testing_command",
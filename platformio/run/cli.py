@@ -15,22 +15,30 @@
 import operator
 import os
 import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import cpu_count
 from time import time
 
 import click
 from tabulate import tabulate
 
-from platformio import app, exception, fs, util
+from platformio import app, exception, fs, proc, util
 from platformio.device.monitor.command import device_monitor_cmd
+from platformio.package.commands.install import (
+    install_project_env_dependencies,
+    prefetch_project_registry_packages,
+)
 from platformio.project.config import ProjectConfig
 from platformio.project.exception import ProjectError
 from platformio.project.helpers import find_project_dir_above, load_build_metadata
-from platformio.run.helpers import clean_build_dir
+from platformio.run.helpers import KNOWN_ALLCLEAN_TARGETS, clean_build_dir
 from platformio.run.processor import EnvironmentProcessor
 from platformio.test.runners.base import CTX_META_TEST_IS_RUNNING
 
 # pylint: disable=too-many-arguments,too-many-locals,too-many-branches
+# pylint: disable=too-many-statements,too-many-boolean-expressions
 
 try:
     SYSTEM_CPU_COUNT = cpu_count()
@@ -73,8 +81,15 @@ DEFAULT_JOB_NUMS = int(os.getenv("PLATFORMIO_RUN_JOBS", SYSTEM_CPU_COUNT))
     multiple=True,
     help="A program argument (multiple are allowed)",
 )
+@click.option(
+    "--parallel-envs",
+    type=int,
+    default=1,
+    help="Process N environments at once sharing the `--jobs` budget",
+)
 @click.option("--disable-auto-clean", is_flag=True)
 @click.option("--list-targets", is_flag=True)
+@click.option("--no-summary", is_flag=True, hidden=True)
 @click.option("-s", "--silent", is_flag=True)
 @click.option("-v", "--verbose", is_flag=True)
 @click.pass_context
@@ -88,8 +103,10 @@ def cli(  # pylint: disable=too-many-positional-arguments
     project_conf,
     jobs,
     program_args,
+    parallel_envs,
     disable_auto_clean,
     list_targets,
+    no_summary,
     silent,
     verbose,
 ):
@@ -127,17 +144,45 @@ def cli(  # pylint: disable=too-many-positional-arguments
                 )
 
         default_envs = config.default_envs()
-        results = []
-        for env in config.envs():
-            skipenv = any(
+        selected_envs = [
+            env
+            for env in config.envs()
+            if not any(
                 [
                     environment and env not in environment,
                     not environment and default_envs and env not in default_envs,
                 ]
             )
-            if skipenv:
+        ]
+        prefetch_project_registry_packages(
+            config, get_build_envs(config, selected_envs, targets)
+        )
+        parallel_envs = min(parallel_envs, jobs, len(selected_envs))
+        parallel_results = None
+        total_duration = None
+        if parallel_envs > 1 and not is_test_running and "monitor" not in targets:
+            total_duration = time()
+            parallel_results = process_envs_in_parallel(
+                selected_envs,
+                config,
+                targets,
+                upload_port,
+                jobs,
+                parallel_envs,
+                program_args,
+                silent,
+                verbose,
+            )
+            total_duration = time() - total_duration
+
+        results = []
+        for env in config.envs():
+            if env not in selected_envs:
                 results.append({"env": env})
                 continue
+            if parallel_results:
+                results.append(parallel_results[env])
+                continue
 
             # print empty line between multi environment project
             if not silent and any(r.get("succeeded") is not None for r in results):
@@ -162,10 +207,11 @@ def cli(  # pylint: disable=too-many-positional-arguments
         if (
             not is_test_running
             and not only_monitor
+            and not no_summary
             and (command_failed or not silent)
             and len(results) > 1
         ):
-            print_processing_summary(results, verbose)
+            print_processing_summary(results, verbose, total_duration)
 
     # Reset custom project config
     app.set_session_var("custom_project_conf", None)
@@ -195,6 +241,7 @@ def process_env(  # pylint: disable=too-many-positional-arguments
     targets = targets or config.get(f"env:{name}", "targets", [])
     only_monitor = targets == ["monitor"]
     result = {"env": name, "duration": time(), "succeeded": True}
+    cpu_time = proc.get_children_cpu_time()
 
     if not only_monitor:
         result["succeeded"] = EnvironmentProcessor(
@@ -217,6 +264,8 @@ def process_env(  # pylint: disable=too-many-positional-arguments
         )
 
     result["duration"] = time() - result["duration"]
+    if cpu_time is not None:
+        result["cpu_time"] = proc.get_children_cpu_time() - cpu_time
 
     # print footer on error or when is not unit testing
     if (
@@ -229,6 +278,96 @@ def process_env(  # pylint: disable=too-many-positional-arguments
     return result
 
 
+def process_envs_in_parallel(  # pylint: disable=too-many-positional-arguments
+    envs,
+    config,
+    targets,
+    upload_port,
+    jobs,
+    parallel_envs,
+    program_args,
+    silent,
+    verbose,
+):
+    # install dependencies upfront, the environments share package storages
+    for env in envs:
+        if config.get(f"env:{env}", "platform", None):
+            install_project_env_dependencies(env, {"project_targets": targets})
+
+    # split the job budget between the concurrently running environments
+    args = [proc.get_pythonexe_path(), "-m", "platformio"]
+    if app.get_session_var("caller_id"):
+        args.extend(["--caller", app.get_session_var("caller_id")])
+    args.extend(
+        [
+            "run",
+            "--project-dir",
+            os.getcwd(),
+            "--project-conf",
+            config.path,
+            "--jobs",
+            str(max(1, jobs // parallel_envs)),
+            "--disable-auto-clean",
+            "--no-summary",
+        ]
+    )
+    for target in targets:
+        args.extend(["--target", target])
+    if upload_port:
+        args.extend(["--upload-port", upload_port])
+    for program_arg in program_args:
+        args.extend(["--program-arg", program_arg])
+    if silent:
+        args.append("--silent")
+    if verbose:
+        args.append("--verbose")
+
+    envclone = os.environ.copy()
+    envclone["PYTHONIOENCODING"] = "utf-8"
+    # pylint: disable=protected-access
+    if click._compat.isatty(sys.stdout):
+        envclone["PLATFORMIO_FORCE_ANSI"] = "true"
+
+    echo_lock = threading.Lock()
+    echoed_envs = []
+
+    def _process_env(name):
+        result = {"env": name, "duration": time()}
+        output = proc.exec_command_with_usage(
+            args + ["--environment", name], env=envclone
+        )
+        result["duration"] = time() - result["duration"]
+        result["succeeded"] = output["returncode"] == 0
+        if output["cpu_time"] is not None:
+            result["cpu_time"] = output["cpu_time"]
+        # print the whole output of environment at once
+        with echo_lock:
+            if echoed_envs and output["out"] and not silent:
+                click.echo()
+            click.echo(output["out"], nl=False)
+            echoed_envs.append(name)
+        return result
+
+    with ThreadPoolExecutor(max_workers=parallel_envs) as executor:
+        return {result["env"]: result for result in executor.map(_process_env, envs)}
+
+
+def get_build_envs(config, envs, targets):
+    """Environments which install the dependencies, see `process_env()` and
+    `EnvironmentProcessor.process()`"""
+    result = []
+    for env in envs:
+        env_targets = targets or config.get(f"env:{env}", "targets", [])
+        build_targets = [
+            t for t in env_targets if t not in KNOWN_ALLCLEAN_TARGETS + ("monitor",)
+        ]
+        if env_targets and not build_targets:
+            continue
+        if config.get(f"env:{env}", "platform", None):
+            result.append(env)
+    return result
+
+
 def print_processing_header(env, config, verbose=False):
     env_dump = []
     for k, v in config.items(env=env):
@@ -258,7 +397,7 @@ def print_processing_footer(result):
     )
 
 
-def print_processing_summary(results, verbose=False):
+def print_processing_summary(results, verbose=False, total_duration=None):
     tabular_data = []
     succeeded_nums = 0
     failed_nums = 0
@@ -282,6 +421,7 @@ def print_processing_summary(results, verbose=False):
                 click.style(result["env"], fg="cyan"),
                 status_str,
                 util.humanize_duration_time(result.get("duration")),
+                util.humanize_duration_time(result.get("cpu_time")),
             )
         )
 
@@ -290,7 +430,8 @@ def print_processing_summary(results, verbose=False):
         tabulate(
             tabular_data,
             headers=[
-                click.style(s, bold=True) for s in ("Environment", "Status", "Duration")
+                click.style(s, bold=True)
+                for s in ("Environment", "Status", "Duration", "CPU Time")
             ],
         ),
         err=failed_nums,
@@ -301,7 +442,9 @@ def print_processing_summary(results, verbose=False):
         % (
             "%d failed, " % failed_nums if failed_nums else "",
             succeeded_nums,
-            util.humanize_duration_time(duration),
+            util.humanize_duration_time(
+                duration if total_duration is None else total_duration
+            ),
         ),
         is_error=failed_nums,
         fg="red" if failed_nums else "green",
@@ -12,11 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import json
 from os import makedirs
-from os.path import isdir, isfile, join
+from os.path import abspath, basename, isdir, isfile, join
 
 from platformio import fs
-from platformio.project.helpers import compute_project_checksum, get_project_dir
+from platformio.compat import hashlib_encode_data
+from platformio.project.helpers import compute_project_manifest, get_project_dir
 
 KNOWN_CLEAN_TARGETS = ("clean",)
 KNOWN_FULLCLEAN_TARGETS = ("cleanall", "fullclean")
@@ -29,17 +32,66 @@ def clean_build_dir(build_dir, config):
     if isdir(legacy_build_dir) and legacy_build_dir != build_dir:
         fs.rmtree(legacy_build_dir)
 
-    checksum_file = join(build_dir, "project.checksum")
-    checksum = compute_project_checksum(config)
+    # obsolete storage of a project state
+    if isfile(join(build_dir, "project.checksum")):
+        fs.rmtree(build_dir)
+
+    manifest_file = join(build_dir, "project.manifest.json")
+    manifest = compute_project_manifest(config)
 
     if isdir(build_dir):
-        # check project structure
-        if isfile(checksum_file):
-            with open(checksum_file, encoding="utf8") as fp:
-                if fp.read() == checksum:
-                    return
-        fs.rmtree(build_dir)
+        prev_manifest = None
+        try:
+            prev_manifest = fs.load_json(manifest_file)
+        except Exception:  # pylint: disable=broad-except
+            pass
+        if prev_manifest == manifest:
+            return
+        if not prev_manifest or any(
+            prev_manifest.get(key) != manifest[key] for key in ("version", "platformio")
+        ):
+            fs.rmtree(build_dir)
+        else:
+            invalidate_build_dir(build_dir, config, prev_manifest, manifest)
+
+    if not isdir(build_dir):
+        makedirs(build_dir)
+    with open(manifest_file, mode="w", encoding="utf8") as fp:
+        json.dump(manifest, fp)
+
+
+def invalidate_build_dir(build_dir, config, prev_manifest, manifest):
+    """Remove only build subdirectories affected by the project changes"""
+    envs = set(prev_manifest.get("envs", {})) | set(manifest["envs"])
+    prev_libs = prev_manifest.get("lib", {})
+    changed_libs = [
+        name
+        for name in set(prev_libs) | set(manifest["lib"])
+        if prev_libs.get(name) != manifest["lib"].get(name)
+    ]
+    for env in envs:
+        env_build_dir = join(build_dir, env)
+        if not isdir(env_build_dir):
+            continue
+        # every source file depends on the configuration and public headers
+        if prev_manifest.get("envs", {}).get(env) != manifest["envs"].get(
+            env
+        ) or prev_manifest.get("include") != manifest.get("include"):
+            fs.rmtree(env_build_dir)
+            continue
+        if prev_manifest.get("src") != manifest.get("src"):
+            _remove_path(join(env_build_dir, "src"))
+        for name in changed_libs:
+            _remove_path(get_lib_build_dir(env_build_dir, config, name))
+
+
+def get_lib_build_dir(env_build_dir, config, name):
+    """See `LibBuilderBase.build_dir`"""
+    lib_path = abspath(join(config.get("platformio", "lib_dir"), name))
+    lib_hash = hashlib.sha1(hashlib_encode_data(lib_path)).hexdigest()[:3]
+    return join(env_build_dir, "lib%s" % lib_hash, basename(lib_path))
+
 
-    makedirs(build_dir)
-    with open(checksum_file, mode="w", encoding="utf8") as fp:
-        fp.write(checksum)
+def _remove_path(path):
+    if isdir(path):
+        fs.rmtree(path)
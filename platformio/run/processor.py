@@ -12,11 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+
 from platformio.package.commands.install import install_project_env_dependencies
 from platformio.platform.factory import PlatformFactory
 from platformio.project.exception import UndefinedEnvPlatformError
 from platformio.run.helpers import KNOWN_ALLCLEAN_TARGETS
-from platformio.test.runners.base import CTX_META_TEST_RUNNING_NAME
+from platformio.test.runners.base import (
+    CTX_META_TEST_RUNNING_NAME,
+    CTX_META_TEST_RUNNING_NAMES,
+)
 
 # pylint: disable=too-many-instance-attributes
 
@@ -43,7 +48,7 @@ class EnvironmentProcessor:
         self.program_args = program_args
         self.silent = silent
         self.verbose = verbose
-        self.options = config.items(env=name, as_dict=True)
+        self.options = config.resolve_env(name)
 
     def get_build_variables(self):
         variables = dict(
@@ -52,10 +57,24 @@ class EnvironmentProcessor:
             program_args=self.program_args,
         )
 
+        # the build process loads the parsed configuration instead of parsing
+        try:
+            variables["project_config_snapshot"] = self.config.dump_snapshot(
+                os.path.join(
+                    self.config.get("platformio", "build_dir"), "projectconf.json"
+                )
+            )
+        except OSError:
+            pass
+
         if CTX_META_TEST_RUNNING_NAME in self.cmd_ctx.meta:
             variables["piotest_running_name"] = self.cmd_ctx.meta[
                 CTX_META_TEST_RUNNING_NAME
             ]
+        if CTX_META_TEST_RUNNING_NAMES in self.cmd_ctx.meta:
+            variables["piotest_running_names"] = self.cmd_ctx.meta[
+                CTX_META_TEST_RUNNING_NAMES
+            ]
 
         if self.upload_port:
             # override upload port with a custom from CLI
@@ -21,6 +21,7 @@ from tabulate import tabulate
 from platformio import fs
 from platformio.package.manager.core import remove_unnecessary_core_packages
 from platformio.package.manager.platform import remove_unnecessary_platform_packages
+from platformio.package.store import PackageStore
 from platformio.project.helpers import get_project_cache_dir
 
 
@@ -30,14 +31,35 @@ def prune_cached_data(force=False, dry_run=False, silent=False):
         click.secho("Prune cached data:", bold=True)
         click.echo(" - cached API requests")
         click.echo(" - cached package downloads")
+        click.echo(" - cached build objects")
+        click.echo(" - unpacked packages which are not used by installed packages")
         click.echo(" - temporary data")
     cache_dir = get_project_cache_dir()
     if os.path.isdir(cache_dir):
-        reclaimed_space += fs.calculate_folder_size(cache_dir)
+        package_store = PackageStore()
+        # the store keeps the packages which share files with installations
+        cached_paths = [
+            entry.path
+            for entry in os.scandir(cache_dir)
+            if entry.path != package_store.store_dir
+        ]
+        unused_entries = package_store.get_unused_entries()
+        for path in cached_paths:
+            reclaimed_space += (
+                fs.calculate_folder_size(path)
+                if os.path.isdir(path) and not os.path.islink(path)
+                else os.path.getsize(path)
+            )
+        reclaimed_space += sum(size for size, _ in unused_entries)
         if not dry_run:
             if not force:
                 click.confirm("Do you want to continue?", abort=True)
-            fs.rmtree(cache_dir)
+            for path in cached_paths:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    fs.rmtree(path)
+                else:
+                    os.remove(path)
+            package_store.remove_entries(path for _, path in unused_entries)
     if not silent:
         click.secho("Space on disk: %s" % fs.humanize_file_size(reclaimed_space))
     return reclaimed_space
@@ -22,12 +22,8 @@ import time
 import traceback
 from collections import deque
 
-import requests
-
 from platformio import __title__, __version__, app, exception, fs, util
 from platformio.cli import PlatformioCLI
-from platformio.debug.config.base import DebugConfigBase
-from platformio.http import HTTPSession
 from platformio.proc import is_ci
 
 KEEP_MAX_REPORTS = 100
@@ -75,11 +71,12 @@ class TelemetryLogger:
         self._sender_queue = queue.Queue()
         self._sender_terminated = False
 
-        self._http_session = HTTPSession()
+        self._http_session = None
         self._http_offline = False
 
     def close(self):
-        self._http_session.close()
+        if self._http_session:
+            self._http_session.close()
 
     def log_event(self, name, params, timestamp=None, instant_sending=False):
         if not app.get_setting("enable_telemetry") or app.get_session_var(
@@ -99,6 +96,13 @@ class TelemetryLogger:
     def send(self):
         if not self._events or self._sender_terminated:
             return
+        if not self._http_session:
+            # import the HTTP client in the main thread, not in the sender
+            from platformio.http import (  # pylint: disable=import-outside-toplevel
+                HTTPSession,
+            )
+
+            self._http_session = HTTPSession()
         if not self._sender_thread:
             self._sender_thread = threading.Thread(
                 target=self._sender_worker, daemon=True
@@ -126,6 +130,8 @@ class TelemetryLogger:
                 pass
 
     def _commit_events(self, events):
+        import requests  # pylint: disable=import-outside-toplevel
+
         if self._http_offline:
             return False
         mp = MeasurementProtocol(events)
@@ -276,7 +282,7 @@ def log_exception(exc):
     log_event("exception", params)
 
 
-def log_debug_started(debug_config: DebugConfigBase):
+def log_debug_started(debug_config):
     log_event(
         "debug_started",
         dump_project_env_params(
@@ -285,7 +291,7 @@ def log_debug_started(debug_config: DebugConfigBase):
     )
 
 
-def log_debug_exception(exc, debug_config: DebugConfigBase):
+def log_debug_exception(exc, debug_config):
     # cleanup sensitive information, such as paths
     description = fs.to_unix_path(str(exc))
     description = re.sub(
@@ -12,17 +12,29 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+import json
 import os
+import queue
 import shutil
 import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import click
 
-from platformio import app, exception, fs, util
+from platformio import app, exception, fs, proc, util
+from platformio.package.commands.install import install_project_env_dependencies
+from platformio.platform.factory import PlatformFactory
 from platformio.project.config import ProjectConfig
+from platformio.run.cli import DEFAULT_JOB_NUMS
+from platformio.test.exception import UnitTestSuiteError
 from platformio.test.helpers import list_test_suites
 from platformio.test.reports.base import TestReportFactory
-from platformio.test.result import TestResult, TestStatus
+from platformio.test.reports.json import JsonTestReport
+from platformio.test.result import TestCase, TestResult, TestStatus, TestSuite
 from platformio.test.runners.base import TestRunnerOptions
 from platformio.test.runners.factory import TestRunnerFactory
 
@@ -79,10 +91,27 @@ from platformio.test.runners.factory import TestRunnerFactory
     multiple=True,
     help="A program argument (multiple are allowed)",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    default=DEFAULT_JOB_NUMS,
+    help=(
+        "Allow N build jobs at once. "
+        "Default is a number of CPUs in a system (N=%d)" % DEFAULT_JOB_NUMS
+    ),
+)
+@click.option(
+    "--parallel",
+    type=int,
+    default=1,
+    help="Process N native test suites at once sharing the `--jobs` budget",
+)
 @click.option("--list-tests", is_flag=True)
 @click.option("--json-output", is_flag=True)
 @click.option("--json-output-path", type=click.Path())
 @click.option("--junit-output-path", type=click.Path())
+@click.option("--no-summary", is_flag=True, hidden=True)
 @click.option(
     "--verbose",
     "-v",
@@ -90,7 +119,7 @@ from platformio.test.runners.factory import TestRunnerFactory
     help="Increase verbosity level, maximum is 3 levels (-vvv), see docs for details",
 )
 @click.pass_context
-def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals,redefined-builtin
+def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals,too-many-branches,redefined-builtin
     ctx,
     environment,
     ignore,
@@ -106,10 +135,13 @@ def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too
     monitor_rts,
     monitor_dtr,
     program_args,
+    jobs,
+    parallel,
     list_tests,
     json_output,
     json_output_path,
     junit_output_path,
+    no_summary,
     verbose,
 ):
     app.set_session_var("custom_project_conf", project_conf)
@@ -124,30 +156,85 @@ def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too
         )
         test_names = sorted(set(s.test_name for s in test_suites))
 
-        if not verbose:
-            click.echo("Verbosity level can be increased via `-v, -vv, or -vvv` option")
-        click.secho("Collected %d tests" % len(test_names), bold=True, nl=not verbose)
-        if verbose:
-            click.echo(" (%s)" % ", ".join(test_names))
+        if not no_summary:
+            if not verbose:
+                click.echo(
+                    "Verbosity level can be increased via `-v, -vv, or -vvv` option"
+                )
+            click.secho(
+                "Collected %d tests" % len(test_names), bold=True, nl=not verbose
+            )
+            if verbose:
+                click.echo(" (%s)" % ", ".join(test_names))
+
+        runner_options = TestRunnerOptions(
+            verbose=verbose,
+            without_building=without_building,
+            without_uploading=without_uploading,
+            without_testing=without_testing,
+            upload_port=upload_port,
+            test_port=test_port,
+            no_reset=no_reset,
+            monitor_rts=monitor_rts,
+            monitor_dtr=monitor_dtr,
+            program_args=program_args,
+            jobs=jobs,
+        )
+        native_envs = set()
+        shared_envs = set()
+        if not list_tests and (
+            min(parallel, jobs) > 1
+            or any(
+                project_config.get(f"env:{s.env_name}", "test_build_shared")
+                for s in test_suites
+            )
+        ):
+            native_envs = list_native_test_envs(
+                test_suites, project_config, runner_options
+            )
+            shared_envs = set(
+                env_name
+                for env_name in native_envs
+                if project_config.get(f"env:{env_name}", "test_build_shared")
+            )
+        if not without_building:
+            for env_name in project_config.envs():
+                if env_name in shared_envs:
+                    build_shared_test_suites(
+                        ctx,
+                        [s for s in test_suites if s.env_name == env_name],
+                        project_config,
+                        runner_options,
+                    )
+
+        parallel_results = {}
+        parallel_suites = [
+            s for s in test_suites if s.env_name in native_envs and not s.is_finished()
+        ]
+        if min(parallel, jobs) > 1 and len(parallel_suites) > 1:
+            parallel_results = process_suites_in_parallel(
+                parallel_suites,
+                project_config,
+                runner_options,
+                min(parallel, jobs, len(parallel_suites)),
+                shared_envs,
+            )
 
         for test_suite in test_suites:
+            key = (test_suite.env_name, test_suite.test_name)
+            if key in parallel_results:
+                test_result.add_suite(parallel_results[key])
+                continue
             test_result.add_suite(test_suite)
             if list_tests or test_suite.is_finished():  # skipped by user
                 continue
             runner = TestRunnerFactory.new(
                 test_suite,
                 project_config,
-                TestRunnerOptions(
-                    verbose=verbose,
-                    without_building=without_building,
-                    without_uploading=without_uploading,
-                    without_testing=without_testing,
-                    upload_port=upload_port,
-                    test_port=test_port,
-                    no_reset=no_reset,
-                    monitor_rts=monitor_rts,
-                    monitor_dtr=monitor_dtr,
-                    program_args=program_args,
+                (
+                    get_shared_build_runner_options(runner_options)
+                    if test_suite.env_name in shared_envs
+                    else runner_options
                 ),
             )
             click.echo()
@@ -155,8 +242,9 @@ def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too
             runner.start(ctx)
             print_suite_footer(test_suite)
 
-    stdout_report = TestReportFactory.new("stdout", test_result)
-    stdout_report.generate(verbose=verbose or list_tests)
+    if not no_summary:
+        stdout_report = TestReportFactory.new("stdout", test_result)
+        stdout_report.generate(verbose=verbose or list_tests)
 
     for output_format, output_path in [
         ("json", subprocess.STDOUT if json_output else None),
@@ -166,7 +254,7 @@ def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too
         if not output_path:
             continue
         custom_report = TestReportFactory.new(output_format, test_result)
-        custom_report.generate(output_path=output_path, verbose=True)
+        custom_report.generate(output_path=output_path, verbose=not no_summary)
 
     # Reset custom project config
     app.set_session_var("custom_project_conf", None)
@@ -175,6 +263,172 @@ def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too
         raise exception.ReturnErrorCode(1)
 
 
+def list_native_test_envs(test_suites, project_config, runner_options):
+    """Native test suites do not share a device and can be processed at once"""
+    result = set()
+    for env_name in set(s.env_name for s in test_suites if not s.is_finished()):
+        test_port = runner_options.test_port or project_config.get(
+            f"env:{env_name}", "test_port"
+        )
+        if (not test_port or "://" not in test_port) and not PlatformFactory.from_env(
+            env_name, autoinstall=True
+        ).is_embedded():
+            result.add(env_name)
+    return result
+
+
+def get_shared_build_runner_options(runner_options):
+    result = copy.copy(runner_options)
+    result.without_building = True
+    result.shared_build = True
+    return result
+
+
+def build_shared_test_suites(ctx, test_suites, project_config, runner_options):
+    """Builds the programs of all test suites of an environment at once"""
+    test_suites = [s for s in test_suites if not s.is_finished()]
+    if not test_suites:
+        return
+    env_name = test_suites[0].env_name
+    click.echo()
+    click.echo(
+        "Building %d test suites in %s environment"
+        % (len(test_suites), click.style(env_name, fg="cyan", bold=True))
+    )
+    click.secho("-" * shutil.get_terminal_size().columns, bold=True)
+    runner = TestRunnerFactory.new(
+        TestSuite(env_name, "*"), project_config, runner_options
+    )
+    try:
+        runner.start_shared_building(ctx, [s.test_name for s in test_suites])
+    except UnitTestSuiteError as exc:
+        click.secho(str(exc), fg="red", err=True)
+        for test_suite in test_suites:
+            test_suite.on_start()
+            test_suite.add_case(
+                TestCase(
+                    name=f"{test_suite.env_name}:{test_suite.test_name}",
+                    status=TestStatus.ERRORED,
+                    exception=exc,
+                )
+            )
+            test_suite.on_finish()
+
+
+def process_suites_in_parallel(  # pylint: disable=too-many-locals
+    test_suites, project_config, runner_options, parallel, shared_envs
+):
+    # install dependencies upfront, the test suites share package storages
+    for env_name in sorted(set(s.env_name for s in test_suites)):
+        install_project_env_dependencies(env_name, {"project_targets": ["__test"]})
+
+    args = [proc.get_pythonexe_path(), "-m", "platformio"]
+    if app.get_session_var("caller_id"):
+        args.extend(["--caller", app.get_session_var("caller_id")])
+    args.extend(
+        [
+            "test",
+            "--project-dir",
+            os.getcwd(),
+            "--project-conf",
+            project_config.path,
+            "--jobs",
+            str(max(1, runner_options.jobs // parallel)),
+            "--no-summary",
+        ]
+    )
+    for name in ("without_building", "without_uploading", "without_testing"):
+        if getattr(runner_options, name):
+            args.append("--" + name.replace("_", "-"))
+    if runner_options.upload_port:
+        args.extend(["--upload-port", runner_options.upload_port])
+    if runner_options.test_port:
+        args.extend(["--test-port", runner_options.test_port])
+    for program_arg in runner_options.program_args:
+        args.extend(["--program-arg", program_arg])
+    if runner_options.verbose:
+        args.append("-" + "v" * runner_options.verbose)
+
+    envclone = os.environ.copy()
+    envclone["PYTHONIOENCODING"] = "utf-8"
+    # pylint: disable=protected-access
+    if click._compat.isatty(sys.stdout):
+        envclone["PLATFORMIO_FORCE_ANSI"] = "true"
+
+    # every worker builds in its own directory, the suites processed by
+    # the same worker reuse the objects of the environment
+    build_dir = os.path.abspath(project_config.get("platformio", "build_dir"))
+    workers = queue.Queue()
+    for index in range(parallel):
+        workers.put(os.path.join(build_dir, "__parallel", str(index)))
+    echo_lock = threading.Lock()
+
+    def _process_suite(test_suite):
+        suite_args = args + ["--environment", test_suite.env_name]
+        if test_suite.test_name != "*":
+            suite_args.extend(["--filter", test_suite.test_name])
+        suite_envclone = envclone
+        worker_build_dir = workers.get()
+        if test_suite.env_name in shared_envs:
+            # the programs are already built by the shared test build
+            if not runner_options.without_building:
+                suite_args.append("--without-building")
+        else:
+            suite_envclone = dict(envclone, PLATFORMIO_BUILD_DIR=worker_build_dir)
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                report_path = os.path.join(tmp_dir, "report.json")
+                output = proc.exec_command_with_usage(
+                    suite_args + ["--json-output-path", report_path],
+                    env=suite_envclone,
+                )
+                result = load_suite_report(report_path, test_suite)
+        finally:
+            workers.put(worker_build_dir)
+        if not result:
+            result = TestSuite(
+                test_suite.env_name, test_suite.test_name, test_dir=test_suite.test_dir
+            )
+            result.on_start()
+            result.add_case(
+                TestCase(
+                    name=f"{test_suite.env_name}:{test_suite.test_name}",
+                    status=TestStatus.ERRORED,
+                    exception=UnitTestSuiteError(
+                        "Test suite process has failed with %d code"
+                        % output["returncode"]
+                    ),
+                )
+            )
+            result.on_finish()
+        # print the whole output of test suite at once
+        with echo_lock:
+            click.echo()
+            click.echo(output["out"], nl=False)
+        return result
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        return {
+            (s.env_name, s.test_name): s
+            for s in executor.map(_process_suite, test_suites)
+        }
+
+
+def load_suite_report(path, test_suite):
+    try:
+        with open(path, encoding="utf8") as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return None
+    for item in data.get("test_suites", []):
+        if (item["env_name"], item["test_name"]) == (
+            test_suite.env_name,
+            test_suite.test_name,
+        ):
+            return JsonTestReport.test_suite_from_json(item)
+    return None
+
+
 def print_suite_header(test_suite):
     click.echo(
         "Processing %s in %s environment"
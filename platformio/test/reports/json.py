@@ -19,8 +19,9 @@ import subprocess
 
 import click
 
+from platformio.test import exception as test_exception
 from platformio.test.reports.base import TestReportBase
-from platformio.test.result import TestStatus
+from platformio.test.result import TestCase, TestCaseSource, TestStatus, TestSuite
 
 
 class JsonTestReport(TestReportBase):
@@ -106,3 +107,44 @@ class JsonTestReport(TestReportBase):
                 file=test_case.source.filename, line=test_case.source.line
             )
         return result
+
+    @classmethod
+    def test_suite_from_json(cls, data):
+        test_suite = TestSuite(
+            data["env_name"],
+            data["test_name"],
+            finished=True,
+            test_dir=data["test_dir"],
+        )
+        test_suite.duration = data["duration"]
+        if data["timestamp"]:
+            test_suite.timestamp = datetime.datetime.strptime(
+                data["timestamp"], "%Y-%m-%dT%H:%M:%S"
+            ).timestamp()
+        for item in data["test_cases"]:
+            test_suite.add_case(cls.test_case_from_json(item))
+        return test_suite
+
+    @staticmethod
+    def test_case_from_json(data):
+        exception = None
+        if data["exception"]:
+            name, _, message = data["exception"].partition(": ")
+            exception_cls = getattr(test_exception, name, None)
+            if isinstance(exception_cls, type) and issubclass(exception_cls, Exception):
+                exception = exception_cls(message)
+            else:
+                exception = test_exception.UnitTestError(data["exception"])
+        return TestCase(
+            name=data["name"],
+            status=TestStatus[data["status"]],
+            message=data["message"],
+            stdout=data["stdout"],
+            source=(
+                TestCaseSource(data["source"]["file"], data["source"]["line"])
+                if data["source"]
+                else None
+            ),
+            duration=data["duration"],
+            exception=exception,
+        )
@@ -23,6 +23,7 @@ from platformio.test.runners.readers.serial import SerialTestOutputReader
 
 CTX_META_TEST_IS_RUNNING = __name__ + ".test_running"
 CTX_META_TEST_RUNNING_NAME = __name__ + ".test_running_name"
+CTX_META_TEST_RUNNING_NAMES = __name__ + ".test_running_names"
 
 
 class TestRunnerOptions:  # pylint: disable=too-many-instance-attributes
@@ -39,6 +40,8 @@ class TestRunnerOptions:  # pylint: disable=too-many-instance-attributes
         monitor_rts=None,
         monitor_dtr=None,
         program_args=None,
+        jobs=None,
+        shared_build=False,
     ):
         self.verbose = verbose
         self.without_building = without_building
@@ -51,6 +54,8 @@ class TestRunnerOptions:  # pylint: disable=too-many-instance-attributes
         self.monitor_rts = monitor_rts
         self.monitor_dtr = monitor_dtr
         self.program_args = program_args
+        self.jobs = jobs
+        self.shared_build = shared_build
 
 
 class TestRunnerBase:
@@ -110,6 +115,17 @@ class TestRunnerBase:
             self.test_suite.on_finish()
             self.teardown()
 
+    def start_shared_building(self, cmd_ctx, test_names):
+        """Builds the programs of the test suites at once, see `test_build_shared`"""
+        self.cmd_ctx = cmd_ctx
+        self.cmd_ctx.meta[CTX_META_TEST_IS_RUNNING] = True
+        self.cmd_ctx.meta.pop(CTX_META_TEST_RUNNING_NAME, None)
+        self.cmd_ctx.meta[CTX_META_TEST_RUNNING_NAMES] = test_names
+        try:
+            return self.stage_building()
+        finally:
+            del self.cmd_ctx.meta[CTX_META_TEST_RUNNING_NAMES]
+
     def setup(self):
         pass
 
@@ -182,8 +198,7 @@ class TestRunnerBase:
         from platformio.run.cli import cli as run_cmd
 
         assert self.cmd_ctx
-        return self.cmd_ctx.invoke(
-            run_cmd,
+        options = dict(
             project_conf=self.project_config.path,
             upload_port=self.options.upload_port,
             verbose=self.options.verbose > 2,
@@ -192,6 +207,9 @@ class TestRunnerBase:
             disable_auto_clean="nobuild" in targets,
             target=targets,
         )
+        if self.options.jobs:
+            options["jobs"] = self.options.jobs
+        return self.cmd_ctx.invoke(run_cmd, **options)
 
     def configure_build_env(self, env):
         """
@@ -71,14 +71,16 @@ class NativeTestOutputReader:
         )
         if custom_testing_command:
             return custom_testing_command
-        build_dir = self.test_runner.project_config.get("platformio", "build_dir")
-        cmd = [
-            os.path.join(
-                build_dir,
-                self.test_runner.test_suite.env_name,
-                "program.exe" if IS_WINDOWS else "program",
+        build_dir = os.path.join(
+            self.test_runner.project_config.get("platformio", "build_dir"),
+            self.test_runner.test_suite.env_name,
+        )
+        # a program per a test suite of the shared test build
+        if self.test_runner.options.shared_build:
+            build_dir = os.path.join(
+                build_dir, "test", self.test_runner.test_suite.test_name
             )
-        ]
+        cmd = [os.path.join(build_dir, "program.exe" if IS_WINDOWS else "program")]
         # if user changed PROGNAME
         if not os.path.exists(cmd[0]):
             build_data = load_build_metadata(
@@ -86,6 +88,8 @@ class NativeTestOutputReader:
             )
             if build_data:
                 cmd[0] = build_data["prog_path"]
+                if self.test_runner.options.shared_build:
+                    cmd[0] = os.path.join(build_dir, os.path.basename(cmd[0]))
         if self.test_runner.options.program_args:
             cmd.extend(self.test_runner.options.program_args)
         return cmd
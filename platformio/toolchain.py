@@ -0,0 +1,122 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+import shlex
+import subprocess
+
+from platformio import proc
+from platformio.cache import ContentCache
+from platformio.compat import IS_WINDOWS
+
+# flags which affect the predefined macros of a compiler
+DEFINES_AFFECTING_FLAGS = ("-m", "-f", "-std")
+
+_DEFINES_CACHE = {}
+
+
+def get_compiler_id(compiler, envpath=None):
+    """Identifies a compiler binary by its path, size, and modification time"""
+    path = compiler
+    if not os.path.isabs(path):
+        path = proc.where_is_program(path, envpath)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return "%s:%d:%d" % (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+
+
+def split_command(command):
+    """Splits a command line, such as `$CC` with a wrapper (`ccache gcc`),
+    into arguments"""
+    if isinstance(command, (list, tuple)):
+        return [str(arg) for arg in command]
+    if not command:
+        return []
+    # a resolved path to a compiler may contain spaces
+    if os.path.isfile(command):
+        return [command]
+    args = shlex.split(command, posix=not IS_WINDOWS)
+    # the non-POSIX mode keeps the quotes of the Windows paths
+    return [
+        arg[1:-1] if len(arg) > 1 and arg[0] == arg[-1] == '"' else arg for arg in args
+    ]
+
+
+def get_toolchain_defines(compiler, language=None, flags=None, envpath=None):
+    """Returns the predefined macros of a compiler as `NAME[=VALUE]` items.
+
+    The `compiler` is a command line or a list of its arguments. The result
+    is cached persistently per the compiler binaries, a language, and the
+    flags which affect predefined macros. Returns `None` if the compiler
+    cannot be executed.
+    """
+    compiler_args = split_command(compiler)
+    if not compiler_args:
+        return None
+    flags = [f for f in flags or [] if f.startswith(DEFINES_AFFECTING_FLAGS)]
+    cache_key = None
+    if get_compiler_id(compiler_args[0], envpath):
+        # a wrapper (e.g., `ccache`) runs the compiler from the next arguments
+        compiler_ids = [
+            arg if arg.startswith("-") else get_compiler_id(arg, envpath) or arg
+            for arg in compiler_args
+        ]
+        cache_key = ContentCache.key_from_args(
+            "toolchain-defines", json.dumps(compiler_ids), language, json.dumps(flags)
+        )
+        if cache_key in _DEFINES_CACHE:
+            return _DEFINES_CACHE[cache_key]
+        with ContentCache() as cc:
+            cached = cc.get(cache_key)
+        if cached:
+            _DEFINES_CACHE[cache_key] = json.loads(cached)
+            return _DEFINES_CACHE[cache_key]
+
+    cmd = list(compiler_args)
+    if language:
+        cmd.extend(["-x", language])
+    cmd.extend(flags + ["-dM", "-E", "-"])
+    env = None
+    if envpath:
+        env = os.environ.copy()
+        env["PATH"] = envpath
+    try:
+        result = proc.exec_command(cmd, stdin=subprocess.DEVNULL, env=env)
+    except OSError:
+        return None
+    if result["returncode"] != 0:
+        return None
+
+    defines = parse_defines(result["out"])
+    if cache_key:
+        _DEFINES_CACHE[cache_key] = defines
+        with ContentCache() as cc:
+            cc.set(cache_key, json.dumps(defines), "30d")
+    return defines
+
+
+def parse_defines(output):
+    defines = []
+    for line in output.split("\n"):
+        tokens = line.strip().split(" ", 2)
+        if not tokens or tokens[0] != "#define":
+            continue
+        if len(tokens) > 2:
+            defines.append("%s=%s" % (tokens[1], tokens[2]))
+        else:
+            defines.append(tokens[1])
+    return defines
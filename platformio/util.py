@@ -19,6 +19,7 @@ import os
 import platform
 import re
 import shutil
+import threading
 import time
 
 import click
@@ -65,17 +66,27 @@ class memoized:
 
 
 class throttle:
-    def __init__(self, threshold):
+    """Allows `burst` calls at once and then a call per `threshold`
+    milliseconds. The rate budget is shared by all threads, a call reserves
+    its time slot and waits for it outside of the lock."""
+
+    def __init__(self, threshold, burst=1):
         self.threshold = threshold  # milliseconds
-        self.last = 0
+        self.burst = burst
+        self.next_time = 0
+        self._lock = threading.Lock()
 
     def __call__(self, func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            diff = int(round((time.time() - self.last) * 1000))
-            if diff < self.threshold:
-                time.sleep((self.threshold - diff) * 0.001)
-            self.last = time.time()
+            interval = self.threshold * 0.001
+            with self._lock:
+                now = time.time()
+                self.next_time = max(self.next_time, now)
+                delay = self.next_time - now - interval * (self.burst - 1)
+                self.next_time += interval
+            if delay > 0:
+                time.sleep(delay)
             return func(*args, **kwargs)
 
         return wrapper
@@ -0,0 +1,115 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measure throughput of the build output pipe
+
+Pipes synthetic compiler output (verbose command lines, warnings, and
+progress bars) through `BuildAsyncPipe` and the legacy per-character reader.
+
+Usage: python scripts/benchmarks/build_async_pipe.py [--size MB]
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from platformio.proc import AsyncPipeBase, BuildAsyncPipe
+
+
+class LegacyBuildAsyncPipe(AsyncPipeBase):
+    """The reader which was used before PlatformIO Core 6.1.18"""
+
+    def __init__(self, line_callback, data_callback):
+        self.line_callback = line_callback
+        self.data_callback = data_callback
+        super().__init__()
+
+    def do_reading(self):
+        line = ""
+        print_immediately = False
+        for char in iter(lambda: self._pipe_reader.read(1), ""):
+            if line and char.strip() and line[-3:] == (char * 3):
+                print_immediately = True
+            if print_immediately:
+                if line:
+                    self.data_callback(line)
+                    line = ""
+                self.data_callback(char)
+                if char == "\n":
+                    print_immediately = False
+            else:
+                line += char
+                if char != "\n":
+                    continue
+                self.line_callback(line)
+                line = ""
+        self._pipe_reader.close()
+
+
+def generate_output(size):
+    sample = (
+        "arm-none-eabi-g++ -o .pio/build/env/src/main.cpp.o -c -std=gnu++17 "
+        "-fno-rtti -mthumb -mcpu=cortex-m4 -Os -Wall -DPLATFORMIO=60118 "
+        "-Iinclude -Isrc -I/home/user/.platformio/packages/framework/cores "
+        "src/main.cpp\n"
+        "src/main.cpp:42:13: warning: unused variable ‘counter’ [-Wunused]\n"
+        "Uploading [====================          ] 66%\n"
+    ).encode()
+    return sample * (size // len(sample))
+
+
+def run(pipe_cls, data):
+    stats = {"lines": 0, "data": 0}
+
+    def _on_line(line):
+        stats["lines"] += len(line)
+
+    def _on_data(data):
+        stats["data"] += len(data)
+
+    pipe = pipe_cls(line_callback=_on_line, data_callback=_on_data)
+
+    def _write():
+        view = memoryview(data)
+        for offset in range(0, len(data), 4096):
+            os.write(pipe.fileno(), view[offset : offset + 4096])
+
+    start = time.perf_counter()
+    writer = threading.Thread(target=_write)
+    writer.start()
+    writer.join()
+    pipe.close()
+    return time.perf_counter() - start, stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100, help="Output size in MB")
+    args = parser.parse_args()
+    data = generate_output(args.size * 1024 * 1024)
+
+    results = {}
+    for pipe_cls in (LegacyBuildAsyncPipe, BuildAsyncPipe):
+        duration, stats = run(pipe_cls, data)
+        results[pipe_cls.__name__] = stats
+        print(
+            "%-22s %8.2f s %8.2f MB/s"
+            % (pipe_cls.__name__, duration, len(data) / 1024 / 1024 / duration)
+        )
+    assert results["LegacyBuildAsyncPipe"] == results["BuildAsyncPipe"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compare ContentCache storage engines
+
+Usage: python scripts/benchmarks/content_cache.py [--items N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from platformio.cache import FileContentCache, SQLiteContentCache
+
+
+def run(cache_cls, items, payload):
+    keys = [cache_cls.key_from_args("get", "/v3/packages/%d" % i) for i in range(items)]
+    result = {}
+
+    start = time.perf_counter()
+    for key in keys:
+        with cache_cls("benchmark") as cc:
+            cc.set(key, payload, "1h")
+    result["set"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        with cache_cls("benchmark") as cc:
+            assert cc.get(key) == payload
+    result["get"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys[: items // 10]:
+        with cache_cls("benchmark") as cc:
+            cc.delete(key)
+    result["delete"] = time.perf_counter() - start
+
+    with cache_cls("benchmark") as cc:
+        cc.clean()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--payload-size", type=int, default=4096)
+    args = parser.parse_args()
+
+    os.environ["PLATFORMIO_CORE_DIR"] = tempfile.mkdtemp()
+    payload = "x" * args.payload_size
+    print("%d items, %d bytes each" % (args.items, args.payload_size))
+    print("%-22s %10s %10s %10s" % ("Engine", "set, s", "get, s", "delete, s"))
+    for cache_cls in (FileContentCache, SQLiteContentCache):
+        result = run(cache_cls, args.items, payload)
+        print(
+            "%-22s %10.3f %10.3f %10.3f"
+            % (cache_cls.__name__, result["set"], result["get"], result["delete"])
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measure mapping of includes to the libraries in the LDF
+
+Creates a synthetic storage with libraries and headers and maps every
+header to its library using the path index and the legacy linear scan over
+all library builders.
+
+Usage: python scripts/benchmarks/ldf_lib_index.py [--libs N] [--headers N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from platformio.package.manager.core import get_core_package_dir
+
+sys.path.insert(0, os.path.join(get_core_package_dir("tool-scons"), "scons-local"))
+
+# pylint: disable=wrong-import-position
+from platformio.builder.tools.piolib import (  # noqa: E402
+    LibBuilderBase,
+    LibBuilderPathIndex,
+)
+
+
+def create_storage(root, libs_nums, headers_nums):
+    lib_builders = []
+    headers = []
+    for lib_index in range(libs_nums):
+        lib_dir = os.path.join(root, "Lib%d" % lib_index)
+        os.makedirs(os.path.join(lib_dir, "src", "utility"))
+        lb = object.__new__(LibBuilderBase)
+        lb.path = lib_dir
+        lb.is_dependent = lib_index % 10 == 0
+        lib_builders.append(lb)
+    for header_index in range(headers_nums):
+        lib_dir = lib_builders[header_index % libs_nums].path
+        headers.append(
+            os.path.join(lib_dir, "src", "utility", "header%d.h" % header_index)
+        )
+    # includes from the toolchain do not belong to any library
+    headers.extend(
+        os.path.join(root, "toolchain", "include", "std%d.h" % i)
+        for i in range(headers_nums // 10)
+    )
+    random.Random(0).shuffle(headers)
+    return lib_builders, headers
+
+
+def map_legacy(lib_builders, headers):
+    result = []
+    for inc_path in headers:
+        found = None
+        for lb in sorted(lib_builders, key=lambda lb: 0 if lb.is_dependent else 1):
+            if inc_path in lb:
+                found = lb
+                break
+        result.append(found)
+    return result
+
+
+def map_indexed(lib_builders, headers):
+    index = LibBuilderPathIndex(lib_builders)
+    return [index.find(inc_path) for inc_path in headers]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--libs", type=int, default=500)
+    parser.add_argument("--headers", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        lib_builders, headers = create_storage(root, args.libs, args.headers)
+        results = {}
+        for func in (map_legacy, map_indexed):
+            start = time.perf_counter()
+            results[func.__name__] = func(lib_builders, headers)
+            print("%-12s %8.2f s" % (func.__name__, time.perf_counter() - start))
+        assert results["map_legacy"] == results["map_indexed"]
+
+
+if __name__ == "__main__":
+    main()
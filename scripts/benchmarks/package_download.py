@@ -0,0 +1,107 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measure downloading, verification, and unpacking of a package
+
+Serves a synthetic TAR.GZ package from a local HTTP server and installs it
+into a temporary directory with the legacy download, checksum, and unpack
+passes, and with the archive extracted while it is being downloaded.
+
+Usage: python scripts/benchmarks/package_download.py [--size MB]
+"""
+
+import argparse
+import http.server
+import os
+import tarfile
+import tempfile
+import threading
+import time
+
+from platformio import fs
+from platformio.package.download import FileDownloader
+from platformio.package.unpack import FileUnpacker, StreamUnpacker
+
+
+class RequestHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def create_archive(root, size):
+    src_dir = os.path.join(root, "src")
+    os.makedirs(src_dir)
+    file_size = 256 * 1024
+    for index in range(size // file_size):
+        with open(os.path.join(src_dir, "file%d.bin" % index), "wb") as fp:
+            fp.write(os.urandom(file_size // 2) * 2)
+    archive_path = os.path.join(root, "package.tar.gz")
+    with tarfile.open(archive_path, "w:gz", compresslevel=1) as tf:
+        tf.add(src_dir, "package")
+    return archive_path
+
+
+def install_legacy(url, checksum, dl_path, dst_dir):
+    fd = FileDownloader(url)
+    fd.set_destination(dl_path)
+    fd.start(silent=True)
+    fd.verify(checksum)
+    with FileUnpacker(dl_path) as fu:
+        fu.unpack(dst_dir, silent=True)
+
+
+def install_streaming(url, checksum, dl_path, dst_dir):
+    unpacker = StreamUnpacker(dst_dir)
+    fd = FileDownloader(url)
+    fd.set_destination(dl_path)
+    fd.start(silent=True, checksum=checksum, data_callback=unpacker.feed)
+    assert unpacker.finish()
+    fd.verify(checksum)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200, help="Package size in MB")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        archive_path = create_archive(root, args.size * 1024 * 1024)
+        checksum = fs.calculate_file_hashsum("sha256", archive_path)
+        server = http.server.ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            lambda *a, **kw: RequestHandler(*a, directory=root, **kw),
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = "http://127.0.0.1:%d/package.tar.gz" % server.server_address[1]
+        results = {}
+        try:
+            for func in (install_legacy, install_streaming):
+                dst_dir = os.path.join(root, func.__name__)
+                os.makedirs(dst_dir)
+                start = time.perf_counter()
+                func(url, checksum, dst_dir + ".tar.gz", dst_dir)
+                print("%-18s %8.2f s" % (func.__name__, time.perf_counter() - start))
+                results[func.__name__] = sorted(
+                    os.path.join(os.path.relpath(r, dst_dir), f)
+                    for r, _, files in os.walk(dst_dir)
+                    for f in files
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert results["install_legacy"] == results["install_streaming"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measure unpacking of a ZIP package with many small files
+
+Creates a synthetic ZIP archive with a framework-like tree and unpacks it
+with the legacy sequential extraction followed by a separate check on disk,
+and with `FileUnpacker` which extracts the files concurrently.
+
+Usage: python scripts/benchmarks/package_unpack.py [--files N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import zipfile
+
+from platformio.package.unpack import FileUnpacker, ZIPArchiver
+
+
+def create_archive(root, files_nums):
+    archive_path = os.path.join(root, "package.zip")
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for index in range(files_nums):
+            zf.writestr(
+                "framework/lib%d/src/file%d.c" % (index // 50, index),
+                "int func%d(void) { return %d; }\n" % (index, index) * 20,
+            )
+    return archive_path
+
+
+def unpack_legacy(archive_path, dst_dir):
+    archiver = ZIPArchiver(archive_path)
+    try:
+        items = archiver.get_items()
+        for item in items:
+            archiver.extract_item(item, dst_dir)
+        for item in items:
+            assert os.path.exists(
+                os.path.join(dst_dir, archiver.get_item_filename(item))
+            )
+    finally:
+        archiver.close()
+
+
+def unpack_parallel(archive_path, dst_dir):
+    with FileUnpacker(archive_path) as fu:
+        fu.unpack(dst_dir, silent=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=30000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        archive_path = create_archive(root, args.files)
+        results = {}
+        for func in (unpack_legacy, unpack_parallel):
+            dst_dir = os.path.join(root, func.__name__)
+            os.makedirs(dst_dir)
+            start = time.perf_counter()
+            func(archive_path, dst_dir)
+            print("%-16s %8.2f s" % (func.__name__, time.perf_counter() - start))
+            results[func.__name__] = sorted(
+                (
+                    os.path.join(os.path.relpath(r, dst_dir), f),
+                    os.path.getmtime(os.path.join(r, f)),
+                )
+                for r, _, files in os.walk(dst_dir)
+                for f in files
+            )
+        assert results["unpack_legacy"] == results["unpack_parallel"]
+
+
+if __name__ == "__main__":
+    main()
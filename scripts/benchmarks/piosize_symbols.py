@@ -0,0 +1,109 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measure loading of ELF symbols for the memory inspection
+
+Links a synthetic program with many functions and variables (or takes an
+existing ELF) and maps every symbol to its section using the symbol table
+reader and the section index of `piosize`, and the legacy pyelftools
+iteration with a linear scan over all sections.
+
+Usage: python scripts/benchmarks/piosize_symbols.py [--symbols N] [--elf PATH]
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from elftools.elf.elffile import ELFFile
+
+from platformio.builder.tools import piosize
+
+
+class SizeEnv:
+    """The memory inspection methods of a build environment"""
+
+    pioSizeIsFlashSection = piosize.pioSizeIsFlashSection
+    pioSizeIsRamSection = piosize.pioSizeIsRamSection
+    pioSizeDetermineSection = piosize.pioSizeDetermineSection
+    pioSizeIsValidSymbol = piosize.pioSizeIsValidSymbol
+
+
+def build_elf(root, symbols_nums):
+    src_path = os.path.join(root, "main.c")
+    with open(src_path, mode="w", encoding="utf8") as fp:
+        for index in range(symbols_nums // 2):
+            fp.write("int var%d = %d;\n" % (index, index))
+            fp.write("int func%d(int x) { return x + var%d; }\n" % (index, index))
+        fp.write("int main(void) { return func0(0); }\n")
+    elf_path = os.path.join(root, "program")
+    subprocess.check_call(["gcc", "-g", "-O0", "-o", elf_path, src_path])
+    return elf_path
+
+
+def map_legacy(env, elffile, sections):
+    result = []
+    for s in elffile.get_section_by_name(".symtab").iter_symbols():
+        symbol_info = s.entry["st_info"]
+        if not env.pioSizeIsValidSymbol(s.name, symbol_info["type"], s["st_value"]):
+            continue
+        result.append(
+            (
+                s.name,
+                s["st_value"],
+                s["st_size"],
+                symbol_info["bind"],
+                symbol_info["type"],
+                env.pioSizeDetermineSection(sections, s["st_value"]),
+            )
+        )
+    return result
+
+
+def map_indexed(env, elffile, sections):
+    index = piosize.SectionAddressIndex(sections)
+    return [
+        (name, addr, size, bind, type_, index.find(addr))
+        for name, addr, size, bind, type_ in piosize._iter_symbol_entries(
+            elffile, elffile.get_section_by_name(".symtab")
+        )
+        if env.pioSizeIsValidSymbol(name, type_, addr)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=50000)
+    parser.add_argument("--elf", help="Use an existing ELF file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        elf_path = args.elf or build_elf(root, args.symbols)
+        env = SizeEnv()
+        with open(elf_path, "rb") as fp:
+            elffile = ELFFile(fp)
+            sections = piosize._collect_sections_info(env, elffile)
+            results = {}
+            for func in (map_legacy, map_indexed):
+                start = time.perf_counter()
+                results[func.__name__] = func(env, elffile, sections)
+                print("%-12s %8.2f s" % (func.__name__, time.perf_counter() - start))
+        print("Symbols: %d" % len(results["map_indexed"]))
+        assert results["map_legacy"] == results["map_indexed"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Measure resolution of the project configuration options
+
+Creates a synthetic "platformio.ini" with many environments which extend a
+deep chain of common sections and resolves the options of every environment
+several times, like the build and the commands do, with the cache of the
+resolved options and with the cache dropped before every call.
+
+Usage: python scripts/benchmarks/project_config.py [--envs N] [--depth N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from platformio.project.config import ProjectConfig
+
+OPTIONS = ("build_flags", "lib_deps", "board", "upload_port", "build_unflags")
+
+
+def create_config(root, envs_nums, depth):
+    lines = [
+        "[env]",
+        "framework = arduino",
+        "build_flags = -D PROJECT -I ${platformio.include_dir}",
+    ]
+    for index in range(depth):
+        lines.extend(
+            [
+                "[base%d]" % index,
+                "extends = base%d" % (index - 1) if index else "",
+                "build_flags = ${env.build_flags} -D BASE%d" % index,
+                "lib_deps = Lib%d" % index,
+            ]
+        )
+    for index in range(envs_nums):
+        lines.extend(
+            [
+                "[env:env%d]" % index,
+                "extends = base%d" % (depth - 1),
+                "board = board%d" % index,
+                "build_src_flags = ${env:env%d.build_flags} -D ${this.__env__}" % index,
+            ]
+        )
+    path = os.path.join(root, "platformio.ini")
+    with open(path, mode="w", encoding="utf8") as fp:
+        fp.write("\n".join(lines))
+    return ProjectConfig(path)
+
+
+def resolve(config, uncached):
+    result = []
+    for env in config.envs():
+        if uncached:
+            config.invalidate_cache()
+        result.append(config.resolve_env(env))
+        for option in OPTIONS * 10:
+            if uncached:
+                config.invalidate_cache()
+            result.append(config.get("env:" + env, option))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--envs", type=int, default=80)
+    parser.add_argument("--depth", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        config = create_config(root, args.envs, args.depth)
+        results = {}
+        for name, uncached in (("uncached", True), ("cached", False)):
+            start = time.perf_counter()
+            results[name] = resolve(config, uncached)
+            print("%-12s %8.2f s" % (name, time.perf_counter() - start))
+        assert results["uncached"] == results["cached"]
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,7 @@ import sys
 import pytest
 
 from platformio import fs
+from platformio.check.cache import DefectCache
 from platformio.check.cli import cli as cmd_check
 
 DEFAULT_CONFIG = """
@@ -849,3 +850,115 @@ src_dir = {external_src_dir}
 
     assert result.exit_code == 0
     assert errors + warnings + style == EXPECTED_DEFECTS
+
+
+def test_check_parallel_jobs(clirunner, validate_cliresult, tmpdir_factory):
+    tmpdir = tmpdir_factory.mktemp("project")
+    tmpdir.join("platformio.ini").write(
+        DEFAULT_CONFIG + "check_tool = cppcheck, clangtidy"
+    )
+    src_dir = tmpdir.mkdir("src")
+    for name in ("main.cpp", "app.cpp", "uart.cpp", "spi.cpp"):
+        src_dir.join(name).write(TEST_CODE)
+
+    outputs = []
+    for jobs in (1, 4):
+        result = clirunner.invoke(
+            cmd_check,
+            ["--project-dir", str(tmpdir), "--json-output", "--jobs", str(jobs)],
+        )
+        validate_cliresult(result)
+        outputs.append([item["defects"] for item in json.loads(result.stdout.strip())])
+
+    # defects are merged in the same order regardless of a number of jobs
+    assert outputs[0] == outputs[1]
+    assert len(outputs[0][0]) == EXPECTED_DEFECTS * 4
+
+
+def test_check_incremental(clirunner, validate_cliresult, tmpdir_factory):
+    tmpdir = tmpdir_factory.mktemp("project")
+    tmpdir.join("platformio.ini").write(
+        DEFAULT_CONFIG + "check_tool = cppcheck, clangtidy"
+    )
+    tmpdir.mkdir("include").join("config.h").write("#define BUFFER_SIZE 10\n")
+    src_dir = tmpdir.mkdir("src")
+    src_dir.join("main.cpp").write(TEST_CODE)
+    src_dir.join("app.cpp").write('#include "config.h"\n' + TEST_CODE)
+
+    def _check():
+        result = clirunner.invoke(
+            cmd_check, ["--project-dir", str(tmpdir), "--incremental"]
+        )
+        validate_cliresult(result)
+        errors, warnings, style = count_defects(result.output)
+        assert errors + warnings + style >= EXPECTED_DEFECTS * 2
+        return result.output
+
+    assert _check().count("Defect cache: 0 hits, 2 misses") == 2
+    assert _check().count("Defect cache: 2 hits, 0 misses") == 2
+
+    # a change in the included header invalidates only dependent files
+    tmpdir.join("include", "config.h").write("#define BUFFER_SIZE 20\n")
+    assert _check().count("Defect cache: 1 hits, 1 misses") == 2
+
+
+def test_check_defect_cache_dependencies(tmp_path):
+    (tmp_path / "include").mkdir()
+    (tmp_path / "include" / "config.h").write_text('#include "board.h"\n')
+    (tmp_path / "include" / "board.h").write_text("#define LED 13\n")
+    (tmp_path / "main.c").write_text(
+        '#include <config.h>\n#include "missing.h"\nint main() {}\n'
+    )
+    cache = DefectCache(
+        str(tmp_path / "checkcache.json"),
+        context={"flags": []},
+        include_dirs=[str(tmp_path / "include")],
+    )
+    assert cache.get_dependencies(str(tmp_path / "main.c")) == [
+        str(tmp_path / "include" / "board.h"),
+        str(tmp_path / "include" / "config.h"),
+        str(tmp_path / "main.c"),
+    ]
+    key = cache.compute_key(str(tmp_path / "main.c"))
+    assert cache.get(str(tmp_path / "main.c"), key) is None
+    cache.set(str(tmp_path / "main.c"), key, [])
+    cache.save()
+
+    # the transitive header was changed
+    cache = DefectCache(
+        str(tmp_path / "checkcache.json"),
+        context={"flags": []},
+        include_dirs=[str(tmp_path / "include")],
+    )
+    assert cache.get(str(tmp_path / "main.c"), key) == []
+    (tmp_path / "include" / "board.h").write_text("#define LED 2\n")
+    assert cache.compute_key(str(tmp_path / "main.c")) != key
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_check_defect_cache_include_resolution(tmp_path):
+    for name in ("include", "lib"):
+        (tmp_path / name).mkdir()
+    (tmp_path / "lib" / "board.h").write_text("#define LED 13\n")
+    (tmp_path / "main.c").write_text(
+        '#include <board.h>\n#include "missing.h"\nint main() {}\n'
+    )
+
+    def _compute_key():
+        return DefectCache(
+            str(tmp_path / "checkcache.json"),
+            context={"flags": []},
+            include_dirs=[str(tmp_path / "include"), str(tmp_path / "lib")],
+        ).compute_key(str(tmp_path / "main.c"))
+
+    key = _compute_key()
+    assert _compute_key() == key
+
+    # a previously missing header is created
+    (tmp_path / "include" / "missing.h").write_text("")
+    assert _compute_key() != key
+    key = _compute_key()
+
+    # a header in the earlier include dir shadows the resolved one
+    (tmp_path / "include" / "board.h").write_text("#define LED 13\n")
+    assert _compute_key() != key
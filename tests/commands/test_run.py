@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 from pathlib import Path
 
+from platformio.project.config import ProjectConfig
 from platformio.run.cli import cli as cmd_run
+from platformio.run.cli import get_build_envs
 
 
 def test_generic_build(clirunner, validate_cliresult, tmpdir):
@@ -444,3 +447,221 @@ platform = native
     )
     result = clirunner.invoke(cmd_run, ["--project-dir", str(project_dir)])
     validate_cliresult(result)
+
+
+def test_parallel_envs(clirunner, validate_cliresult, tmp_path: Path):
+    project_dir = tmp_path / "project"
+    src_dir = project_dir / "src"
+    src_dir.mkdir(parents=True)
+    (src_dir / "main.c").write_text(
+        """
+#include <stdio.h>
+int main(void) {
+    printf("ENV_NAME=<%s>\\n", ENV_NAME);
+    return(0);
+}
+"""
+    )
+    (project_dir / "platformio.ini").write_text(
+        """
+[env]
+platform = native
+
+[env:a]
+build_flags = '-DENV_NAME="a"'
+
+[env:b]
+build_flags = '-DENV_NAME="b"'
+
+[env:c]
+build_flags = '-DENV_NAME="c"'
+    """
+    )
+    result = clirunner.invoke(
+        cmd_run,
+        ["--project-dir", str(project_dir), "--parallel-envs", "3", "-t", "exec"],
+    )
+    validate_cliresult(result)
+    # output of environments is not interleaved
+    for name in ("a", "b", "c"):
+        assert f"ENV_NAME=<{name}>" in result.output
+        block = result.output[result.output.index(f"Processing {name}") :]
+        assert f"Compiling .pio/build/{name}/src/main.o" in block.split("Took")[0]
+    assert "CPU Time" in result.output
+    assert "3 succeeded" in result.output
+
+
+def test_build_object_cache(clirunner, validate_cliresult, tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("PLATFORMIO_SETTING_ENABLE_BUILD_OBJECT_CACHE", "yes")
+    monkeypatch.setenv("PLATFORMIO_CACHE_DIR", str(tmp_path / "cache"))
+    for name in ("project-1", "project-2"):
+        project_dir = tmp_path / name
+        (project_dir / "src").mkdir(parents=True)
+        (project_dir / "src" / "main.c").write_text(
+            """
+#include <foo.h>
+int main(void) {
+    return foo();
+}
+"""
+        )
+        (project_dir / "lib" / "foo").mkdir(parents=True)
+        (project_dir / "lib" / "foo" / "foo.h").write_text("int foo(void);")
+        (project_dir / "lib" / "foo" / "foo.c").write_text(
+            "int foo(void) { return 0; }"
+        )
+        (project_dir / "platformio.ini").write_text(
+            """
+[env:native]
+platform = native
+
+[env:copy]
+platform = native
+
+[env:custom]
+platform = native
+build_flags = -DCUSTOM
+"""
+        )
+    result = clirunner.invoke(
+        cmd_run, ["-d", str(tmp_path / "project-1"), "-e", "native"]
+    )
+    validate_cliresult(result)
+    assert "Build Object Cache: 0 hits, 2 misses" in result.output
+    # the same sources and flags in another environment and project
+    for project, env in (("project-1", "copy"), ("project-2", "native")):
+        result = clirunner.invoke(cmd_run, ["-d", str(tmp_path / project), "-e", env])
+        validate_cliresult(result)
+        assert "Build Object Cache: 2 hits, 0 misses" in result.output
+    result = clirunner.invoke(
+        cmd_run, ["-d", str(tmp_path / "project-2"), "-e", "custom"]
+    )
+    validate_cliresult(result)
+    assert "Build Object Cache: 0 hits, 2 misses" in result.output
+
+
+def test_incremental_build_dir_cleanup(clirunner, validate_cliresult, tmp_path: Path):
+    project_dir = tmp_path / "project"
+    (project_dir / "src").mkdir(parents=True)
+    (project_dir / "src" / "main.c").write_text(
+        """
+#include <foo.h>
+int main(void) {
+    return foo();
+}
+"""
+    )
+    (project_dir / "lib" / "foo").mkdir(parents=True)
+    (project_dir / "lib" / "foo" / "foo.h").write_text("int foo(void);")
+    (project_dir / "lib" / "foo" / "foo.c").write_text("int foo(void) { return 0; }")
+    config_tpl = """
+[env:a]
+platform = native
+
+[env:b]
+platform = native
+build_flags = %s
+"""
+    (project_dir / "platformio.ini").write_text(config_tpl % "-DB")
+    result = clirunner.invoke(cmd_run, ["-d", str(project_dir)])
+    validate_cliresult(result)
+    build_dir = project_dir / ".pio" / "build"
+    lib_objs = {env: list((build_dir / env).glob("lib*/foo/foo.o")) for env in "ab"}
+    assert all(len(objs) == 1 for objs in lib_objs.values())
+
+    # a new library source invalidates only the library objects
+    (project_dir / "lib" / "foo" / "bar.c").write_text("int bar(void) { return 0; }")
+    result = clirunner.invoke(cmd_run, ["-d", str(project_dir), "-e", "a"])
+    validate_cliresult(result)
+    assert lib_objs["a"][0].is_file()
+    assert not lib_objs["b"][0].exists()
+    assert (build_dir / "b" / "src" / "main.o").is_file()
+
+    # changed configuration invalidates only the environment
+    (project_dir / "platformio.ini").write_text(config_tpl % "-DBB")
+    result = clirunner.invoke(cmd_run, ["-d", str(project_dir), "-e", "a"])
+    validate_cliresult(result)
+    assert (build_dir / "a" / "src" / "main.o").is_file()
+    assert not (build_dir / "b").exists()
+
+
+def test_lib_manifest_index(clirunner, validate_cliresult, tmp_path: Path):
+    project_dir = tmp_path / "project"
+    (project_dir / "src").mkdir(parents=True)
+    (project_dir / "src" / "main.c").write_text(
+        """
+#include <flagged.h>
+int main(void) {
+    return flagged();
+}
+"""
+    )
+    lib_dir = project_dir / "lib"
+    for name in ("flagged", "plain", "unused"):
+        (lib_dir / name).mkdir(parents=True)
+        (lib_dir / name / ("%s.h" % name)).write_text("int %s(void);" % name)
+    (lib_dir / "flagged" / "library.json").write_text(
+        '{"name": "Flagged", "version": "1.0.0", "build": {"flags": "-DFLAGGED=1"}}'
+    )
+    (lib_dir / "flagged" / "flagged.c").write_text(
+        """
+#include <plain.h>
+#ifndef FLAGGED
+#error "Library build flags are not applied"
+#endif
+int flagged(void) { return plain(); }
+"""
+    )
+    (lib_dir / "plain" / "library.json").write_text(
+        '{"name": "Plain", "version": "1.0.0"}'
+    )
+    (lib_dir / "plain" / "plain.c").write_text("int plain(void) { return 0; }")
+    (lib_dir / "unused" / "library.json").write_text(
+        '{"name": "Unused", "version": "2.0.0"}'
+    )
+    (project_dir / "platformio.ini").write_text(
+        """
+[env:native]
+platform = native
+lib_ldf_mode = deep+
+"""
+    )
+    result = clirunner.invoke(cmd_run, ["-d", str(project_dir)])
+    validate_cliresult(result)
+    assert "Flagged @ 1.0.0" in result.output
+    assert "Unused" not in result.output
+    build_dir = project_dir / ".pio" / "build" / "native"
+    assert list(build_dir.glob("lib*/plain/plain.o"))
+    index_path = build_dir / "libmanifests.json"
+    entries = json.loads(index_path.read_text())["entries"]
+    assert len(entries) == 3
+
+    # a changed manifest is parsed again
+    (lib_dir / "flagged" / "library.json").write_text(
+        '{"name": "Flagged", "version": "1.1.0", "build": {"flags": "-DFLAGGED=1"}}'
+    )
+    result = clirunner.invoke(cmd_run, ["-d", str(project_dir)])
+    validate_cliresult(result)
+    assert "Flagged @ 1.1.0" in result.output
+
+
+def test_build_envs(tmp_path: Path):
+    (tmp_path / "platformio.ini").write_text(
+        """
+[env:native]
+platform = native
+
+[env:monitor]
+platform = native
+targets = monitor
+
+[env:noplatform]
+"""
+    )
+    config = ProjectConfig(str(tmp_path / "platformio.ini"))
+    envs = config.envs()
+    # the environments which install the dependencies
+    assert get_build_envs(config, envs, []) == ["native"]
+    assert get_build_envs(config, envs, ["upload", "monitor"]) == ["native", "monitor"]
+    assert not get_build_envs(config, envs, ["clean"])
+    assert not get_build_envs(config, envs, ["cleanall", "monitor"])
@@ -202,6 +202,164 @@ int main() {
     assert "Disabled test suite" not in result.output
 
 
+def test_parallel_native_suites(clirunner, tmp_path: Path):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "platformio.ini").write_text(
+        """
+[env:native]
+platform = native
+test_framework = custom
+"""
+    )
+    test_dir = project_dir / "test"
+    test_dir.mkdir()
+    (test_dir / "test_custom_runner.py").write_text(
+        """
+from platformio.test.result import TestCase, TestStatus
+from platformio.test.runners.base import TestRunnerBase
+
+class CustomTestRunner(TestRunnerBase):
+    def on_testing_line_output(self, line):
+        if ":" not in line:
+            return super().on_testing_line_output(line)
+        name, status = line.strip().split(":")
+        self.test_suite.add_case(
+            TestCase(name=name, status=TestStatus.from_string(status))
+        )
+"""
+    )
+    for name, status in (("test_a", "PASS"), ("test_b", "FAIL"), ("test_c", "PASS")):
+        (test_dir / name).mkdir()
+        (test_dir / name / "main.c").write_text(
+            """
+#include <stdio.h>
+int main() {
+    printf("%s:%s\\n");
+    return 0;
+}
+"""
+            % (name, status)
+        )
+    (test_dir / "test_d").mkdir()
+    (test_dir / "test_d" / "main.c").write_text("int main() { return broken; }")
+
+    json_output_path = tmp_path / "report.json"
+    result = clirunner.invoke(
+        pio_test_cmd,
+        [
+            "-d",
+            str(project_dir),
+            "--parallel",
+            "3",
+            "--jobs",
+            "3",
+            "--json-output-path",
+            str(json_output_path),
+        ],
+    )
+    assert result.exit_code != 0
+    assert "4 test cases: 1 failed, 2 succeeded" in result.output
+    assert "Saved JSON report" in result.output
+    json_report = load_json(str(json_output_path))
+    test_suites = sorted(json_report["test_suites"], key=lambda s: s["test_name"])
+    assert [(s["test_name"], s["status"]) for s in test_suites] == [
+        ("test_a", "PASSED"),
+        ("test_b", "FAILED"),
+        ("test_c", "PASSED"),
+        ("test_d", "ERRORED"),
+    ]
+    assert test_suites[3]["test_cases"][0]["exception"].startswith(
+        "UnitTestSuiteError: Building stage has failed"
+    )
+    # every worker has own build directory
+    assert not (project_dir / ".pio" / "build" / "native").exists()
+    assert len(list((project_dir / ".pio" / "build" / "__parallel").iterdir())) == 3
+
+
+@pytest.mark.parametrize("parallel", [1, 2])
+def test_shared_build(clirunner, validate_cliresult, tmp_path: Path, parallel):
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "platformio.ini").write_text(
+        """
+[env:native]
+platform = native
+test_framework = custom
+test_build_src = yes
+test_build_shared = yes
+"""
+    )
+    (project_dir / "src").mkdir()
+    (project_dir / "src" / "calc.c").write_text(
+        """
+#include <foo.h>
+int calc_add(int a, int b) { return foo(a + b); }
+"""
+    )
+    (project_dir / "lib" / "foo").mkdir(parents=True)
+    (project_dir / "lib" / "foo" / "foo.h").write_text("int foo(int x);")
+    (project_dir / "lib" / "foo" / "foo.c").write_text("int foo(int x) { return x; }")
+    test_dir = project_dir / "test"
+    (test_dir / "group").mkdir(parents=True)
+    (test_dir / "test_custom_runner.py").write_text(
+        """
+from platformio.test.result import TestCase, TestStatus
+from platformio.test.runners.base import TestRunnerBase
+
+class CustomTestRunner(TestRunnerBase):
+    def on_testing_line_output(self, line):
+        name, status = line.strip().split(":")
+        self.test_suite.add_case(
+            TestCase(name=name, status=TestStatus.from_string(status))
+        )
+"""
+    )
+    (test_dir / "group" / "expect.h").write_text("int expect(int value);")
+    (test_dir / "group" / "expect.c").write_text(
+        """
+#include <stdio.h>
+int expect(int value) {
+    printf("%s:%s\\n", TEST_NAME, value ? "PASS" : "FAIL");
+    return 0;
+}
+"""
+    )
+    for name in ("test_a", "test_b"):
+        (test_dir / "group" / name).mkdir()
+        (test_dir / "group" / name / "suite.h").write_text(
+            '#define TEST_NAME "%s"' % name
+        )
+        (test_dir / "group" / name / "main.c").write_text(
+            """
+#include <suite.h>
+#include <expect.h>
+int calc_add(int a, int b);
+int main() {
+    return expect(calc_add(1, 2) == 3);
+}
+"""
+        )
+    # "suite.h" of a test suite is not visible to the shared sources
+    (test_dir / "group" / "expect.c").write_text(
+        "#define TEST_NAME __FILE__\n" + (test_dir / "group" / "expect.c").read_text()
+    )
+
+    result = clirunner.invoke(
+        pio_test_cmd,
+        ["-d", str(project_dir), "--parallel", str(parallel), "--jobs", "2", "-vv"],
+    )
+    validate_cliresult(result)
+    assert "Building 2 test suites in native environment" in result.output
+    assert "2 test cases: 2 succeeded" in result.output
+    assert result.output.count("Linking") == 2
+    # the common objects are compiled once
+    assert result.output.count("calc.o") == 1
+    build_dir = project_dir / ".pio" / "build" / "native"
+    for name in ("test_a", "test_b"):
+        assert (build_dir / "test" / "group" / name / "program").is_file()
+
+
 def test_crashed_program(clirunner, tmpdir):
     project_dir = tmpdir.mkdir("project")
     project_dir.join("platformio.ini").write(
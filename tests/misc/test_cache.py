@@ -0,0 +1,170 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# pylint: disable=unused-argument
+
+import os
+import time
+
+import pytest
+
+from platformio import cache, toolchain
+from platformio.cache import (
+    BuildObjectCache,
+    FileContentCache,
+    SQLiteContentCache,
+    sqlite3,
+)
+from platformio.compat import IS_WINDOWS
+
+
+@pytest.mark.parametrize("cache_cls", [FileContentCache, SQLiteContentCache])
+def test_content_cache(func_isolated_pio_core, monkeypatch, cache_cls):
+    if cache_cls is SQLiteContentCache and not sqlite3:
+        pytest.skip("Python is built without SQLite support")
+    key = cache_cls.key_from_args("get", "/v3/search")
+    with cache_cls("test") as cc:
+        assert cc.get(key) is None
+        assert cc.set(key, "Hello World!", "1h")
+        assert cc.set(cc.key_from_args("expired"), "Bye", "1s")
+    with cache_cls("test") as cc:
+        assert cc.get(key) == "Hello World!"
+        cc.delete(key)
+        assert cc.get(key) is None
+        assert cc.set(key, "Hello World!", "1h")
+
+    # expired items are not returned
+    monkeypatch.setattr(cache, "time", lambda: time.time() + 10)
+    with cache_cls("test") as cc:
+        assert cc.get(cc.key_from_args("expired")) is None
+
+    with cache_cls("test") as cc:
+        cc.clean()
+    with cache_cls("test") as cc:
+        assert cc.get(key) is None
+
+
+def test_content_cache_lru_eviction(func_isolated_pio_core, monkeypatch):
+    if not sqlite3:
+        pytest.skip("Python is built without SQLite support")
+    monkeypatch.setattr(SQLiteContentCache, "MAX_STORAGE_SIZE", 1024)
+    with SQLiteContentCache("test") as cc:
+        for i in range(10):
+            monkeypatch.setattr(cache, "time", lambda i=i: time.time() + i)
+            assert cc.set("item-%d" % i, "x" * 256, "1h")
+        cc.delete()  # force sweeping
+        assert [i for i in range(10) if cc.get("item-%d" % i)] == [6, 7, 8, 9]
+
+
+def test_content_cache_locked_database(func_isolated_pio_core, monkeypatch):
+    if not sqlite3:
+        pytest.skip("Python is built without SQLite support")
+    monkeypatch.setattr(SQLiteContentCache, "BUSY_TIMEOUT", 0)
+    with SQLiteContentCache("test") as cc:
+        assert cc.set("item", "data", "1h")
+        # another process writes to the database
+        conn = sqlite3.connect(cc._db_path)  # pylint: disable=protected-access
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            assert not cc.set("item", "new data", "1h")
+            assert not cc.delete("item")
+            assert not cc.delete()
+            cc.clean()
+            assert cc.get("item") == "data"
+        finally:
+            conn.close()
+
+
+def test_content_cache_legacy_storage(func_isolated_pio_core):
+    if not sqlite3:
+        pytest.skip("Python is built without SQLite support")
+    with FileContentCache("test") as cc:
+        assert cc.set("legacy-item", "data", "1h")
+    with SQLiteContentCache("test") as cc:
+        assert cc.get("legacy-item") is None
+        assert cc.set("legacy-item", "data", "1h")
+        assert not os.path.isfile(os.path.join(cc.cache_dir, "db.data"))
+
+
+def test_build_object_cache(tmp_path):
+    boc = BuildObjectCache(str(tmp_path / "objects"))
+    obj_path = tmp_path / "main.o"
+    dst_path = tmp_path / "copy.o"
+    for i in range(4):
+        obj_path.write_bytes(b"\x7fELF" + b"x" * 252)
+        boc.store("key-%d" % i, str(obj_path), "warning: %d" % i if i == 1 else None)
+        os.utime(boc.get_item_path("key-%d" % i), (i, i))
+    assert boc.get_size() == 1024
+    assert boc.fetch("unknown", str(dst_path)) is None
+    assert not dst_path.exists()
+    assert boc.fetch("key-0", str(dst_path)) == ""
+    assert dst_path.read_bytes() == obj_path.read_bytes()
+    assert boc.fetch("key-1", str(dst_path)) == "warning: 1"
+
+    # "key-2" and "key-3" are the least recently used
+    assert boc.evict(600) == 2
+    assert [boc.fetch("key-%d" % i, str(dst_path)) for i in range(4)] == [
+        "",
+        "warning: 1",
+        None,
+        None,
+    ]
+    assert boc.evict(600) == 0
+    boc.clean()
+    assert boc.get_size() == 0
+
+
+@pytest.mark.skipif(IS_WINDOWS, reason="requires a POSIX shell")
+def test_toolchain_defines_cache(func_isolated_pio_core, tmp_path, monkeypatch):
+    calls_log = tmp_path / "calls.log"
+    compiler = tmp_path / "fake-gcc"
+    compiler.write_text(
+        "#!/bin/sh\n"
+        'echo "$@" >> "%s"\n'
+        'echo "#define __GNUC__ 12"\n'
+        'echo "#define __ARM_ARCH_7M__ 1"\n'
+        'echo "#define __ARM_EABI__"\n' % calls_log
+    )
+    compiler.chmod(0o755)
+
+    expected = ["__GNUC__=12", "__ARM_ARCH_7M__=1", "__ARM_EABI__"]
+    flags = ["-mthumb", "-Os", "-std=gnu++17", "-Wall"]
+    assert toolchain.get_toolchain_defines(str(compiler), "c++", flags) == expected
+    assert calls_log.read_text().split() == [
+        "-x",
+        "c++",
+        "-mthumb",
+        "-std=gnu++17",
+        "-dM",
+        "-E",
+        "-",
+    ]
+
+    # persistent cache, the flags which do not affect macros are ignored
+    monkeypatch.setattr(toolchain, "_DEFINES_CACHE", {})
+    assert toolchain.get_toolchain_defines(str(compiler), "c++", flags[:-1]) == expected
+    assert len(calls_log.read_text().splitlines()) == 1
+
+    # another language or a modified compiler binary
+    toolchain.get_toolchain_defines(str(compiler), "c", flags)
+    compiler.write_text(compiler.read_text() + 'echo "#define __VERSION__ 13"\n')
+    assert len(toolchain.get_toolchain_defines(str(compiler), "c", flags)) == 4
+    assert len(calls_log.read_text().splitlines()) == 3
+
+    # a compiler with a wrapper, such as `ccache gcc`
+    wrapper = tmp_path / "fake-ccache"
+    wrapper.write_text('#!/bin/sh\nexec "$@"\n')
+    wrapper.chmod(0o755)
+    assert len(toolchain.get_toolchain_defines("%s %s" % (wrapper, compiler), "c")) == 4
+    assert calls_log.read_text().splitlines()[-1] == "-x c -dM -E -"
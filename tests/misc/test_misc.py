@@ -14,10 +14,19 @@
 
 # pylint: disable=unused-argument
 
+import errno
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 import requests
 
-from platformio import __check_internet_hosts__, http, proc
+from platformio import __check_internet_hosts__, app, fs, http, proc, util
+from platformio.__main__ import cli as cli_pio
+from platformio.cli import PIO_COMMANDS, PlatformioCLI
+from platformio.compat import IS_WINDOWS
 from platformio.registry.client import RegistryClient
 
 
@@ -28,6 +37,66 @@ def test_platformio_cli():
     assert "Usage: pio [OPTIONS] COMMAND [ARGS]..." in result["out"]
 
 
+def test_command_registry():
+    # pylint: disable=protected-access
+    assert PIO_COMMANDS == PlatformioCLI()._find_pio_commands()
+
+
+def test_startup_profile(clirunner, validate_cliresult, isolated_pio_core):
+    result = clirunner.invoke(
+        cli_pio, ["--startup-profile", "settings", "get", "check_platformio_interval"]
+    )
+    validate_cliresult(result)
+    assert "Startup profile:" in result.output
+    assert "cumulative" in result.output and " platformio." in result.output
+
+
+def test_app_state_cache(tmp_path):
+    state_path = str(tmp_path / "appstate.json")
+    assert app.load_state_storage(state_path) == {}
+    with app.State(state_path, lock=True) as state:
+        state["last_check"] = {"prune_system": 1}
+    storage = app.load_state_storage(state_path)
+    assert storage == {"last_check": {"prune_system": 1}}
+    assert app.load_state_storage(state_path) is storage
+    assert os.listdir(str(tmp_path)) == ["appstate.json"]
+    if not IS_WINDOWS:
+        # the file is created with respect to the umask, the mode is kept
+        umask = os.umask(0o027)
+        try:
+            os.remove(state_path)
+            app.save_state_storage(state_path, storage)
+        finally:
+            os.umask(umask)
+        assert os.stat(state_path).st_mode & 0o777 == 0o640
+        os.chmod(state_path, 0o604)
+        app.save_state_storage(state_path, storage)
+        assert os.stat(state_path).st_mode & 0o777 == 0o604
+
+    # the nested items are not shared with the cached content
+    with app.State(state_path) as state:
+        state["last_check"]["prune_system"] = 2
+        assert state.modified is False
+    assert app.load_state_storage(state_path) == {"last_check": {"prune_system": 1}}
+
+    # the file is replaced by the other process
+    tmp_state_path = str(tmp_path / "other.json")
+    with open(tmp_state_path, mode="w", encoding="utf8") as fp:
+        fp.write('{"last_check": {"prune_system": 3}}')
+    os.replace(tmp_state_path, state_path)
+    assert app.load_state_storage(state_path) == {"last_check": {"prune_system": 3}}
+
+    # the file is rewritten in place
+    with open(state_path, mode="w", encoding="utf8") as fp:
+        fp.write('{"created_at": 1}')
+    assert app.load_state_storage(state_path) == {"created_at": 1}
+    with open(state_path, mode="w", encoding="utf8") as fp:
+        fp.write("[invalid")
+    assert app.load_state_storage(state_path) == {}
+    os.remove(state_path)
+    assert app.load_state_storage(state_path) == {}
+
+
 def test_ping_internet_ips():
     for host in __check_internet_hosts__:
         requests.get("http://%s" % host, allow_redirects=False, timeout=2)
@@ -46,3 +115,194 @@ def test_api_cache(monkeypatch, isolated_pio_core):
     assert result and "total" in result
     monkeypatch.setattr(http, "_internet_on", lambda: False)
     assert regclient.fetch_json_data(**api_kwargs) == result
+
+
+def test_throttle():
+    started = []
+
+    @util.throttle(200, burst=2)
+    def _request():
+        started.append(time.time())
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for _ in range(4):
+            executor.submit(_request)
+    started.sort()
+    # the burst is not delayed, the other calls share the rate budget
+    assert started[1] - start < 0.15
+    assert started[2] - start >= 0.19
+    assert started[3] - start >= 0.39
+
+
+def test_build_async_pipe():
+    lines = []
+    data = []
+    pipe = proc.BuildAsyncPipe(line_callback=lines.append, data_callback=data.append)
+    payload = "Compiling main.o\nПривіт\nUploading [====    ] 50%\nDone".encode()
+    # split a multi-byte character between writes
+    for chunk in (payload[:20], payload[20:], b"\n"):
+        os.write(pipe.fileno(), chunk)
+    pipe.close()
+    assert lines == ["Compiling main.o\n", "Привіт\n", "Done\n"]
+    assert "".join(data) == "Uploading [====    ] 50%\n"
+
+    # the carriage returns are translated to the line feeds
+    lines = []
+    data = []
+    pipe = proc.BuildAsyncPipe(line_callback=lines.append, data_callback=data.append)
+    for chunk in (b"Compiling\r", b"\nLinking\r", b"Checking size\r\n"):
+        os.write(pipe.fileno(), chunk)
+        time.sleep(0.05)
+    pipe.close()
+    assert lines == ["Compiling\n", "Linking\n", "Checking size\n"]
+    assert not data
+
+
+def test_size_symbols_and_sections(tmp_path):
+    # pylint: disable=import-outside-toplevel,protected-access
+    from elftools.elf.elffile import ELFFile
+
+    from platformio.builder.tools import piosize
+
+    sections = {
+        ".text": dict(start_addr=0x100, size=0x100, in_flash=True, in_ram=False),
+        ".empty": dict(start_addr=0x150, size=0, in_flash=True, in_ram=False),
+        ".comment": dict(start_addr=0x180, size=0x200, in_flash=False, in_ram=False),
+        ".data": dict(start_addr=0x180, size=0x100, in_flash=True, in_ram=True),
+        ".bss": dict(start_addr=0x1F0, size=0x20, in_flash=False, in_ram=True),
+    }
+    index = piosize.SectionAddressIndex(sections)
+    for addr in range(0x300):
+        assert index.find(addr) == piosize.pioSizeDetermineSection(None, sections, addr)
+
+    src_path = tmp_path / "main.c"
+    src_path.write_text(
+        "static int counter;\nint значення = 1;\n"
+        "int main(void) { return counter + значення; }\n"
+    )
+    elf_path = tmp_path / "program"
+    assert (
+        proc.exec_command(["gcc", "-o", str(elf_path), str(src_path)])["returncode"]
+        == 0
+    )
+    with open(elf_path, "rb") as fp:
+        elffile = ELFFile(fp)
+        symtab = elffile.get_section_by_name(".symtab")
+        entries = list(piosize._iter_symbol_entries(elffile, symtab))
+        assert entries == [
+            (
+                s.name,
+                s["st_value"],
+                s["st_size"],
+                s.entry["st_info"]["bind"],
+                s.entry["st_info"]["type"],
+            )
+            for s in symtab.iter_symbols()
+        ]
+    assert ("значення", "STB_GLOBAL", "STT_OBJECT") in [
+        (e[0], e[3], e[4]) for e in entries
+    ]
+
+
+def test_size_symbol_resolver(tmp_path):
+    # pylint: disable=import-outside-toplevel,protected-access,too-many-locals
+    from elftools.elf.elffile import ELFFile
+
+    from platformio.builder.tools import piosize
+
+    src_path = tmp_path / "main.cpp"
+    src_path.write_text(
+        "namespace demo {\nint value0(int x) {\n  return x;\n}\n}\n"
+        + "".join(
+            "namespace demo { int value%d(int x) { return x + %d; } }\n" % (i, i)
+            for i in range(1, 300)
+        )
+        + "int main(void) { return demo::value0(0); }\n"
+    )
+    elf_path = str(tmp_path / "program")
+    assert (
+        proc.exec_command(["g++", "-g", "-o", elf_path, str(src_path)])["returncode"]
+        == 0
+    )
+    env = {"ENV": {"PATH": os.environ["PATH"]}}
+    with open(elf_path, "rb") as fp:
+        elffile = ELFFile(fp)
+        symbols = {
+            s.name: hex(s["st_value"])
+            for s in elffile.get_section_by_name(".symtab").iter_symbols()
+            if s.name.startswith("_ZN4demo")
+        }
+        elf_id = piosize._get_elf_id(elffile, elf_path)
+    assert len(symbols) == 300
+
+    # the requests are split into many batches of one process
+    with piosize.SymbolResolverTool(["c++filt"], env) as tool:
+        demangled_names = tool.resolve(list(symbols))
+    assert demangled_names["_ZN4demo6value0Ei"] == "demo::value0(int)"
+    assert demangled_names["_ZN4demo8value299Ei"] == "demo::value299(int)"
+    with piosize.SymbolResolverTool(["addr2line", "-e", elf_path], env) as tool:
+        locations = tool.resolve(list(symbols.values()))
+    assert locations[symbols["_ZN4demo6value0Ei"]].endswith("main.cpp:2")
+    assert len(locations) == 300
+
+    # a missing tool does not break the memory inspection
+    with piosize.SymbolResolverTool(["unknown-c++filt"], env) as tool:
+        assert not tool.resolve(list(symbols))
+
+    resolved = []
+
+    def _resolver(items):
+        resolved.extend(items)
+        return {item: item.upper() for item in items}
+
+    cache_path = str(tmp_path / "sizedata-symbols.json")
+    cache = piosize.SymbolInfoCache(cache_path, elf_id)
+    assert cache.resolve("names", ["a", "b"], _resolver) == {"a": "A", "b": "B"}
+    cache.save()
+    cache = piosize.SymbolInfoCache(cache_path, elf_id)
+    assert cache.resolve("names", ["a", "b", "c"], _resolver)["c"] == "C"
+    assert resolved == ["a", "b", "c"]
+    cache = piosize.SymbolInfoCache(cache_path, "build-id:other")
+    cache.resolve("names", ["a"], _resolver)
+    assert resolved == ["a", "b", "c", "a"]
+
+
+def test_clone_file_fallback(tmp_path):
+    src_path = tmp_path / "src.txt"
+    src_path.write_text("data")
+    calls = []
+
+    def _unsupported(src, dst):
+        calls.append(("unsupported", os.path.basename(dst)))
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    def _link(src, dst):
+        calls.append(("link", os.path.basename(dst)))
+        if os.path.basename(dst) == "exists.txt":
+            raise OSError(errno.EEXIST, "File exists")
+        shutil.copy2(src, dst)
+
+    def _copy(src, dst):
+        calls.append(("copy", os.path.basename(dst)))
+        shutil.copy2(src, dst)
+
+    clone_funcs = [_unsupported, _link, _copy]
+    for name in ("first.txt", "exists.txt", "last.txt"):
+        fs._clone_file(  # pylint: disable=protected-access
+            clone_funcs, str(src_path), str(tmp_path / name)
+        )
+    # the unsupported method is removed, the other error falls back per file
+    assert clone_funcs == [_link, _copy]
+    assert calls == [
+        ("unsupported", "first.txt"),
+        ("link", "first.txt"),
+        ("link", "exists.txt"),
+        ("copy", "exists.txt"),
+        ("link", "last.txt"),
+    ]
+    # the error of the last method is raised
+    with pytest.raises(OSError):
+        fs._clone_file(  # pylint: disable=protected-access
+            [_copy], str(tmp_path / "missing.txt"), str(tmp_path / "dst.txt")
+        )
@@ -0,0 +1,138 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# pylint: disable=redefined-outer-name
+
+import os
+import sys
+
+import pytest
+
+from platformio.package.manager.core import get_core_package_dir
+
+
+@pytest.fixture(scope="module")
+def piolib():
+    try:
+        import SCons  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        sys.path.insert(
+            0, os.path.join(get_core_package_dir("tool-scons"), "scons-local")
+        )
+    # pylint: disable=import-outside-toplevel
+    from platformio.builder.tools import piolib as module
+
+    return module
+
+
+def test_ldf_cache(piolib, tmp_path):
+    (tmp_path / "build").mkdir()
+    cache_path = str(tmp_path / "build" / "ldfcache.json")
+    inc1_dir = tmp_path / "inc1"
+    inc2_dir = tmp_path / "inc2"
+    (inc1_dir / "other").mkdir(parents=True)
+    (inc2_dir / "sys").mkdir(parents=True)
+    (tmp_path / "src").mkdir()
+    main_path = tmp_path / "src" / "main.c"
+    main_path.write_text('#include "sys/foo.h"\n')
+    header_path = inc2_dir / "sys" / "foo.h"
+    header_path.write_text("#define FOO 1\n")
+    key = piolib.LDFCache.compute_key("lib", "chain", [str(main_path)])
+
+    def _scan():
+        cache = piolib.LDFCache(cache_path)
+        assert cache.get(key) is None
+        cache.set(
+            key,
+            dict(
+                result=[str(header_path)],
+                processed=[str(main_path)],
+                deps=cache.compute_deps(
+                    [str(header_path)], [str(main_path)], [str(inc1_dir), str(inc2_dir)]
+                ),
+            ),
+        )
+        cache.save()
+
+    def _is_hit():
+        cache = piolib.LDFCache(cache_path)
+        entry = cache.get(key)
+        assert (cache.hits, cache.misses) == ((1, 0) if entry else (0, 1))
+        return entry is not None
+
+    _scan()
+    assert _is_hit()
+    assert _is_hit()
+
+    # a processed file is edited
+    main_path.write_text('#include "sys/foo.h"\n#include "bar.h"\n')
+    assert not _is_hit()
+    _scan()
+    assert _is_hit()
+
+    # a header in the earlier include dir shadows the resolved one
+    (inc1_dir / "sys").mkdir()
+    assert not _is_hit()
+    _scan()
+    assert _is_hit()
+    (inc1_dir / "sys" / "foo.h").write_text("#define FOO 2\n")
+    assert not _is_hit()
+    _scan()
+    assert _is_hit()
+
+    # the unrelated nested directories are not tracked
+    (inc1_dir / "other" / "foo.h").write_text("")
+    assert _is_hit()
+
+
+def test_lib_builder_path_index(piolib, tmp_path):
+    def _make_builder(path, is_dependent=False):
+        lb = object.__new__(piolib.LibBuilderBase)
+        lb.path = str(path)
+        lb.is_dependent = is_dependent
+        return lb
+
+    def _find_legacy(lib_builders, path):
+        for lb in sorted(lib_builders, key=lambda lb: 0 if lb.is_dependent else 1):
+            if path in lb:
+                return lb
+        return None
+
+    (tmp_path / "Foo" / "examples" / "Bar" / "src").mkdir(parents=True)
+    (tmp_path / "Baz").mkdir()
+    (tmp_path / "BazLink").symlink_to(tmp_path / "Baz")
+    paths = [
+        tmp_path / "Foo" / "src" / "foo.h",
+        tmp_path / "Foo" / "examples" / "Bar" / "src" / "bar.h",
+        tmp_path / "Baz" / "baz.h",
+        tmp_path / "BazLink" / "baz.h",
+        tmp_path / "FooBar" / "foobar.h",
+        tmp_path / "toolchain" / "stdio.h",
+    ]
+    for builders in (
+        # the nested library goes after and before the parent library
+        [_make_builder(tmp_path / "Foo"), _make_builder(tmp_path / "Foo/examples/Bar")],
+        [_make_builder(tmp_path / "Foo/examples/Bar"), _make_builder(tmp_path / "Foo")],
+        # the dependent libraries take precedence
+        [
+            _make_builder(tmp_path / "Foo"),
+            _make_builder(tmp_path / "Foo/examples/Bar", is_dependent=True),
+        ],
+        # the same library by a real path and a symbolic link
+        [_make_builder(tmp_path / "BazLink"), _make_builder(tmp_path / "Baz")],
+        [_make_builder(tmp_path / "Baz"), _make_builder(tmp_path / "BazLink")],
+    ):
+        index = piolib.LibBuilderPathIndex(builders)
+        for path in paths:
+            assert index.find(str(path)) is _find_legacy(builders, str(path))
@@ -0,0 +1,159 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# pylint: disable=unused-argument,redefined-outer-name,protected-access
+
+import hashlib
+import http.server
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from platformio.package.download import FileDownloader
+from platformio.package.manager.library import LibraryPackageManager
+
+
+class RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serves `server.data` with the range requests, the first response is
+    interrupted after `server.fail_after` bytes"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        data = self.server.data
+        start, end = 0, len(data) - 1
+        range_header = self.headers.get("Range")
+        self.server.requested_ranges.append(range_header)
+        if range_header:
+            start, end = [int(v) for v in range_header[6:].split("-")]
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", "bytes %d-%d/%d" % (start, end, len(data))
+            )
+        else:
+            self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self.server.etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if self.server.fail_after:
+            self.wfile.write(data[start : start + self.server.fail_after])
+            self.server.fail_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(data[start : end + 1])
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def range_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+    server.data = os.urandom(1024 * 1024)
+    server.etag = '"v1"'
+    server.requested_ranges = []
+    server.fail_after = 300 * 1024
+    server.url = "http://127.0.0.1:%d/package.tar.gz" % server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_resume(range_server, tmp_path: Path):
+    url = range_server.url
+    checksum = hashlib.sha256(range_server.data).hexdigest()
+
+    # the interrupted download is stored with its state
+    dl_path = str(tmp_path / "package.tar.gz")
+    fd = FileDownloader(url)
+    fd.set_destination(dl_path)
+    with pytest.raises(IOError):
+        fd.start(silent=True, checksum=checksum)
+    assert os.path.isfile(fd.get_state_path())
+    partial_size = os.path.getsize(dl_path)
+    assert 0 < partial_size <= 300 * 1024
+
+    # the download is resumed, the received data is passed again
+    chunks = []
+    fd = FileDownloader(url)
+    fd.set_destination(dl_path)
+    fd.start(silent=True, checksum=checksum, data_callback=chunks.append)
+    assert fd.verify(checksum)
+    assert b"".join(chunks) == range_server.data
+    assert range_server.requested_ranges[-1] == "bytes=%d-%d" % (
+        partial_size,
+        len(range_server.data) - 1,
+    )
+    assert not os.path.isfile(fd.get_state_path())
+
+    # the remote file has been changed, the download is started again
+    range_server.fail_after = 300 * 1024
+    fd = FileDownloader(url)
+    fd.set_destination(dl_path)
+    with pytest.raises(IOError):
+        fd.start(silent=True)
+    range_server.data = range_server.data[::-1]
+    range_server.etag = '"v2"'
+    del range_server.requested_ranges[:]
+    fd = FileDownloader(url)
+    fd.set_destination(dl_path)
+    fd.start(silent=True)
+    assert range_server.requested_ranges == [None]
+    assert Path(dl_path).read_bytes() == range_server.data
+
+
+def test_download_segments(
+    isolated_pio_core, range_server, tmp_path: Path, monkeypatch
+):
+    monkeypatch.setattr(FileDownloader, "MIN_SEGMENT_SIZE", 128 * 1024)
+    monkeypatch.setattr(FileDownloader, "STATE_SAVE_INTERVAL", 64 * 1024)
+    iter_received_segments = FileDownloader._iter_received_segments
+
+    def _iter_received_segments(self):
+        # the initial response is closed before the range requests
+        assert self._http_response.raw.closed
+        yield from iter_received_segments(self)
+
+    monkeypatch.setattr(
+        FileDownloader, "_iter_received_segments", _iter_received_segments
+    )
+    checksum = hashlib.sha256(range_server.data).hexdigest()
+    range_server.fail_after = None
+    dl_path = str(tmp_path / "segmented.tar.gz")
+    fd = FileDownloader(range_server.url)
+    fd.set_destination(dl_path)
+    fd.start(silent=True, checksum=checksum, segments=4)
+    assert fd.verify(checksum)
+    assert len(range_server.requested_ranges) == 5
+    assert "bytes=0-262143" in range_server.requested_ranges
+    assert Path(dl_path).read_bytes() == range_server.data
+
+    # the package manager resumes the interrupted download
+    monkeypatch.delenv("PLATFORMIO_DISABLE_PROGRESSBAR", raising=False)
+    del range_server.requested_ranges[:]
+    range_server.fail_after = 300 * 1024
+    lm = LibraryPackageManager(str(tmp_path / "storage"))
+    lm.set_log_level(logging.ERROR)
+    dl_path = lm.download(range_server.url, checksum, silent=True)
+    assert Path(dl_path).read_bytes() == range_server.data
+    assert len(range_server.requested_ranges) == 3
+    assert range_server.requested_ranges[-1].startswith("bytes=")
+    assert not [
+        name
+        for name in os.listdir(lm.get_download_dir())
+        if name.endswith((".part", ".state"))
+    ]
@@ -12,11 +12,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-# pylint: disable=unused-argument
+# pylint: disable=unused-argument,redefined-outer-name
 
+import http.server
+import json
 import logging
 import os
+import threading
 import time
+import zipfile
+from contextlib import contextmanager
 from pathlib import Path
 from random import random
 
@@ -26,13 +31,39 @@ import semantic_version
 from platformio import fs, util
 from platformio.package.exception import (
     MissingPackageManifestError,
+    PackageException,
     UnknownPackageError,
 )
+from platformio.package.manager.base import BasePackageManager
 from platformio.package.manager.library import LibraryPackageManager
 from platformio.package.manager.platform import PlatformPackageManager
 from platformio.package.manager.tool import ToolPackageManager
 from platformio.package.meta import PackageSpec
 from platformio.package.pack import PackagePacker
+from platformio.package.store import PackageStore
+from platformio.package.unpack import FileUnpacker
+
+
+@contextmanager
+def serve_directory(path, requested_paths):
+    class RequestHandler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(path), **kwargs)
+
+        def do_GET(self):  # pylint: disable=invalid-name
+            requested_paths.append(self.path)
+            return super().do_GET()
+
+        def log_message(self, *args):  # pylint: disable=arguments-differ
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield "http://127.0.0.1:%d" % server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
 
 
 def test_download(isolated_pio_core):
@@ -274,6 +305,216 @@ def test_install_lib_depndencies(isolated_pio_core, tmpdir_factory):
     )
 
 
+def test_install_many(isolated_pio_core, tmp_path: Path):
+    archives_dir = tmp_path / "archives"
+    archives_dir.mkdir()
+    requested_paths = []
+    with serve_directory(archives_dir, requested_paths) as base_url:
+        for name in ("foo", "bar", "baz", "qux"):
+            src_dir = tmp_path / "src" / name
+            (src_dir / "src").mkdir(parents=True)
+            (src_dir / "src" / f"{name}.h").write_text("")
+            manifest = dict(name=name, version="1.0.0")
+            if name == "foo":
+                # a dependency of a dependency
+                manifest["dependencies"] = {"qux": "%s/qux-1.0.0.tar.gz" % base_url}
+            (src_dir / "library.json").write_text(json.dumps(manifest))
+            PackagePacker(str(src_dir)).pack(str(archives_dir))
+        specs = [
+            PackageSpec("%s/%s-1.0.0.tar.gz" % (base_url, name))
+            for name in ("bar", "baz", "foo")
+        ]
+        lm = LibraryPackageManager(str(tmp_path / "storage"))
+        lm.set_log_level(logging.ERROR)
+        unpacked_paths = []
+        lm.unpack = lambda src, *args, **kwargs: (
+            unpacked_paths.append(src)
+            or LibraryPackageManager.unpack(src, *args, **kwargs)
+        )
+        fetched_dirs = []
+        lm.fetch_package = lambda url, dst, *args, **kwargs: (
+            fetched_dirs.append(os.path.basename(dst))
+            or LibraryPackageManager.fetch_package(lm, url, dst, *args, **kwargs)
+        )
+        pkgs = lm.install_many(specs)
+        assert [pkg.metadata.name for pkg in pkgs] == ["bar", "baz", "foo"]
+        assert [pkg.metadata.spec for pkg in pkgs] == specs
+        assert lm.get_package("qux")
+        # every archive is downloaded only once and is unpacked from the stream,
+        # the dependencies are prefetched too
+        assert len(requested_paths) == 4
+        assert all(name.startswith("pkg-prefetching-") for name in fetched_dirs)
+        assert not unpacked_paths
+        assert not os.listdir(lm.get_tmp_dir())
+        # already installed
+        assert lm.install_many(specs) == pkgs
+        assert len(requested_paths) == 4
+
+
+def test_download_and_unpack(isolated_pio_core, tmp_path: Path):
+    src_dir = tmp_path / "src" / "foo"
+    (src_dir / "src").mkdir(parents=True)
+    (src_dir / "src" / "foo.h").write_text("#define FOO 1\n" * 10000)
+    (src_dir / "library.json").write_text('{"name": "foo", "version": "1.0.0"}')
+    archives_dir = tmp_path / "archives"
+    archives_dir.mkdir()
+    tar_path = PackagePacker(str(src_dir)).pack(str(archives_dir))
+    checksum = fs.calculate_file_hashsum("sha256", tar_path)
+    with zipfile.ZipFile(str(archives_dir / "foo.zip"), "w") as zf:
+        zf.write(str(src_dir / "library.json"), "library.json")
+
+    lm = LibraryPackageManager(str(tmp_path / "storage"))
+    lm.set_log_level(logging.ERROR)
+    unpacked_paths = []
+    lm.unpack = lambda src, *args, **kwargs: (
+        unpacked_paths.append(src) or LibraryPackageManager.unpack(src, *args, **kwargs)
+    )
+    with serve_directory(archives_dir, []) as base_url:
+        url = "%s/%s" % (base_url, os.path.basename(tar_path))
+
+        # the checksum does not match, nothing is stored
+        dst_dir = tmp_path / "bad"
+        dst_dir.mkdir()
+        with pytest.raises(PackageException, match="does not match"):
+            lm.download_and_unpack(url, str(dst_dir), "0" * 64, silent=True)
+        assert not os.path.exists(lm.compute_download_path(url, "0" * 64))
+        assert not [
+            name for name in os.listdir(lm.get_download_dir()) if name.startswith("tmp")
+        ]
+
+        # TAR archive is extracted from the stream
+        dst_dir = tmp_path / "tar"
+        dst_dir.mkdir()
+        dl_path = lm.download_and_unpack(url, str(dst_dir), checksum, silent=True)
+        assert fs.calculate_file_hashsum("sha256", dl_path) == checksum
+        assert (dst_dir / "src" / "foo.h").read_text() == "#define FOO 1\n" * 10000
+        assert not unpacked_paths
+
+        # cached download
+        dst_dir = tmp_path / "cached"
+        dst_dir.mkdir()
+        assert lm.download_and_unpack(url, str(dst_dir), checksum, silent=True)
+        assert (dst_dir / "library.json").is_file()
+        assert unpacked_paths == [dl_path]
+
+        # ZIP archive is unpacked from the file
+        dst_dir = tmp_path / "zip"
+        dst_dir.mkdir()
+        lm.download_and_unpack(base_url + "/foo.zip", str(dst_dir), silent=True)
+        assert os.listdir(str(dst_dir)) == ["library.json"]
+        assert len(unpacked_paths) == 2
+
+
+def test_unpack_zip(tmp_path: Path, monkeypatch):
+    # the files are extracted by several threads
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    zip_path = str(tmp_path / "foo.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        info = zipfile.ZipInfo("foo/bin/", (2020, 1, 2, 3, 4, 6))
+        info.external_attr = 0o40755 << 16
+        zf.writestr(info, "")
+        info = zipfile.ZipInfo("foo/bin/tool", (2020, 1, 2, 3, 4, 8))
+        info.external_attr = 0o100755 << 16
+        zf.writestr(info, "#!/bin/sh\n")
+        zf.writestr("foo/include/nested/foo.h", "#define FOO 1\n")
+        zf.writestr("foo/data.bin", os.urandom(1024) * 3 * 1024)
+        zf.writestr("../../evil.txt", "evil")
+        for index in range(100):
+            zf.writestr("foo/src/file%d.c" % index, "int x%d;\n" % index)
+
+    dst_dir = tmp_path / "dst"
+    with FileUnpacker(zip_path) as fu:
+        assert fu.unpack(str(dst_dir), silent=True)
+    expected_dir = tmp_path / "expected"
+    with zipfile.ZipFile(zip_path) as zf:
+        zf.extractall(str(expected_dir))
+    # the same tree as `ZipFile.extractall()`
+    assert {
+        p.relative_to(dst_dir): p.read_bytes()
+        for p in dst_dir.rglob("*")
+        if p.is_file()
+    } == {
+        p.relative_to(expected_dir): p.read_bytes()
+        for p in expected_dir.rglob("*")
+        if p.is_file()
+    }
+    assert not (tmp_path / "evil.txt").exists()
+
+    # permissions and modification times
+    tool_stat = (dst_dir / "foo" / "bin" / "tool").stat()
+    assert tool_stat.st_mode & 0o777 == 0o755
+    assert tool_stat.st_mtime == time.mktime((2020, 1, 2, 3, 4, 8, 0, 0, -1))
+    assert (dst_dir / "foo" / "bin").stat().st_mtime == time.mktime(
+        (2020, 1, 2, 3, 4, 6, 0, 0, -1)
+    )
+
+
+def test_package_store(isolated_pio_core, tmp_path: Path, monkeypatch):
+    src_dir = tmp_path / "src" / "foo"
+    (src_dir / "src").mkdir(parents=True)
+    (src_dir / "src" / "foo.h").write_text("#define FOO 1\n")
+    (src_dir / "library.json").write_text('{"name": "foo", "version": "1.0.0"}')
+    (src_dir / "package.json").write_text('{"name": "foo", "version": "1.0.0"}')
+    (tmp_path / "archives").mkdir()
+    tar_path = PackagePacker(str(src_dir)).pack(str(tmp_path / "archives"))
+    checksum = fs.calculate_file_hashsum("sha256", tar_path)
+    store = PackageStore()
+    entry_dir = store.get_entry_dir(checksum)
+    fetched_urls = []
+    download_and_unpack = BasePackageManager.download_and_unpack
+    monkeypatch.setattr(
+        BasePackageManager,
+        "download_and_unpack",
+        lambda self, url, *args, **kwargs: (
+            fetched_urls.append(url) or download_and_unpack(self, url, *args, **kwargs)
+        ),
+    )
+
+    def _install(pm_class, name):
+        pm = pm_class(str(tmp_path / "packages" / name))
+        pm.set_log_level(logging.ERROR)
+        return pm.install_from_uri(url, PackageSpec("foo"), checksum)
+
+    with serve_directory(tmp_path / "archives", []) as base_url:
+        url = "%s/%s" % (base_url, os.path.basename(tar_path))
+        pkgs = [_install(ToolPackageManager, name) for name in ("tool1", "tool2")]
+        # the package is unpacked once, the installations share its files
+        assert fetched_urls == [url]
+        headers = [Path(pkg.path) / "src" / "foo.h" for pkg in pkgs]
+        assert headers[0].read_text() == headers[1].read_text() == "#define FOO 1\n"
+        assert store.is_valid_entry(entry_dir)
+        assert not store.get_unused_entries()
+        # the metadata is not shared
+        assert not os.path.isfile(os.path.join(entry_dir, "tree", ".piopm"))
+        assert pkgs[0].metadata.spec == pkgs[1].metadata.spec
+
+        # the shared file has been modified in place, the entry is unpacked again
+        headers[0].write_text("#define BAR 1\n")
+        assert not store.is_valid_entry(entry_dir)
+        headers.append(
+            Path(_install(ToolPackageManager, "tool3").path) / "src" / "foo.h"
+        )
+        assert headers[2].read_text() == "#define FOO 1\n"
+        assert store.is_valid_entry(entry_dir)
+        assert len(fetched_urls) == 2
+
+        # the libraries edited by users do not share the files with the store
+        headers.append(
+            Path(_install(LibraryPackageManager, "libdeps").path) / "src" / "foo.h"
+        )
+        assert len(fetched_urls) == 2
+        assert headers[3].stat().st_nlink == 1
+        headers[3].write_text("#define BAZ 1\n")
+        assert store.is_valid_entry(entry_dir)
+        assert headers[2].read_text() == "#define FOO 1\n"
+
+    # garbage collection of the entries which are not used by packages
+    fs.rmtree(str(tmp_path / "packages"))
+    assert [path for _, path in store.get_unused_entries()] == [entry_dir]
+    store.remove_entries([entry_dir])
+    assert not os.path.exists(entry_dir)
+
+
 def test_install_force(isolated_pio_core, tmpdir_factory):
     lm = LibraryPackageManager(str(tmpdir_factory.mktemp("lib-storage")))
     lm.set_log_level(logging.ERROR)
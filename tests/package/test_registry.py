@@ -0,0 +1,153 @@
+# Copyright (c) 2014-present PlatformIO <contact@platformio.org>
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# pylint: disable=unused-argument,redefined-outer-name
+
+import http.server
+import json
+import logging
+import re
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from platformio.http import HTTPClient
+from platformio.package.exception import UnknownPackageError
+from platformio.package.manager.library import LibraryPackageManager
+from platformio.package.meta import PackageSpec
+from platformio.registry.client import RegistryClient
+
+
+class MockRegistryHandler(http.server.BaseHTTPRequestHandler):
+    PACKAGES = {}  # {(owner, name): package}
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.server.requested_paths.append(self.path)
+        url = urlparse(self.path)
+        if url.path == "/v3/search":
+            names = re.findall(r'name:"([^"]+)"', parse_qs(url.query)["query"][0])
+            data = dict(
+                items=[
+                    dict(package, versions=None)
+                    for (_, name), package in sorted(self.PACKAGES.items())
+                    if name in names
+                ]
+            )
+        else:
+            owner, _, name = url.path.split("/")[3:]
+            data = self.PACKAGES.get((owner, name))
+        body = json.dumps(data or dict(message="Not found")).encode()
+        self.send_response(200 if data else 404)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def mock_registry(monkeypatch):
+    def _make_package(owner, name, versions):
+        items = [
+            dict(
+                name=version,
+                files=[
+                    dict(
+                        system="*",
+                        download_url="http://localhost/%s-%s.tar.gz" % (name, version),
+                        checksum=dict(sha256="0" * 64),
+                    )
+                ],
+            )
+            for version in versions
+        ]
+        return dict(
+            id=len(MockRegistryHandler.PACKAGES) + 1,
+            name=name,
+            owner=dict(username=owner),
+            version=items[-1],
+            versions=items,
+        )
+
+    for owner, name, versions in (
+        ("alice", "foo", ["1.0.0", "1.2.0", "2.0.0"]),
+        ("bob", "bar", ["0.1.0"]),
+        ("carol", "baz", ["1.5.0", "2.0.0"]),
+        ("dave", "baz", ["1.0.0"]),
+    ):
+        MockRegistryHandler.PACKAGES[(owner, name)] = _make_package(
+            owner, name, versions
+        )
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), MockRegistryHandler)
+    server.requested_paths = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(
+        RegistryClient,
+        "__init__",
+        lambda self: HTTPClient.__init__(
+            self, "http://127.0.0.1:%d" % server.server_address[1]
+        ),
+    )
+    monkeypatch.setattr(
+        RegistryClient, "allowed_private_packages", staticmethod(lambda: False)
+    )
+    monkeypatch.setattr("platformio.http.ensure_internet_on", lambda **_: True)
+    LibraryPackageManager.registry_memo_reset()
+    try:
+        yield server.requested_paths
+    finally:
+        LibraryPackageManager.registry_memo_reset()
+        MockRegistryHandler.PACKAGES.clear()
+        server.shutdown()
+        server.server_close()
+
+
+def test_registry_prefetch(isolated_pio_core, tmp_path: Path, mock_registry):
+    specs = [
+        PackageSpec("alice/foo@^1.0.0"),
+        PackageSpec("bob/bar"),
+        PackageSpec("baz@<2"),
+        PackageSpec("alice/foo@^1.0.0"),
+    ]
+    lm = LibraryPackageManager(str(tmp_path / "libdeps" / "env1"))
+    lm.prefetch_registry_packages(specs)
+    # every document is fetched once
+    assert sorted(path.split("?")[0] for path in mock_registry) == [
+        "/v3/packages/alice/library/foo",
+        "/v3/packages/bob/library/bar",
+        "/v3/packages/carol/library/baz",
+        "/v3/search",
+    ]
+
+    # the other environments resolve the versions from the memoized documents
+    mock_registry.clear()
+    lm = LibraryPackageManager(str(tmp_path / "libdeps" / "env2"))
+    lm.set_log_level(logging.ERROR)
+    assert [
+        (package["owner"]["username"], pkgfile["download_url"].rsplit("/", 1)[1])
+        for package, pkgfile in (lm.find_registry_package_file(spec) for spec in specs)
+    ] == [
+        ("alice", "foo-1.2.0.tar.gz"),
+        ("bob", "bar-0.1.0.tar.gz"),
+        ("carol", "baz-1.5.0.tar.gz"),
+        ("alice", "foo-1.2.0.tar.gz"),
+    ]
+    assert not mock_registry
+    with pytest.raises(UnknownPackageError):
+        lm.find_registry_package_file(PackageSpec("alice/unknown"))
+    assert mock_registry == ["/v3/packages/alice/library/unknown"]
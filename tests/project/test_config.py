@@ -707,6 +707,100 @@ extends = a, b, c
     assert config.get("env:na_ti-ve13", "upload_tool") == "three"
 
 
+def test_resolved_options_cache(tmp_path: Path):
+    project_conf = tmp_path / "platformio.ini"
+    project_conf.write_text(
+        """
+[common]
+build_flags = -D COMMON
+lib_deps = Lib1
+
+[env:base]
+extends = common
+build_flags = ${common.build_flags} -D ${sysenv.__PIO_TEST_CNF_FLAG}
+lib_deps = ${common.lib_deps}, Lib2
+
+[env:extra]
+extends = env:base
+custom_flags = ${env:base.build_flags}
+    """
+    )
+    config = ProjectConfig(str(project_conf))
+    assert config.resolve_env("extra") == config.items(env="extra", as_dict=True)
+    assert config.resolve_env("extra") == {
+        "extends": ["env:base"],
+        "custom_flags": "-D COMMON -D",
+        "build_flags": ["-D COMMON -D"],
+        "lib_deps": ["Lib1", "Lib2"],
+    }
+
+    # returned lists are not shared with the cache
+    config.get("env:base", "lib_deps").append("Lib3")
+    assert config.get("env:base", "lib_deps") == ["Lib1", "Lib2"]
+
+    # system environment variables are checked on every call
+    os.environ["__PIO_TEST_CNF_FLAG"] = "SYSENV"
+    assert config.get("env:extra", "custom_flags") == "-D COMMON -D SYSENV"
+    assert config.resolve_env("extra")["build_flags"] == ["-D COMMON -D SYSENV"]
+    del os.environ["__PIO_TEST_CNF_FLAG"]
+    assert config.get("env:extra", "custom_flags") == "-D COMMON -D"
+
+    # changes invalidate the cache
+    config.set("common", "build_flags", "-D UPDATED")
+    assert config.get("env:extra", "build_flags") == ["-D UPDATED -D"]
+    config.update([("env:extra", [("lib_deps", ["Lib4"])])])
+    assert config.get("env:extra", "lib_deps") == ["Lib4"]
+    config.remove_option("env:extra", "lib_deps")
+    assert config.get("env:extra", "lib_deps") == ["Lib1", "Lib2"]
+    config.remove_section("env:base")
+    assert config.options(env="extra") == ["extends", "custom_flags"]
+    extra_conf = tmp_path / "extra.ini"
+    extra_conf.write_text("[env:extra]\nboard = uno\n")
+    config.read(str(extra_conf))
+    assert config.get("env:extra", "board") == "uno"
+
+
+def test_snapshot(tmp_path: Path):
+    project_conf = tmp_path / "platformio.ini"
+    project_conf.write_text(
+        """
+[platformio]
+extra_configs = ${PROJECT_DIR}/extra.ini
+
+[env:base]
+build_flags = -D ${this.__env__} -D "PCT=100%%"
+lib_install = 1
+    """
+    )
+    extra_conf = tmp_path / "extra.ini"
+    extra_conf.write_text("[env:extra]\nextends = env:base\nboard = uno\n")
+    with fs.cd(str(tmp_path)):
+        config = ProjectConfig(str(project_conf))
+    snapshot_path = str(tmp_path / "build" / "projectconf.json")
+    assert config.dump_snapshot(snapshot_path) == snapshot_path
+
+    loaded = ProjectConfig.load_snapshot(snapshot_path, str(project_conf))
+    assert loaded.path == str(project_conf)
+    assert loaded.as_tuple() == config.as_tuple()
+    assert loaded.warnings == config.warnings
+    assert loaded.get("env:extra", "build_flags") == ['-D extra -D "PCT=100%"']
+    assert ProjectConfig.load_snapshot(snapshot_path, "platformio.ini") is None
+    assert ProjectConfig.load_snapshot(str(tmp_path / "unknown.json")) is None
+
+    # shared instance
+    instance = ProjectConfig.get_instance(
+        str(project_conf), snapshot_path=snapshot_path
+    )
+    assert instance.get("env:extra", "board") == "uno"
+    assert instance is not ProjectConfig.get_instance(
+        str(project_conf), parse_extra=False
+    )
+
+    # any changed file invalidates the snapshot
+    extra_conf.write_text("[env:extra]\nextends = env:base\nboard = nano\n")
+    assert ProjectConfig.load_snapshot(snapshot_path) is None
+
+
 def test_invalid_env_names(tmp_path: Path):
     project_conf = tmp_path / "platformio.ini"
     project_conf.write_text(
@@ -14,7 +14,10 @@
 
 import json
 
+from platformio import fs
 from platformio.project.commands.metadata import project_metadata_cmd
+from platformio.project.config import ProjectConfig
+from platformio.project.helpers import load_build_metadata
 
 
 def test_metadata_dump(clirunner, validate_cliresult, tmpdir):
@@ -80,3 +83,30 @@ int main() {
         metadata = json.load(fp)["native"]
     assert len(metadata["includes"]["build"]) == 3
     assert len(metadata["includes"]["compatlib"]) == 2
+
+
+def test_cached_metadata_snapshot(tmpdir, monkeypatch):
+    project_conf = tmpdir.join("platformio.ini")
+    project_conf.write(
+        """
+[env:native]
+platform = native
+build_type = debug
+"""
+    )
+    build_dir = tmpdir.mkdir(".pio").mkdir("build")
+    build_dir.mkdir("native").join("idedata.json").write(
+        json.dumps({"env_name": "native", "build_type": "debug"})
+    )
+    with fs.cd(str(tmpdir)):
+        ProjectConfig(str(project_conf)).dump_snapshot(
+            str(build_dir.join("projectconf.json"))
+        )
+
+    # the configuration of the last build is loaded without parsing
+    def _read(*_, **__):
+        raise AssertionError("parsed")
+
+    monkeypatch.setattr(ProjectConfig, "read", _read)
+    metadata = load_build_metadata(str(tmpdir), "native", cache=True)
+    assert metadata == {"env_name": "native", "build_type": "debug"}